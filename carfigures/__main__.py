@@ -2,39 +2,35 @@
 CarFigures Bot Entry Point
 """
 
+# First, so the boot timings cover the imports below
+from carfigures.core.startup import startup_timer
+
 import asyncio
 import logging
 import os
 from pathlib import Path
 
-import uvloop
 from tortoise import Tortoise
 
-from carfigures.core.bot import CarFiguresBot
 from carfigures.core.config import Config
+from carfigures.core.logs import setup_logging
+from carfigures.core.database import TORTOISE_ORM, install_query_hook, schema_is_current
 
-# Database configuration for Tortoise ORM
-TORTOISE_ORM = {
-    "connections": {
-        "default": os.environ.get("CARFIGURESBOT_DB_URL", "sqlite://db.sqlite3")
-    },
-    "apps": {
-        "models": {
-            "models": ["carfigures.models", "aerich.models"],
-            "default_connection": "default",
-        }
-    },
-}
 
 async def init_db():
     """Initialize database"""
     await Tortoise.init(config=TORTOISE_ORM)
-    await Tortoise.generate_schemas()
+    install_query_hook()
+    
+    # Restarts on a migrated database skip the CREATE TABLE IF NOT EXISTS round trips
+    if await schema_is_current():
+        logging.info("Database is at the latest migration, skipping schema generation")
+    else:
+        await Tortoise.generate_schemas()
     
     # Create sample data if needed
     from carfigures.models import Car
-    car_count = await Car.all().count()
-    if car_count == 0:
+    if not await Car.exists():
         from carfigures.utils.sample_data import create_sample_cars, create_sample_packs
         await create_sample_cars()
         await create_sample_packs()
@@ -42,29 +38,40 @@ async def init_db():
 
 async def main():
     """Main entry point"""
-    # Set up logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler("carfigures.log"),
-            logging.StreamHandler()
-        ]
-    )
-    
     # Load configuration
     config_path = Path("config.toml")
     config = Config.from_file(config_path)
     
+    # Set up logging, records are written from a background thread
+    log_config = config.logging
+    log_pipeline = setup_logging(
+        path=log_config.path,
+        json_output=log_config.json,
+        max_bytes=log_config.max_bytes,
+        rotate_when=log_config.rotate_when,
+        backup_count=log_config.backup_count,
+        dedup_window=log_config.dedup_window,
+    )
+    startup_timer.mark("config")
+    
     # Initialize database
     await init_db()
+    startup_timer.mark("database")
+    
+    # discord.py is the bulk of the import time, the cogs are loaded by setup_hook
+    from carfigures.core.bot import CarFiguresBot
+    startup_timer.mark("imports")
     
     # Create and run bot
     bot = CarFiguresBot(config)
-    await bot.start(config.bot_token)
+    try:
+        await bot.start(config.bot_token)
+    finally:
+        log_pipeline.stop()
 
 if __name__ == "__main__":
     if os.name != "nt":
+        import uvloop
         uvloop.install()
     
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1 @@
+"""Micro-benchmarks of the economy, pack and spawn hot paths"""
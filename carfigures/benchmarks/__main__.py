@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import fnmatch
+import logging
+import sys
+from pathlib import Path
+from typing import List
+
+from carfigures.benchmarks import suite  # noqa: F401, registers the benchmarks
+from carfigures.benchmarks.harness import (
+    BENCHMARKS,
+    RESULT_HEADER,
+    Benchmark,
+    Result,
+    compare,
+    format_changes,
+    format_result,
+    load,
+    measure,
+    save,
+)
+
+
+async def run(selected: List[Benchmark], config: Path, rounds: int) -> List[Result]:
+    fixture = suite.Fixture(config)
+    await fixture.open()
+    results = []
+    # Rows are printed as they finish, seeding the big catalogs takes a while
+    print(RESULT_HEADER)
+    try:
+        for bench in selected:
+            case = await bench.setup(fixture, *bench.args)
+            results.append(await measure(bench.name, case, rounds))
+            print(format_result(results[-1]), flush=True)
+    finally:
+        await fixture.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m carfigures.benchmarks",
+        description="Time the economy, pack and spawn hot paths and compare them to a baseline",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument(
+        "-k", dest="patterns", action="append",
+        help="Only run benchmarks matching this glob, e.g. 'pack.*', can be repeated",
+    )
+    run_parser.add_argument("--rounds", type=int, default=20)
+    run_parser.add_argument("--config", default="config.toml", type=Path)
+    run_parser.add_argument("--save", type=Path, help="Write the results as a JSON baseline")
+    run_parser.add_argument("--compare", type=Path, help="Baseline to compare the results to")
+    run_parser.add_argument("--threshold", type=float, default=0.1)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two saved runs")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="Relative change below which a difference is noise, 0.1 = 10%%",
+    )
+
+    subparsers.add_parser("list", help="List the benchmarks")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+
+    if args.command == "list":
+        for bench in BENCHMARKS:
+            print(bench.name)
+        return
+
+    if args.command == "compare":
+        changes = compare(load(args.baseline), load(args.current), args.threshold)
+    else:
+        selected = [
+            bench for bench in BENCHMARKS
+            if not args.patterns
+            or any(fnmatch.fnmatchcase(bench.name, pattern) for pattern in args.patterns)
+        ]
+        if not selected:
+            parser.error("no benchmark matches -k")
+        results = asyncio.run(run(selected, args.config, args.rounds))
+        if args.save:
+            save(args.save, results)
+        if not args.compare:
+            return
+        current = {result.name: result for result in results}
+        # A partial run is only compared on the benchmarks it ran
+        baseline = {
+            name: result for name, result in load(args.compare).items()
+            if any(bench.name == name for bench in selected)
+        }
+        changes = compare(baseline, current, args.threshold)
+
+    print(format_changes(changes))
+    # Fail like a test run would, so a regression can block a merge
+    if any(change.status == "slower" for change in changes):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
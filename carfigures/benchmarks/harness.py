@@ -0,0 +1,200 @@
+"""Timing loop, JSON baselines and baseline comparisons"""
+
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+# Calls of a cheap benchmark are grouped until one round takes this long
+MIN_ROUND_TIME = 0.01
+
+
+class Case(NamedTuple):
+    """
+    What a benchmark setup hands to the timing loop
+    `call` is timed, sync or async. `before` runs untimed ahead of every call, for
+    benchmarks that consume state such as opening a pack, and forces one call per round.
+    """
+    call: Callable[[], Any]
+    before: Optional[Callable[[], Awaitable[Any]]] = None
+
+
+Setup = Callable[..., Awaitable[Case]]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Setup
+    args: tuple = ()
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, params: Sequence[Any] = ()) -> Callable[[Setup], Setup]:
+    """
+    Register an async setup function returning the Case to time
+    With `params`, one benchmark `name[param]` is registered per value and the setup
+    receives the value after the fixture.
+    """
+
+    def register(setup: Setup) -> Setup:
+        if not params:
+            BENCHMARKS.append(Benchmark(name, setup))
+        for param in params:
+            BENCHMARKS.append(Benchmark(f"{name}[{param}]", setup, (param,)))
+        return setup
+
+    return register
+
+
+@dataclass
+class Result:
+    name: str
+    rounds: int
+    loops: int  # Calls per round
+    # Seconds per call
+    median: float
+    mean: float
+    stdev: float
+    min: float
+
+
+def _per_call(name: str, rounds: List[float], loops: int) -> Result:
+    times = [elapsed / loops for elapsed in rounds]
+    return Result(
+        name,
+        len(times),
+        loops,
+        statistics.median(times),
+        statistics.fmean(times),
+        statistics.stdev(times) if len(times) > 1 else 0.0,
+        min(times),
+    )
+
+
+async def measure(name: str, case: Case, rounds: int = 20) -> Result:
+    """Time a case over `rounds` rounds after one warm-up round"""
+    is_async = asyncio.iscoroutinefunction(case.call)
+
+    async def run(loops: int) -> float:
+        if case.before is not None:
+            await case.before()
+        started = time.perf_counter()
+        if is_async:
+            for _ in range(loops):
+                await case.call()
+        else:
+            for _ in range(loops):
+                case.call()
+        return time.perf_counter() - started
+
+    # Grow the loop count until a round is long enough for the clock to resolve it
+    loops = 1
+    elapsed = await run(loops)
+    while case.before is None and elapsed < MIN_ROUND_TIME:
+        loops *= max(2, min(10, int(MIN_ROUND_TIME / max(elapsed, 1e-9))))
+        elapsed = await run(loops)
+
+    return _per_call(name, [await run(loops) for _ in range(rounds)], loops)
+
+
+def environment() -> Dict[str, str]:
+    """What the numbers were measured on, baselines only compare on the same machine"""
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def save(path: Path, results: List[Result]):
+    """Write results as a JSON baseline"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "results": {result.name: asdict(result) for result in results},
+    }, indent=2))
+
+
+def load(path: Path) -> Dict[str, Result]:
+    """Results of a baseline written by `save`, by benchmark name"""
+    data = json.loads(path.read_text())
+    return {name: Result(**result) for name, result in data["results"].items()}
+
+
+class Change(NamedTuple):
+    name: str
+    baseline: Optional[float]  # Median seconds per call
+    current: Optional[float]
+    status: str  # slower, faster, same, new or missing
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if not self.baseline or self.current is None:
+            return None
+        return self.current / self.baseline
+
+
+def compare(
+    baseline: Dict[str, Result], current: Dict[str, Result], threshold: float = 0.1
+) -> List[Change]:
+    """Median against median, a change within `threshold` (0.1 = 10%) counts as noise"""
+    changes = []
+    for name in [*baseline, *(name for name in current if name not in baseline)]:
+        before, after = baseline.get(name), current.get(name)
+        if before is None:
+            changes.append(Change(name, None, after.median, "new"))
+            continue
+        if after is None:
+            changes.append(Change(name, before.median, None, "missing"))
+            continue
+        change = Change(name, before.median, after.median, "same")
+        if change.ratio is not None and change.ratio > 1 + threshold:
+            change = change._replace(status="slower")
+        elif change.ratio is not None and change.ratio < 1 / (1 + threshold):
+            change = change._replace(status="faster")
+        changes.append(change)
+    return changes
+
+
+def format_time(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+RESULT_HEADER = (
+    f"{'benchmark':<32}{'median':>12}{'min':>12}{'stdev':>12}{'rounds':>8}{'loops':>8}"
+)
+
+
+def format_result(result: Result) -> str:
+    """One row under RESULT_HEADER"""
+    return (
+        f"{result.name:<32}{format_time(result.median):>12}{format_time(result.min):>12}"
+        f"{format_time(result.stdev):>12}{result.rounds:>8}{result.loops:>8}"
+    )
+
+
+def format_changes(changes: List[Change]) -> str:
+    lines = [f"{'benchmark':<32}{'baseline':>12}{'current':>12}{'ratio':>8}  status"]
+    for change in changes:
+        ratio = "-" if change.ratio is None else f"{change.ratio:.2f}x"
+        lines.append(
+            f"{change.name:<32}{format_time(change.baseline):>12}"
+            f"{format_time(change.current):>12}{ratio:>8}  {change.status}"
+        )
+    return "\n".join(lines)
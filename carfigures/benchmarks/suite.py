@@ -0,0 +1,222 @@
+"""The benchmarks, run against a seeded in-memory SQLite database"""
+
+import itertools
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict
+
+from tortoise import Tortoise
+
+from carfigures.benchmarks.harness import Case, benchmark
+from carfigures.core.config import Config
+from carfigures.core.database import build_tortoise_config
+from carfigures.models import Car, DailyClaim, Pack, PackContent, User, UserCar, UserPack
+
+CATALOG_SIZES = (10, 100, 1_000, 10_000, 100_000)
+# Opening goes through the database, which dominates long before the draw does
+OPEN_SIZES = (10, 1_000)
+GARAGE_SIZES = (10, 1_000)
+
+# One car in five per rarity tier of a pack roll, from legendary to common
+RARITIES = (0.5, 1.5, 3.0, 7.0, 10.0)
+
+_user_ids = itertools.count(1)
+
+
+class Fixture:
+    """
+    In-memory database shared by every benchmark of a run
+    Catalogs, packs and garages are created the first time a size asks for them, so
+    running a subset only seeds what it uses.
+    """
+
+    def __init__(self, config_path: Path):
+        self.config_path = config_path
+        self.config = Config.from_file(config_path)
+        self._cars = 0
+        self._packs: Dict[int, Pack] = {}
+        self._garages: Dict[int, int] = {}
+
+    async def open(self):
+        await Tortoise.init(config=build_tortoise_config("sqlite://:memory:"))
+        await Tortoise.generate_schemas()
+
+    async def close(self):
+        await Tortoise.close_connections()
+
+    async def pack(self, size: int) -> Pack:
+        """Pack drawing from the first `size` cars of the catalog"""
+        if size not in self._packs:
+            await self._grow_catalog(size)
+            pack = await Pack.create(name=f"Bench {size}", description="", price=100)
+            await PackContent.bulk_create(
+                [
+                    PackContent(pack_id=pack.id, car_id=car_id, drop_rate=car_id % 10 + 1)
+                    for car_id in range(1, size + 1)
+                ],
+                batch_size=5000,
+            )
+            self._packs[size] = pack
+        return self._packs[size]
+
+    async def garage(self, size: int) -> int:
+        """Id of a user owning `size` cars"""
+        if size not in self._garages:
+            await self._grow_catalog(size)
+            user_id = await self.user()
+            await UserCar.bulk_create(
+                [UserCar(user_id=user_id, car_id=car_id) for car_id in range(1, size + 1)],
+                batch_size=5000,
+            )
+            self._garages[size] = user_id
+        return self._garages[size]
+
+    async def user(self) -> int:
+        """Id of a new user without cars"""
+        user = await User.create(id=next(_user_ids), username="bench")
+        return user.id
+
+    async def _grow_catalog(self, size: int):
+        if size <= self._cars:
+            return
+        await Car.bulk_create(
+            [
+                Car(
+                    id=car_id,
+                    name=f"Car {car_id}",
+                    model=f"Model {car_id}",
+                    year=2000 + car_id % 25,
+                    horsepower=300 + car_id % 500,
+                    weight=1500,
+                    rarity=RARITIES[car_id % len(RARITIES)],
+                    type="Bench",
+                )
+                for car_id in range(self._cars + 1, size + 1)
+            ],
+            batch_size=5000,
+        )
+        self._cars = size
+
+
+def _member():
+    """The attributes embeds read from a discord.Member"""
+    return SimpleNamespace(
+        display_name="bench", display_avatar=SimpleNamespace(url="https://cdn.invalid/a.png")
+    )
+
+
+# Packs
+
+
+@benchmark("pack.draw", params=CATALOG_SIZES)
+async def pack_draw(fixture: Fixture, size: int) -> Case:
+    from carfigures.utils.packs import PackManager
+
+    pack = await fixture.pack(size)
+    # open_pack prefetches, the same rows joined in one query load far faster at 100k
+    contents = await PackContent.filter(pack=pack).select_related("car")
+    return Case(lambda: PackManager.draw_cars(pack, contents))
+
+
+@benchmark("pack.open", params=OPEN_SIZES)
+async def pack_open(fixture: Fixture, size: int) -> Case:
+    from carfigures.utils.packs import PackManager
+
+    pack = await fixture.pack(size)
+    user_id = await fixture.user()
+    user_pack = {}
+
+    async def buy():
+        user_pack["id"] = (await UserPack.create(user_id=user_id, pack=pack, price_paid=0)).id
+
+    async def open_pack():
+        await PackManager.open_pack(user_pack["id"])
+
+    return Case(open_pack, before=buy)
+
+
+# Coins
+
+
+@benchmark("coins.daily_reward")
+async def daily_reward(fixture: Fixture) -> Case:
+    from carfigures.utils.coins import CoinManager
+
+    today = date.today()
+    user_id = await fixture.user()
+    last_claim = await DailyClaim.create(
+        user_id=user_id, claim_date=today - timedelta(days=1), amount_claimed=100, streak_count=4
+    )
+    amount = fixture.config.coin_config.daily_claim_amount
+    return Case(lambda: CoinManager.daily_reward(amount, today, last_claim))
+
+
+@benchmark("coins.claim_daily")
+async def claim_daily(fixture: Fixture) -> Case:
+    from carfigures.utils.coins import CoinManager
+
+    today = date.today()
+    user_id = await fixture.user()
+    await DailyClaim.create(
+        user_id=user_id, claim_date=today - timedelta(days=1), amount_claimed=100, streak_count=4
+    )
+    amount = fixture.config.coin_config.daily_claim_amount
+
+    async def unclaim():
+        # Yesterday's claim stays, so every call continues the streak
+        await DailyClaim.filter(user_id=user_id, claim_date=today).delete()
+
+    async def claim():
+        await CoinManager.claim_daily(user_id, amount)
+
+    return Case(claim, before=unclaim)
+
+
+# Spawns and configuration
+
+
+@benchmark("spawn.pick_messages")
+async def pick_messages(fixture: Fixture) -> Case:
+    from carfigures.core.bot import pick_message
+
+    spawn_manager = fixture.config.spawn_manager
+
+    def pick():
+        pick_message(spawn_manager.spawn_messages)
+        pick_message(spawn_manager.catch_button_messages)
+
+    return Case(pick)
+
+
+@benchmark("config.from_file")
+async def config_from_file(fixture: Fixture) -> Case:
+    return Case(lambda: Config.from_file(fixture.config_path))
+
+
+# Embeds
+
+
+@benchmark("embed.garage", params=GARAGE_SIZES)
+async def garage_embed(fixture: Fixture, size: int) -> Case:
+    from carfigures.commands.general import GeneralCommands
+
+    user_id = await fixture.garage(size)
+    user_cars = await UserCar.filter(user_id=user_id).select_related("car").order_by(
+        "-caught_at"
+    )
+    cog = GeneralCommands(SimpleNamespace(config=fixture.config))
+    member = _member()
+    return Case(lambda: cog.garage_embed(member, user_cars))
+
+
+@benchmark("embed.shop")
+async def shop_embed(fixture: Fixture) -> Case:
+    from carfigures.commands.packs import PackCommands
+    from carfigures.utils.packs import PackManager
+
+    for size in (10, 100, 1_000):
+        await fixture.pack(size)
+    packs = await PackManager.get_available_packs()
+    cog = PackCommands(SimpleNamespace(config=fixture.config))
+    return Case(lambda: cog.shop_embed(packs))
@@ -0,0 +1,372 @@
+"""Bot team commands"""
+
+from datetime import datetime, timedelta, timezone
+
+import discord
+from discord.ext import commands
+
+from carfigures.core.economy import economy_stats
+from carfigures.core.watchdog import watchdog
+from carfigures.models import CoinReason, EconomyMetric, EventKind, Pack, Resolution
+
+
+def is_team_member():
+    """Check that the author is listed in the team roots or super users"""
+    async def predicate(ctx) -> bool:
+        team = ctx.bot.config.team
+        return ctx.author.id in team.roots or ctx.author.id in team.super_users
+    return commands.check(predicate)
+
+
+class AdminCommands(commands.Cog):
+    """Commands reserved to the bot team"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.group(name="watchdog", hidden=True, invoke_without_command=True)
+    @is_team_member()
+    async def watchdog_group(self, ctx):
+        """Show the event-loop watchdog status"""
+        status = "✅ Running" if watchdog.enabled else "❌ Stopped"
+        embed = discord.Embed(
+            title="🐶 Loop Watchdog",
+            description=(
+                f"**Status:** {status}\n"
+                f"**Threshold:** {watchdog.threshold * 1000:.0f}ms\n\n"
+                "`!watchdog start [threshold_ms]` - Start watching the event loop\n"
+                "`!watchdog stop` - Stop watching\n"
+                "`!watchdog report` - Show the slowest callbacks\n"
+                "`!watchdog reset` - Clear the report"
+            ),
+            color=int(self.bot.config.default_embed_color, 16)
+        )
+        await ctx.send(embed=embed)
+
+    @watchdog_group.command(name="start")
+    @is_team_member()
+    async def watchdog_start(self, ctx, threshold_ms: int = None):
+        """Start the event-loop watchdog"""
+        if threshold_ms is not None and threshold_ms <= 0:
+            await ctx.send("Threshold must be positive!")
+            return
+
+        watchdog.start(threshold_ms / 1000 if threshold_ms else None)
+        await ctx.send(f"Watchdog running with a {watchdog.threshold * 1000:.0f}ms threshold.")
+
+    @watchdog_group.command(name="stop")
+    @is_team_member()
+    async def watchdog_stop(self, ctx):
+        """Stop the event-loop watchdog"""
+        await watchdog.stop()
+        await ctx.send("Watchdog stopped.")
+
+    @watchdog_group.command(name="reset")
+    @is_team_member()
+    async def watchdog_reset(self, ctx):
+        """Clear the slow callback report"""
+        watchdog.reset()
+        await ctx.send("Watchdog report cleared.")
+
+    @watchdog_group.command(name="report")
+    @is_team_member()
+    async def watchdog_report(self, ctx):
+        """Show the callbacks that blocked the event loop the longest"""
+        slowest = watchdog.report()
+
+        embed = discord.Embed(
+            title="🐢 Slowest Callbacks",
+            color=int(self.bot.config.default_embed_color, 16)
+        )
+
+        if not slowest:
+            embed.description = "No slow callbacks recorded."
+
+        for stats in slowest:
+            embed.add_field(
+                name=f"{stats.operation} - {stats.total * 1000:.0f}ms total",
+                value=(
+                    f"**Count:** {stats.count}\n"
+                    f"**Worst:** {stats.worst * 1000:.0f}ms\n"
+                    f"`{stats.location[:900]}`"
+                ),
+                inline=False
+            )
+
+        await ctx.send(embed=embed)
+
+    @commands.group(name="cards", hidden=True, invoke_without_command=True)
+    @is_team_member()
+    async def cards_group(self, ctx):
+        """Show the spawn card cache status"""
+        renderer = self.bot.cards
+        if renderer is None:
+            await ctx.send("Spawn cards are disabled in the config.")
+            return
+
+        stats = renderer.stats()
+        garages = self.bot.garages.stats()
+        embed = discord.Embed(
+            title="🖼️ Spawn Cards",
+            description=(
+                f"**In memory:** {stats['memory']}\n"
+                f"**On disk:** {stats['disk']}\n"
+                f"**Rendering:** {stats['rendering']}\n"
+                f"**Catalog:** {len(self.bot.catalog)} cars\n"
+                f"**Garage pages:** {garages['pages']} "
+                f"({garages['bytes'] / 1024 / 1024:.1f} MB, {garages['rendering']} rendering)\n\n"
+                "`!cards warm` - Render the card of every car"
+            ),
+            color=int(self.bot.config.default_embed_color, 16)
+        )
+        await ctx.send(embed=embed)
+
+    @cards_group.command(name="warm")
+    @is_team_member()
+    async def cards_warm(self, ctx):
+        """Pre-render the spawn card of every car in the catalog"""
+        renderer = self.bot.cards
+        if renderer is None:
+            await ctx.send("Spawn cards are disabled in the config.")
+            return
+
+        cars = self.bot.catalog.cars()
+        await ctx.send(f"Rendering {len(cars)} cards...")
+        failed = await renderer.warm(cars)
+        if failed:
+            await ctx.send(f"Done, {failed} cards failed to render. Check the logs!")
+        else:
+            await ctx.send(f"Done, {len(cars)} cards are cached.")
+
+    @commands.group(name="catchtiming", hidden=True, invoke_without_command=True)
+    @is_team_member()
+    async def catch_timing_group(self, ctx):
+        """Show the users flagged by the catch timing analyzer"""
+        analyzer = self.bot.catch_timing
+        config = analyzer.config
+        flagged = sorted(analyzer.flagged)
+        listed = "\n".join(f"<@{user_id}> (`{user_id}`)" for user_id in flagged[:20])
+        if len(flagged) > 20:
+            listed += f"\n...and {len(flagged) - 20} more, see the panel"
+        shadow = f"✅ under {config.shadow_delay:g}s" if config.shadow_limit else "❌ Off"
+        embed = discord.Embed(
+            title="⏱️ Catch Timing",
+            description=(
+                f"**Status:** {'✅ Recording' if config.enabled else '❌ Disabled'}\n"
+                f"**Tracked users:** {len(analyzer)}\n"
+                f"**Shadow limit:** {shadow}\n\n"
+                f"**Flagged ({len(flagged)}):**\n{listed or 'Nobody'}\n\n"
+                "`!catchtiming show <user>` - Show a user's reaction times\n"
+                "`!catchtiming clear <user>` - Forget a user's timings and flag"
+            ),
+            color=int(self.bot.config.default_embed_color, 16)
+        )
+        await ctx.send(embed=embed)
+
+    @catch_timing_group.command(name="show")
+    @is_team_member()
+    async def catch_timing_show(self, ctx, user: discord.User):
+        """Show the reaction time quantiles of a user"""
+        timing = self.bot.catch_timing.get(user.id)
+        if timing is None:
+            await ctx.send(f"No catch timings recorded for {user.mention} since the last restart.")
+            return
+
+        embed = discord.Embed(
+            title=f"⏱️ {user.display_name}",
+            description=f"**Flagged:** {', '.join(timing.reasons) or 'No'}",
+            color=int(self.bot.config.default_embed_color, 16)
+        )
+        histograms = (("Spawn to click", timing.clicks), ("Click to name", timing.typing))
+        for name, histogram in histograms:
+            if not histogram.total:
+                value = "No samples"
+            else:
+                value = f"**Samples:** {histogram.total}\n" + "\n".join(
+                    f"**p{round(q * 100)}:** {histogram.quantile(q):.2f}s"
+                    for q in (0.1, 0.5, 0.9)
+                )
+            embed.add_field(name=name, value=value, inline=True)
+        await ctx.send(embed=embed)
+
+    @catch_timing_group.command(name="clear")
+    @is_team_member()
+    async def catch_timing_clear(self, ctx, user: discord.User):
+        """Forget a user's timings and lift their flag"""
+        await self.bot.catch_timing.clear(user.id)
+        await ctx.send(f"Cleared the catch timings of {user.mention}.")
+
+    @commands.group(name="events", hidden=True, invoke_without_command=True)
+    @is_team_member()
+    async def events_group(self, ctx):
+        """Show the running and upcoming events"""
+        scheduler = self.bot.events
+        embed = discord.Embed(
+            title="📅 Events",
+            description=(
+                f"**Spawn boost:** x{scheduler.spawn_multiplier:g}\n"
+                f"**Reward boost:** x{scheduler.reward_multiplier:g}\n\n"
+                "`!events pack <pack_id> <starts_in_minutes> <duration_minutes>` "
+                "- Put a pack on sale for a while\n"
+                "`!events spawns <multiplier> <starts_in_minutes> <duration_minutes>` "
+                "- Spawn cars more often\n"
+                "`!events rewards <multiplier> <starts_in_minutes> <duration_minutes>` "
+                "- Give larger catch rewards\n"
+                "`!events cancel <event_id>` - Cancel an event"
+            ),
+            color=int(self.bot.config.default_embed_color, 16)
+        )
+        for name, events, at in (
+            ("Running", scheduler.active(), "ends_at"),
+            ("Upcoming", scheduler.upcoming(), "starts_at"),
+        ):
+            listed = "\n".join(
+                f"`#{event.id}` **{event.name}** "
+                f"{'ends' if at == 'ends_at' else 'starts'} "
+                f"<t:{int(getattr(event, at).timestamp())}:R>"
+                for event in events[:10]
+            )
+            embed.add_field(name=name, value=listed or "None", inline=False)
+        await ctx.send(embed=embed)
+
+    @events_group.command(name="pack")
+    @is_team_member()
+    async def events_pack(
+        self, ctx, pack_id: int, starts_in_minutes: float, duration_minutes: float
+    ):
+        """Schedule a limited time release of a pack"""
+        pack = await Pack.get_or_none(id=pack_id)
+        if pack is None:
+            await ctx.send(f"No pack with id {pack_id}!")
+            return
+        await self._schedule(
+            ctx,
+            f"{pack.name} release",
+            EventKind.PACK_RELEASE,
+            starts_in_minutes,
+            duration_minutes,
+            pack_id=pack.id,
+        )
+
+    @events_group.command(name="spawns")
+    @is_team_member()
+    async def events_spawns(
+        self, ctx, multiplier: float, starts_in_minutes: float, duration_minutes: float
+    ):
+        """Schedule a spawn boost"""
+        if await self._check_multiplier(ctx, multiplier):
+            await self._schedule(
+                ctx,
+                f"Spawn boost x{multiplier:g}",
+                EventKind.SPAWN_BOOST,
+                starts_in_minutes,
+                duration_minutes,
+                multiplier=multiplier,
+            )
+
+    @events_group.command(name="rewards")
+    @is_team_member()
+    async def events_rewards(
+        self, ctx, multiplier: float, starts_in_minutes: float, duration_minutes: float
+    ):
+        """Schedule a catch reward boost"""
+        if await self._check_multiplier(ctx, multiplier):
+            await self._schedule(
+                ctx,
+                f"Reward boost x{multiplier:g}",
+                EventKind.REWARD_BOOST,
+                starts_in_minutes,
+                duration_minutes,
+                multiplier=multiplier,
+            )
+
+    @events_group.command(name="cancel")
+    @is_team_member()
+    async def events_cancel(self, ctx, event_id: int):
+        """Cancel an event that has not ended"""
+        if await self.bot.events.cancel(event_id):
+            await ctx.send(f"Cancelled event #{event_id}.")
+        else:
+            await ctx.send(f"No running or upcoming event #{event_id}!")
+
+    async def _check_multiplier(self, ctx, multiplier: float) -> bool:
+        highest = self.bot.config.events.max_multiplier
+        if 1 < multiplier <= highest:
+            return True
+        await ctx.send(f"Multiplier must be above 1 and at most {highest:g}!")
+        return False
+
+    async def _schedule(
+        self,
+        ctx,
+        name: str,
+        kind: EventKind,
+        starts_in_minutes: float,
+        duration_minutes: float,
+        **kwargs,
+    ):
+        if starts_in_minutes < 0 or duration_minutes <= 0:
+            await ctx.send("Events can't start in the past and must last a while!")
+            return
+
+        starts_at = datetime.now(timezone.utc) + timedelta(minutes=starts_in_minutes)
+        ends_at = starts_at + timedelta(minutes=duration_minutes)
+        event = await self.bot.events.schedule(
+            name, kind, starts_at, ends_at, created_by=ctx.author.id, **kwargs
+        )
+        await ctx.send(
+            f"Scheduled `#{event.id}` **{name}** from <t:{int(starts_at.timestamp())}:f> "
+            f"to <t:{int(ends_at.timestamp())}:f>."
+        )
+
+    @commands.command(name="economy", hidden=True)
+    @is_team_member()
+    async def economy_report(self, ctx):
+        """Show coins minted and burned and packs sold recently"""
+        now = datetime.now(timezone.utc)
+        periods = (
+            # The last hour comes from memory, so it only counts this process
+            ("Last hour", economy_stats.recent(Resolution.MINUTE, 60)),
+            ("Last 24 hours", await economy_stats.totals(now - timedelta(hours=24))),
+            ("Last 7 days", await economy_stats.totals(now - timedelta(days=7))),
+        )
+
+        embed = discord.Embed(
+            title="📊 Economy",
+            color=int(self.bot.config.default_embed_color, 16)
+        )
+        for name, totals in periods:
+            embed.add_field(name=name, value=_economy_summary(totals), inline=False)
+        embed.set_footer(text="Longer series are served by the panel at /admin/economy")
+        await ctx.send(embed=embed)
+
+
+def _economy_summary(totals) -> str:
+    minted = burned = sold = revenue = 0
+    by_reason = {}
+    for (metric, dimension), value in totals.items():
+        if metric == EconomyMetric.COINS_MINTED:
+            minted += value
+            by_reason[dimension] = by_reason.get(dimension, 0) + value
+        elif metric == EconomyMetric.COINS_BURNED:
+            burned += value
+        elif metric == EconomyMetric.PACKS_SOLD:
+            sold += value
+        elif metric == EconomyMetric.PACK_REVENUE:
+            revenue += value
+
+    sources = ", ".join(
+        f"{CoinReason(reason).name.replace('_', ' ').lower()} {value:,}"
+        for reason, value in sorted(by_reason.items(), key=lambda item: -item[1])
+    )
+    return (
+        f"**Minted:** 🪙 {minted:,}" + (f" ({sources})" if sources else "") + "\n"
+        f"**Burned:** 🪙 {burned:,}\n"
+        f"**Net:** 🪙 {minted - burned:+,}\n"
+        f"**Packs sold:** {sold:,} for 🪙 {revenue:,}"
+    )
+
+
+async def setup(bot):
+    """Extension entry point, called by bot.load_extension"""
+    await bot.add_cog(AdminCommands(bot))
@@ -4,8 +4,21 @@ import discord
 from discord.ext import commands
 from datetime import datetime
 
+from carfigures.core import journal
+from carfigures.core.metrics import record_cache_lookup
+from carfigures.models import CoinReason
 from carfigures.utils.coins import CoinManager
 
+REASON_LABELS = {
+    CoinReason.OPENING_BALANCE: "Opening balance",
+    CoinReason.DAILY_CLAIM: "Daily claim",
+    CoinReason.CAR_CATCH: "Car catch",
+    CoinReason.PACK_PURCHASE: "Pack purchase",
+    CoinReason.ADMIN_GIFT: "Admin gift",
+    CoinReason.TRADE: "Trade",
+    CoinReason.IMPORT: "Import",
+}
+
 
 class CoinsCommands(commands.Cog):
     """Commands for the coin system"""
@@ -13,7 +26,7 @@ class CoinsCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
-    @commands.command(name="daily", aliases=["claim"])
+    @commands.command(name="daily", aliases=["claim"], extras={"query_budget": 8})
     async def daily_claim(self, ctx):
         """Claim your daily coin reward"""
         config = self.bot.config.coin_config
@@ -52,7 +65,7 @@ class CoinsCommands(commands.Cog):
         embed.set_footer(text="Use !balance to check your coin balance")
         await ctx.send(embed=embed)
     
-    @commands.command(name="balance", aliases=["coins", "bal"])
+    @commands.command(name="balance", aliases=["coins", "bal"], extras={"query_budget": 3})
     async def check_balance(self, ctx, user: discord.Member = None):
         """Check your or another user's coin balance"""
         target_user = user or ctx.author
@@ -87,7 +100,31 @@ class CoinsCommands(commands.Cog):
         
         await ctx.send(embed=embed)
     
-    @commands.command(name="leaderboard", aliases=["lb", "top"])
+    @commands.command(name="history", aliases=["transactions"], extras={"query_budget": 1})
+    async def coin_history(self, ctx, user: discord.Member = None):
+        """Show your or another user's latest coin transactions"""
+        target_user = user or ctx.author
+        
+        transactions = await journal.history(target_user.id, limit=10)
+        
+        embed = discord.Embed(
+            title=f"🧾 {target_user.display_name}'s Transactions",
+            color=int(self.bot.config.default_embed_color, 16)
+        )
+        
+        if not transactions:
+            embed.description = "No coin transactions yet!"
+        else:
+            embed.description = "\n".join(
+                f"`{transaction.delta:+,}` {REASON_LABELS.get(transaction.reason, 'Other')} "
+                f"<t:{int(transaction.created_at.timestamp())}:R>"
+                for transaction in transactions
+            )
+        
+        embed.set_thumbnail(url=target_user.display_avatar.url)
+        await ctx.send(embed=embed)
+    
+    @commands.command(name="leaderboard", aliases=["lb", "top"], extras={"query_budget": 3})
     async def coin_leaderboard(self, ctx):
         """Show the top coin holders"""
         from carfigures.models import UserCoins, User
@@ -109,6 +146,7 @@ class CoinsCommands(commands.Cog):
         for i, user_coins in enumerate(top_users, 1):
             try:
                 discord_user = self.bot.get_user(user_coins.user.id)
+                record_cache_lookup("users", discord_user is not None)
                 name = discord_user.display_name if discord_user else f"User {user_coins.user.id}"
             except:
                 name = f"User {user_coins.user.id}"
@@ -121,7 +159,7 @@ class CoinsCommands(commands.Cog):
         
         await ctx.send(embed=embed)
     
-    @commands.command(name="give", hidden=True)
+    @commands.command(name="give", hidden=True, extras={"query_budget": 4})
     @commands.has_permissions(administrator=True)
     async def give_coins(self, ctx, user: discord.Member, amount: int):
         """Give coins to a user (Admin only)"""
@@ -129,7 +167,7 @@ class CoinsCommands(commands.Cog):
             await ctx.send("Amount must be positive!")
             return
         
-        await CoinManager.add_coins(user.id, amount, "Admin gift")
+        await CoinManager.add_coins(user.id, amount, CoinReason.ADMIN_GIFT, ctx.author.id)
         
         embed = discord.Embed(
             title="💰 Coins Given",
@@ -137,4 +175,9 @@ class CoinsCommands(commands.Cog):
             color=0x00ff00
         )
         
-        await ctx.send(embed=embed)
\ No newline at end of file
+        await ctx.send(embed=embed)
+
+
+async def setup(bot):
+    """Extension entry point, called by bot.load_extension"""
+    await bot.add_cog(CoinsCommands(bot))
@@ -1,8 +1,16 @@
 """General bot commands"""
 
+import logging
+import math
+import typing
+
 import discord
 from discord.ext import commands
 
+from carfigures.core.garage import PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
 
 class GeneralCommands(commands.Cog):
     """General bot commands"""
@@ -10,7 +18,7 @@ class GeneralCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
-    @commands.command(name="help")
+    @commands.command(name="help", extras={"query_budget": 0})
     async def help_command(self, ctx, command_name: str = None):
         """Show help information"""
         if command_name:
@@ -50,6 +58,7 @@ class GeneralCommands(commands.Cog):
             coin_commands = (
                 f"`{self.bot.command_prefix}daily` - Claim daily coin reward\n"
                 f"`{self.bot.command_prefix}balance` - Check your coin balance\n"
+                f"`{self.bot.command_prefix}history` - View your latest coin transactions\n"
                 f"`{self.bot.command_prefix}leaderboard` - View top coin holders"
             )
             embed.add_field(name="💰 Coin Commands", value=coin_commands, inline=False)
@@ -63,6 +72,20 @@ class GeneralCommands(commands.Cog):
             )
             embed.add_field(name="📦 Pack Commands", value=pack_commands, inline=False)
             
+            # Trade commands
+            trade_commands = (
+                f"`{self.bot.command_prefix}trade <user>` - Trade cars and coins with a user\n"
+                f"`{self.bot.command_prefix}trade` - Show how to change an open trade"
+            )
+            embed.add_field(name="🤝 Trade Commands", value=trade_commands, inline=False)
+            
+            # Server commands
+            server_commands = (
+                f"`{self.bot.command_prefix}settings` - Show and change the spawn settings "
+                "of this server"
+            )
+            embed.add_field(name="⚙️ Server Commands", value=server_commands, inline=False)
+            
             # General commands
             general_commands = (
                 f"`{self.bot.command_prefix}help [command]` - Show this help message\n"
@@ -75,15 +98,43 @@ class GeneralCommands(commands.Cog):
         
         await ctx.send(embed=embed)
     
-    @commands.command(name="garage", aliases=["collection"])
-    async def show_garage(self, ctx, user: discord.Member = None):
-        """Show your car collection"""
+    @commands.command(name="garage", aliases=["collection"], extras={"query_budget": 2})
+    async def show_garage(self, ctx, user: typing.Optional[discord.Member] = None, page: int = 1):
+        """Show your car collection, as a grid of cards when they are enabled"""
         target_user = user or ctx.author
         
         from carfigures.models import UserCar
         
         user_cars = await UserCar.filter(user_id=target_user.id).prefetch_related("car").order_by("-caught_at")
+        garages = self.bot.garages
+        if garages is None or not user_cars:
+            await ctx.send(embed=self.garage_embed(target_user, user_cars))
+            return
+        
+        pages = math.ceil(len(user_cars) / PAGE_SIZE)
+        page = min(max(page, 1), pages)
+        shown = user_cars[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        embed = self.garage_embed(target_user, user_cars, listed=False)
+        try:
+            image = await garages.get(target_user.id, page, shown)
+        except Exception:
+            logger.exception(f"Could not render garage page {page} of {target_user.id}")
+            await ctx.send(embed=self.garage_embed(target_user, user_cars))
+            return
         
+        embed.set_image(url=f"attachment://{garages.filename}")
+        footer = f"Page {page}/{pages}"
+        if page < pages:
+            # Footers do not render mentions, the member converter takes the id as well
+            target = "" if target_user == ctx.author else f"{target_user.id} "
+            footer += f" - {self.bot.command_prefix}garage {target}{page + 1} for the next one"
+        embed.set_footer(text=footer)
+        await ctx.send(embed=embed, file=garages.file(image))
+    
+    def garage_embed(
+        self, target_user: discord.abc.User, user_cars, listed: bool = True
+    ) -> discord.Embed:
+        """Garage of a user, `user_cars` newest first with their car fetched"""
         embed = discord.Embed(
             title=f"🏎️ {target_user.display_name}'s Garage",
             color=int(self.bot.config.default_embed_color, 16)
@@ -92,19 +143,21 @@ class GeneralCommands(commands.Cog):
         if not user_cars:
             embed.description = "No cars in garage yet!\nCatch cars when they spawn to start your collection."
         else:
-            car_list = ""
-            for i, user_car in enumerate(user_cars[:10], 1):  # Show first 10
-                car = user_car.car
-                rarity_emoji = "🟨" if car.rarity <= 1 else "🟪" if car.rarity <= 2 else "🟦" if car.rarity <= 5 else "🟫"
-                shiny_text = "✨ " if user_car.is_shiny else ""
-                fav_text = "❤️ " if user_car.is_favorite else ""
+            # Without the list, the cars are shown by the grid image
+            if listed:
+                car_list = ""
+                for i, user_car in enumerate(user_cars[:10], 1):  # Show first 10
+                    car = user_car.car
+                    rarity_emoji = "🟨" if car.rarity <= 1 else "🟪" if car.rarity <= 2 else "🟦" if car.rarity <= 5 else "🟫"
+                    shiny_text = "✨ " if user_car.is_shiny else ""
+                    fav_text = "❤️ " if user_car.is_favorite else ""
+                    
+                    car_list += f"{i}. {rarity_emoji} {shiny_text}{fav_text}**{car.name}** ({car.year})\n"
                 
-                car_list += f"{i}. {rarity_emoji} {shiny_text}{fav_text}**{car.name}** ({car.year})\n"
-            
-            if len(user_cars) > 10:
-                car_list += f"\n... and {len(user_cars) - 10} more cars!"
-            
-            embed.description = car_list
+                if len(user_cars) > 10:
+                    car_list += f"\n... and {len(user_cars) - 10} more cars!"
+                
+                embed.description = car_list
             embed.add_field(
                 name="Statistics",
                 value=f"**Total Cars:** {len(user_cars)}\n**Unique Models:** {len(set(uc.car.name for uc in user_cars))}",
@@ -112,9 +165,9 @@ class GeneralCommands(commands.Cog):
             )
         
         embed.set_thumbnail(url=target_user.display_avatar.url)
-        await ctx.send(embed=embed)
+        return embed
     
-    @commands.command(name="info")
+    @commands.command(name="info", extras={"query_budget": 1})
     async def car_info(self, ctx, *, car_name: str):
         """Get information about a specific car"""
         from carfigures.models import Car
@@ -159,4 +212,9 @@ class GeneralCommands(commands.Cog):
         if car.logo_url:
             embed.set_thumbnail(url=car.logo_url)
         
-        await ctx.send(embed=embed)
\ No newline at end of file
+        await ctx.send(embed=embed)
+
+
+async def setup(bot):
+    """Extension entry point, called by bot.load_extension"""
+    await bot.add_cog(GeneralCommands(bot))
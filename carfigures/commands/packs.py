@@ -2,7 +2,7 @@
 
 import discord
 from discord.ext import commands
-from typing import Optional
+from typing import List, Optional
 
 from carfigures.utils.packs import PackManager
 from carfigures.utils.coins import CoinManager
@@ -15,10 +15,10 @@ class PackCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
-    @commands.command(name="shop", aliases=["store", "packs"])
+    @commands.command(name="shop", aliases=["store", "packs"], extras={"query_budget": 2})
     async def show_shop(self, ctx):
         """Show available packs in the shop"""
-        packs = await PackManager.get_available_packs()
+        packs = await self.bot.shop.get()
         
         if not packs:
             embed = discord.Embed(
@@ -29,6 +29,10 @@ class PackCommands(commands.Cog):
             await ctx.send(embed=embed)
             return
         
+        await ctx.send(embed=self.shop_embed(packs))
+    
+    def shop_embed(self, packs: List[Pack]) -> discord.Embed:
+        """Shop listing of the available packs"""
         embed = discord.Embed(
             title="🏪 Pack Shop",
             description="Available packs to purchase with coins",
@@ -36,6 +40,9 @@ class PackCommands(commands.Cog):
         )
         
         for pack in packs:
+            limited = ""
+            if pack.is_limited_time and pack.available_until:
+                limited = f"\n⏳ **Ends** <t:{int(pack.available_until.timestamp())}:R>"
             rarity_info = (
                 f"🟫 Common: {pack.common_chance}%\n"
                 f"🟦 Rare: {pack.rare_chance}%\n"
@@ -48,22 +55,19 @@ class PackCommands(commands.Cog):
                 value=(
                     f"{pack.description}\n"
                     f"**Guaranteed Cars:** {pack.guaranteed_cars}\n"
-                    f"**Rarity Chances:**\n{rarity_info}"
+                    f"**Rarity Chances:**\n{rarity_info}{limited}"
                 ),
                 inline=False
             )
         
         embed.set_footer(text="Use !buy <pack_name> to purchase a pack")
-        await ctx.send(embed=embed)
+        return embed
     
-    @commands.command(name="buy", aliases=["purchase"])
+    @commands.command(name="buy", aliases=["purchase"], extras={"query_budget": 10})
     async def buy_pack(self, ctx, *, pack_name: str):
         """Buy a pack from the shop"""
-        # Find pack by name (case insensitive)
-        pack = await Pack.filter(
-            name__icontains=pack_name,
-            is_active=True
-        ).first()
+        # Find pack by name (case insensitive), among the cached packs on sale
+        pack = await self.bot.shop.find(pack_name)
         
         if not pack:
             embed = discord.Embed(
@@ -106,7 +110,7 @@ class PackCommands(commands.Cog):
         
         await ctx.send(embed=embed)
     
-    @commands.command(name="inventory", aliases=["inv", "unopened"])
+    @commands.command(name="inventory", aliases=["inv", "unopened"], extras={"query_budget": 2})
     async def show_inventory(self, ctx, user: discord.Member = None):
         """Show your unopened packs"""
         target_user = user or ctx.author
@@ -135,7 +139,9 @@ class PackCommands(commands.Cog):
         embed.set_thumbnail(url=target_user.display_avatar.url)
         await ctx.send(embed=embed)
     
-    @commands.command(name="open")
+    # Ownership check, the pack and its cars, one insert of every drawn car, the shiny
+    # marks and the pack and stats updates, whatever the number of cars drawn
+    @commands.command(name="open", extras={"query_budget": 10})
     async def open_pack(self, ctx, pack_id: int):
         """Open one of your packs"""
         from carfigures.models import UserPack
@@ -167,6 +173,9 @@ class PackCommands(commands.Cog):
         # Open the pack
         success, message, cars_received = await PackManager.open_pack(pack_id)
         
+        if cars_received and self.bot.garages:
+            self.bot.garages.invalidate(ctx.author.id)
+        
         if not success:
             embed = discord.Embed(
                 title="❌ Failed to Open Pack",
@@ -215,7 +224,7 @@ class PackCommands(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @pack_admin.command(name="create")
+    @pack_admin.command(name="create", extras={"query_budget": 1})
     @commands.has_permissions(administrator=True)
     async def create_pack(self, ctx, name: str, price: int, *, description: str):
         """Create a new pack"""
@@ -229,6 +238,7 @@ class PackCommands(commands.Cog):
                 description=description,
                 price=price
             )
+            self.bot.shop.invalidate()
             
             embed = discord.Embed(
                 title="✅ Pack Created",
@@ -248,7 +258,7 @@ class PackCommands(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    @pack_admin.command(name="list")
+    @pack_admin.command(name="list", extras={"query_budget": 1})
     @commands.has_permissions(administrator=True)
     async def list_packs(self, ctx):
         """List all packs (admin)"""
@@ -276,4 +286,9 @@ class PackCommands(commands.Cog):
                 inline=True
             )
         
-        await ctx.send(embed=embed)
\ No newline at end of file
+        await ctx.send(embed=embed)
+
+
+async def setup(bot):
+    """Extension entry point, called by bot.load_extension"""
+    await bot.add_cog(PackCommands(bot))
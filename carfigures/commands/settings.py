@@ -0,0 +1,125 @@
+"""Server settings commands"""
+
+import logging
+from typing import List
+
+import discord
+from discord.ext import commands
+
+from carfigures.commands.admin import is_team_member
+from carfigures.core.guild_config import GuildSettings
+
+logger = logging.getLogger(__name__)
+
+# Readable names of the overridable columns, in the order they are shown
+LABELS = {
+    "min_messages": "Fewest messages",
+    "max_messages": "Most messages",
+    "cooldown": "Cooldown",
+    "spawn_channels": "Spawn channels",
+    "reward_multiplier": "Reward multiplier",
+}
+
+
+class SettingsCommands(commands.Cog):
+    """Commands for server admins to tune spawns in their server"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.group(name="settings", invoke_without_command=True, extras={"query_budget": 0})
+    @commands.guild_only()
+    async def settings(self, ctx):
+        """Show the spawn settings of this server"""
+        settings = self.bot.guild_configs.get(ctx.guild.id)
+        await ctx.send(embed=self.settings_embed(ctx.guild, settings))
+
+    @settings.command(name="messages", extras={"query_budget": 1})
+    @commands.has_guild_permissions(manage_guild=True)
+    async def settings_messages(self, ctx, minimum: int, maximum: int):
+        """Set how many messages it takes to spawn a car"""
+        lowest = self.bot.config.guild_config.min_messages
+        if minimum < lowest or maximum < minimum:
+            await ctx.send(
+                f"The fewest messages must be at least {lowest} and at most the most messages!"
+            )
+            return
+        await self._update(ctx, min_messages=minimum, max_messages=maximum)
+
+    @settings.command(name="cooldown", extras={"query_budget": 1})
+    @commands.has_guild_permissions(manage_guild=True)
+    async def settings_cooldown(self, ctx, seconds: int):
+        """Set how long spawns pause after a car spawned"""
+        shortest = self.bot.config.guild_config.min_cooldown
+        if seconds < shortest:
+            await ctx.send(f"The cooldown must be at least {shortest} seconds!")
+            return
+        await self._update(ctx, cooldown=seconds)
+
+    @settings.command(name="channels", extras={"query_budget": 1})
+    @commands.has_guild_permissions(manage_guild=True)
+    async def settings_channels(self, ctx, channels: commands.Greedy[discord.TextChannel]):
+        """Only spawn cars in these channels, none puts back the default"""
+        channel_ids = [channel.id for channel in channels]
+        await self._update(ctx, spawn_channels=channel_ids or None)
+
+    @settings.command(name="reset", extras={"query_budget": 1})
+    @commands.has_guild_permissions(manage_guild=True)
+    async def settings_reset(self, ctx):
+        """Put every setting of this server back to the default"""
+        settings = await self.bot.guild_configs.reset(ctx.guild.id)
+        await ctx.send("Settings reset.", embed=self.settings_embed(ctx.guild, settings))
+
+    @settings.command(name="rewards", hidden=True, extras={"query_budget": 1})
+    @is_team_member()
+    async def settings_rewards(self, ctx, multiplier: float):
+        """Multiply the catch rewards of this server, 1 puts back the default"""
+        highest = self.bot.config.guild_config.max_reward_multiplier
+        if not 0 < multiplier <= highest:
+            await ctx.send(f"Multiplier must be above 0 and at most {highest:g}!")
+            return
+        await self._update(ctx, reward_multiplier=None if multiplier == 1 else multiplier)
+
+    def settings_embed(self, guild: discord.Guild, settings: GuildSettings) -> discord.Embed:
+        """Settings a guild spawns with, and which of them it overrides"""
+        prefix = self.bot.command_prefix
+        low, high = settings.message_range
+        channels = " ".join(f"<#{channel_id}>" for channel_id in settings.spawn_channels)
+        embed = discord.Embed(
+            title=f"⚙️ {guild.name} Settings",
+            description=(
+                f"**Messages to spawn:** {low} to {high}\n"
+                f"**Cooldown:** {settings.cooldown:g} seconds\n"
+                f"**Spawn channels:** {channels or 'Where people chat'}\n"
+                f"**Reward multiplier:** x{settings.reward_multiplier:g}"
+            ),
+            color=int(self.bot.config.default_embed_color, 16)
+        )
+        overridden = [LABELS[name] for name in settings.overridden]
+        embed.add_field(
+            name="Changed for this server",
+            value=", ".join(overridden) if overridden else "*Nothing*",
+            inline=False
+        )
+        embed.add_field(
+            name="Commands",
+            value=(
+                f"`{prefix}settings messages <min> <max>` - Messages it takes to spawn a car\n"
+                f"`{prefix}settings cooldown <seconds>` - Pause after a spawn\n"
+                f"`{prefix}settings channels [#channel...]` - Channels cars spawn in\n"
+                f"`{prefix}settings reset` - Back to the defaults"
+            ),
+            inline=False
+        )
+        return embed
+
+    async def _update(self, ctx, **overrides):
+        settings = await self.bot.guild_configs.update(ctx.guild.id, **overrides)
+        changed: List[str] = [LABELS[name] for name in overrides]
+        logger.info(f"{ctx.author.id} changed {', '.join(changed)} of guild {ctx.guild.id}")
+        await ctx.send(embed=self.settings_embed(ctx.guild, settings))
+
+
+async def setup(bot):
+    """Extension entry point, called by bot.load_extension"""
+    await bot.add_cog(SettingsCommands(bot))
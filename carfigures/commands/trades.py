@@ -0,0 +1,351 @@
+"""Trade commands"""
+
+import functools
+import logging
+import time
+from typing import Dict, Optional
+
+import discord
+from discord.ext import commands
+
+from carfigures.core.outbound import Priority, SendDropped
+from carfigures.core.trades import Trade
+from carfigures.models import UserCar
+from carfigures.utils.coins import CoinManager
+from carfigures.utils.trades import TradeManager
+
+logger = logging.getLogger(__name__)
+
+
+class TradeView(discord.ui.View):
+    """Confirm and cancel buttons of an open trade, only its two users can press them"""
+    
+    def __init__(self, cog: "TradeCommands", trade: Trade):
+        # The trade table expires the trade, the timeout only frees a view left behind
+        super().__init__(timeout=trade.expires_at - time.time() + 60)
+        self.cog = cog
+        self.trade = trade
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id in self.trade.user_ids:
+            return True
+        await _answer(interaction, "This is not your trade!")
+        return False
+    
+    @discord.ui.button(label="Confirm", style=discord.ButtonStyle.success, emoji="✅")
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.confirm(interaction, self.trade)
+    
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.danger, emoji="✖️")
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if await self.cog.close(self.trade, "✖️ Trade Cancelled", 0xff0000):
+            await _answer(interaction, "You cancelled the trade.")
+        else:
+            await _answer(interaction, "This trade can no longer be cancelled!")
+
+
+class TradeCommands(commands.Cog):
+    """Commands for trading cars and coins between users"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.views: Dict[int, TradeView] = {}
+    
+    @commands.group(name="trade", invoke_without_command=True, extras={"query_budget": 0})
+    @commands.guild_only()
+    async def trade(self, ctx, partner: Optional[discord.Member] = None):
+        """Start a trade with another user"""
+        if partner is None:
+            prefix = self.bot.command_prefix
+            embed = discord.Embed(
+                title="🤝 Trade Commands",
+                description=(
+                    f"`{prefix}trade <user>` - Start a trade\n"
+                    f"`{prefix}trade add <car_name>` - Offer one of your cars\n"
+                    f"`{prefix}trade remove <car_name>` - Take a car back\n"
+                    f"`{prefix}trade coins <amount>` - Offer coins\n"
+                    f"`{prefix}trade cancel` - Cancel your trade"
+                ),
+                color=int(self.bot.config.default_embed_color, 16)
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        if partner.bot or partner.id == ctx.author.id:
+            await ctx.send("You can't trade with that user!")
+            return
+        
+        trade = Trade(
+            ctx.message.id,
+            ctx.channel.id,
+            ctx.author.id,
+            partner.id,
+            time.time() + self.bot.config.trades.timeout,
+        )
+        if not self.bot.trades.add(trade):
+            await ctx.send(
+                f"You or {partner.display_name} already have a trade open! "
+                f"Finish it or use `{self.bot.command_prefix}trade cancel` first."
+            )
+            return
+        
+        view = TradeView(self, trade)
+        self.views[trade.trade_id] = view
+        try:
+            message = await ctx.send(embed=self.trade_embed(trade), view=view)
+        except Exception:
+            self.bot.trades.discard(trade.trade_id)
+            self.views.pop(trade.trade_id, None)
+            view.stop()
+            raise
+        trade.message_id = message.id
+    
+    @trade.command(name="add", extras={"query_budget": 3})
+    async def trade_add(self, ctx, *, car_name: str):
+        """Offer one of your cars in your open trade"""
+        trade = await self._open_trade(ctx)
+        if trade is None:
+            return
+        offer = trade.offer(ctx.author.id)
+        if len(offer.cars) >= self.bot.config.trades.max_cars:
+            await ctx.send(f"You can offer at most {self.bot.config.trades.max_cars} cars!")
+            return
+        
+        user_car = await UserCar.filter(
+            user_id=ctx.author.id, car__name__icontains=car_name
+        ).prefetch_related("car").first()
+        if user_car is None:
+            await ctx.send(f"You don't own a car named '{car_name}'!")
+            return
+        if user_car.car_id in offer.cars:
+            await ctx.send(f"The **{user_car.car.name}** is already in the trade!")
+            return
+        
+        partner_id = trade.other(ctx.author.id).user_id
+        if await UserCar.exists(user_id=partner_id, car_id=user_car.car_id):
+            await ctx.send(f"<@{partner_id}> already owns the **{user_car.car.name}**!")
+            return
+        
+        # The trade may have been settled or cancelled while the garages were read
+        if not await self._still_open(ctx, trade):
+            return
+        offer.cars[user_car.car_id] = user_car.car.name
+        trade.changed()
+        await self._offer_changed(ctx, trade)
+    
+    @trade.command(name="remove", extras={"query_budget": 0})
+    async def trade_remove(self, ctx, *, car_name: str):
+        """Take one of your cars back out of your open trade"""
+        trade = await self._open_trade(ctx)
+        if trade is None:
+            return
+        offer = trade.offer(ctx.author.id)
+        car_id = next(
+            (car_id for car_id, name in offer.cars.items() if car_name.lower() in name.lower()),
+            None,
+        )
+        if car_id is None:
+            await ctx.send(f"You haven't offered a car named '{car_name}'!")
+            return
+        
+        del offer.cars[car_id]
+        trade.changed()
+        await self._offer_changed(ctx, trade)
+    
+    @trade.command(name="coins", extras={"query_budget": 4})
+    async def trade_coins(self, ctx, amount: int):
+        """Offer coins in your open trade, 0 takes them back"""
+        trade = await self._open_trade(ctx)
+        if trade is None:
+            return
+        if amount < 0:
+            await ctx.send("Amount can't be negative!")
+            return
+        
+        # Checked again when the trade is settled, the balance can change until then
+        balance = await CoinManager.get_balance(ctx.author.id)
+        if balance < amount:
+            await ctx.send(f"You only have {balance:,} coins!")
+            return
+        
+        if not await self._still_open(ctx, trade):
+            return
+        trade.offer(ctx.author.id).coins = amount
+        trade.changed()
+        await self._offer_changed(ctx, trade)
+    
+    @trade.command(name="cancel", extras={"query_budget": 0})
+    async def trade_cancel(self, ctx):
+        """Cancel your open trade"""
+        trade = await self._open_trade(ctx)
+        if trade is None:
+            return
+        await self.close(trade, "✖️ Trade Cancelled", 0xff0000)
+        await ctx.send("Trade cancelled.")
+    
+    async def confirm(self, interaction: discord.Interaction, trade: Trade):
+        """Confirm a side of the trade, settle it once both sides are confirmed"""
+        if self.bot.trades.get(trade.trade_id) is not trade:
+            await _answer(interaction, "This trade is closed!")
+            return
+        if trade.settling:
+            await _answer(interaction, "This trade is being settled!")
+            return
+        if all(offer.empty for offer in trade.offers):
+            await _answer(interaction, "Add something to the trade first!")
+            return
+        
+        trade.offer(interaction.user.id).confirmed = True
+        if not trade.confirmed:
+            await self._edit_response(interaction, embed=self.trade_embed(trade))
+            return
+        
+        trade.settling = True
+        try:
+            success, message = await TradeManager.settle(trade.trade_id, trade.sides())
+        except Exception:
+            trade.settling = False
+            trade.changed()
+            raise
+        
+        if not success:
+            # Both sides have to look at the trade again before retrying
+            trade.settling = False
+            trade.changed()
+            await self._edit_response(interaction, embed=self.trade_embed(trade, notice=message))
+            return
+        
+        self.bot.trades.discard(trade.trade_id)
+        view = self.views.pop(trade.trade_id, None)
+        if view is not None:
+            view.stop()
+        if self.bot.garages:
+            for user_id in trade.user_ids:
+                self.bot.garages.invalidate(user_id)
+        
+        embed = self.trade_embed(trade, title="🤝 Trade Complete!", color=0x00ff00)
+        await self._edit_response(interaction, embed=embed, view=None)
+    
+    async def close(self, trade: Trade, title: str, color: int) -> bool:
+        """Drop a trade that will not be settled and take the buttons off its message"""
+        if self.bot.trades.get(trade.trade_id) is not trade or trade.settling:
+            return False
+        self.bot.trades.discard(trade.trade_id)
+        view = self.views.pop(trade.trade_id, None)
+        if view is not None:
+            view.stop()
+        await self._edit_message(
+            trade, embed=self.trade_embed(trade, title=title, color=color), view=None
+        )
+        return True
+    
+    @commands.Cog.listener()
+    async def on_trade_expired(self, trade: Trade):
+        """Close the message of a trade the table expired"""
+        view = self.views.pop(trade.trade_id, None)
+        if view is not None:
+            view.stop()
+        embed = self.trade_embed(trade, title="⌛ Trade Expired", color=0x808080)
+        await self._edit_message(trade, embed=embed, view=None)
+    
+    def trade_embed(
+        self,
+        trade: Trade,
+        title: str = "🤝 Trade",
+        color: Optional[int] = None,
+        notice: Optional[str] = None,
+    ) -> discord.Embed:
+        """Both offers of a trade, and whether each side confirmed"""
+        embed = discord.Embed(
+            title=title,
+            color=int(self.bot.config.default_embed_color, 16) if color is None else color
+        )
+        if self.bot.trades.get(trade.trade_id) is trade:
+            # Still open, say how to change it
+            prefix = self.bot.command_prefix
+            embed.description = (
+                f"Offer cars with `{prefix}trade add <car_name>` and coins with "
+                f"`{prefix}trade coins <amount>`, then both confirm.\n"
+                f"Expires <t:{int(trade.expires_at)}:R>"
+            )
+        
+        for offer in trade.offers:
+            lines = [f"<@{offer.user_id}>"]
+            lines.extend(f"🚗 {name}" for name in offer.cars.values())
+            if offer.coins:
+                lines.append(f"🪙 {offer.coins:,} coins")
+            if offer.empty:
+                lines.append("*Nothing yet*")
+            embed.add_field(
+                name="✅ Confirmed" if offer.confirmed else "⏳ Not confirmed",
+                value="\n".join(lines),
+                inline=True
+            )
+        
+        if notice:
+            embed.add_field(name="⚠️ Trade Failed", value=notice, inline=False)
+        return embed
+    
+    async def _open_trade(self, ctx) -> Optional[Trade]:
+        """The author's open trade, telling them when there is none or it can't change"""
+        trade = self.bot.trades.for_user(ctx.author.id)
+        if trade is None:
+            await ctx.send(
+                f"You have no open trade! Start one with `{self.bot.command_prefix}trade <user>`."
+            )
+            return None
+        if trade.settling:
+            await ctx.send("Your trade is being settled!")
+            return None
+        return trade
+    
+    async def _still_open(self, ctx, trade: Trade) -> bool:
+        if self.bot.trades.get(trade.trade_id) is trade and not trade.settling:
+            return True
+        await ctx.send("Your trade was closed in the meantime!")
+        return False
+    
+    async def _offer_changed(self, ctx, trade: Trade):
+        """Show the new offers and acknowledge the command"""
+        await self._edit_message(trade, embed=self.trade_embed(trade))
+        await self.bot.outbound.send(
+            Priority.REPLY, ctx.channel.id, functools.partial(ctx.message.add_reaction, "✅")
+        )
+    
+    async def _edit_message(self, trade: Trade, **kwargs):
+        if trade.message_id is None:
+            return
+        message = self.bot.get_partial_messageable(trade.channel_id).get_partial_message(
+            trade.message_id
+        )
+        try:
+            # Quick successive changes only need the last edit
+            await self.bot.outbound.send(
+                Priority.REPLY,
+                trade.channel_id,
+                functools.partial(message.edit, **kwargs),
+                coalesce_key=("trade", trade.trade_id),
+            )
+        except (SendDropped, discord.HTTPException) as exc:
+            logger.debug(f"Could not update trade {trade.trade_id}: {exc}")
+    
+    async def _edit_response(self, interaction: discord.Interaction, **kwargs):
+        await self.bot.outbound.send(
+            Priority.INTERACTION,
+            None,
+            functools.partial(interaction.response.edit_message, **kwargs)
+        )
+
+
+async def _answer(interaction: discord.Interaction, text: str):
+    """Reply to an interaction with a message only its user sees"""
+    await interaction.client.outbound.send(
+        Priority.INTERACTION,
+        None,
+        functools.partial(interaction.response.send_message, text, ephemeral=True)
+    )
+
+
+async def setup(bot):
+    """Extension entry point, called by bot.load_extension"""
+    await bot.add_cog(TradeCommands(bot))
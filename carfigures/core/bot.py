@@ -1,19 +1,75 @@
 """Main bot class"""
 
+import asyncio
+import functools
 import logging
-from typing import Optional
+import math
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence
 
 import discord
 from discord.ext import commands
 
-from carfigures.core.config import Config
-from carfigures.commands.coins import CoinsCommands
-from carfigures.commands.packs import PackCommands
-from carfigures.commands.general import GeneralCommands
-from carfigures.utils.coins import CoinManager
+from carfigures.core.cards import CardRenderer
+from carfigures.core.catalog import CarCatalog
+from carfigures.core.catchtiming import CatchTimingAnalyzer, snowflake_delay
+from carfigures.core.config import Config, SpawnMessage
+from carfigures.core import metrics
+from carfigures.core.context import current_operation, operation
+from carfigures.core.database import write_batcher
+from carfigures.core.economy import economy_stats
+from carfigures.core.events import EventScheduler
+from carfigures.core.garage import GarageRenderer
+from carfigures.core.guild_config import GuildConfigCache
+from carfigures.core.outbound import OutboundScheduler, Priority, SendDropped
+from carfigures.core.querycount import QUERY_DEBUG, QueryCounter
+from carfigures.core.ratelimit import RateLimited, RateLimiter
+from carfigures.core.shop import ShopCache
+from carfigures.core.spawn_targets import SpawnTargetResolver
+from carfigures.core.spawns import ClaimResult, SpawnState, SpawnTable, new_spawn_id
+from carfigures.core.startup import startup_timer
+from carfigures.core.trades import TradeTable
+from carfigures.core.watchdog import watchdog
+from carfigures.utils.catches import CatchManager
 
 logger = logging.getLogger(__name__)
 
+# Command modules, imported by setup_hook rather than when this module is imported,
+# so the import-time profile of carfigures.core.startup lists them on their own
+EXTENSIONS = (
+    "carfigures.commands.coins",
+    "carfigures.commands.packs",
+    "carfigures.commands.general",
+    "carfigures.commands.trades",
+    "carfigures.commands.settings",
+    "carfigures.commands.admin",
+)
+
+# Statements a single catch click may run, checked when CARFIGURESBOT_QUERY_DEBUG is set
+CATCH_QUERY_BUDGET = 8
+
+# How long a spawn can be caught, and how often expired spawns are cleaned up
+SPAWN_TIMEOUT = 60
+SPAWN_SWEEP_INTERVAL = 5.0
+SPAWN_SWEEP_BATCH = 50
+# Spawn rows are kept for a day after expiring, then purged by the sweeper
+SPAWN_RETENTION = 24 * 3600
+SPAWN_PURGE_INTERVAL = 3600
+# A spawn waits this long for its card before going out as a plain embed
+CARD_RENDER_TIMEOUT = 5.0
+
+
+class CarFiguresContext(commands.Context):
+    """Command context whose replies go through the outbound scheduler"""
+    
+    async def send(self, *args, **kwargs):
+        return await self.bot.outbound.send(
+            Priority.REPLY, self.channel.id, functools.partial(super().send, *args, **kwargs)
+        )
+
 
 class CarFiguresBot(commands.Bot):
     """Main CarFigures bot class"""
@@ -36,22 +92,158 @@ class CarFiguresBot(commands.Bot):
         # Message tracking for spawning
         self.message_counts = {}
         self.last_spawn = {}
+        # guild_id -> (settings the count was drawn from, messages needed this cycle)
+        self.required_messages = {}
+        self.guild_configs = GuildConfigCache(config.spawn_manager, config.guild_config)
+        self.spawn_targets = SpawnTargetResolver()
+        self.outbound = OutboundScheduler()
+        self.spawns = SpawnTable()
+        self.trades = TradeTable()
+        self.catalog = CarCatalog()
+        self.rate_limiter = RateLimiter(config.rate_limits)
+        self.catch_timing = CatchTimingAnalyzer(config.catch_timing)
+        self.shop = ShopCache()
+        self.events = EventScheduler(self, config.events)
+        self.cards: Optional[CardRenderer] = None
+        self.garages: Optional[GarageRenderer] = None
+        if config.cards.enabled:
+            self.cards = CardRenderer(
+                config.cards.cache_dir,
+                config.cards.memory_cache_size,
+                config.cards.workers,
+                config.cards.format,
+            )
+            # Garage pages are built from the cards, in the same worker pool
+            self.garages = GarageRenderer(
+                self.cards, config.cards.garage_cache_dir, config.cards.garage_cache_size
+            )
+        
+        self._metrics_task: Optional[asyncio.Task] = None
+        self._spawn_sweeper: Optional[asyncio.Task] = None
+        
+        # Invoke hooks run inside the command's own task, unlike on_command listeners
+        self.before_invoke(self._before_command)
+        self.after_invoke(self._after_command)
+        # Checks run before the invoke hooks, a rejected command does no work at all
+        self.add_check(self._check_rate_limit)
         
     async def setup_hook(self):
         """Setup bot extensions and commands"""
         logger.info("Setting up bot...")
         
         # Add cogs
-        await self.add_cog(CoinsCommands(self))
-        await self.add_cog(PackCommands(self))
-        await self.add_cog(GeneralCommands(self))
+        for extension in EXTENSIONS:
+            await self.load_extension(extension)
+        startup_timer.mark("extensions")
+        
+        # Spawns draw from the in-memory catalog, refreshed by the spawn sweeper
+        self.catalog = await CarCatalog.load()
+        # Overrides of every guild, so spawn checks never wait on the database
+        await self.guild_configs.refresh()
+        if self.cards:
+            self.cards.start()
+            self.garages.start()
+        
+        # Catch buttons are routed by custom_id, so they keep working across restarts
+        self.add_dynamic_items(CatchButton)
+        self._spawn_sweeper = asyncio.create_task(self._sweep_spawns())
+        
+        self.outbound.start()
         
+        # Group coin, catch and pack writes into shared commits, and their journal and
+        # catch rows into one INSERT each, on every backend
+        write_batcher.start()
+        economy_stats.start()
+        self.catch_timing.start()
+        self.events.start()
+        self.guild_configs.start()
+        
+        if self.config.prometheus.enabled and metrics.start_metrics_server(
+            self.config.prometheus.host, self.config.prometheus.port
+        ):
+            metrics.enable_query_metrics()
+            self._metrics_task = asyncio.create_task(metrics.sample_runtime(self))
+        
+        startup_timer.mark("setup")
         logger.info("Bot setup complete!")
     
+    async def close(self):
+        """Flush pending database writes before shutting down"""
+        if self._metrics_task:
+            self._metrics_task.cancel()
+        if self._spawn_sweeper:
+            self._spawn_sweeper.cancel()
+        await self.events.stop()
+        await self.guild_configs.stop()
+        await watchdog.stop()
+        await self.outbound.stop()
+        if self.cards:
+            await self.cards.stop()
+        try:
+            await economy_stats.stop()
+        except Exception:
+            logger.exception("Could not flush economy counters")
+        try:
+            await self.catch_timing.stop()
+        except Exception:
+            logger.exception("Could not flush catch timings")
+        await write_batcher.stop()
+        await self.rate_limiter.close()
+        await super().close()
+    
+    async def get_context(self, origin, /, *, cls=CarFiguresContext):
+        """Use the scheduled context for every command"""
+        return await super().get_context(origin, cls=cls)
+    
+    async def _check_rate_limit(self, ctx: commands.Context) -> bool:
+        """Reject commands over their rate limit, raises RateLimited"""
+        await self.rate_limiter.acquire(
+            ctx.command.qualified_name, ctx.author.id, ctx.guild.id if ctx.guild else None
+        )
+        return True
+    
+    async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
+        """Tell rate limited users to slow down, once in a while"""
+        if not isinstance(error, RateLimited):
+            await super().on_command_error(ctx, error)
+            return
+        if self.rate_limiter.should_warn(ctx.author.id):
+            await ctx.send(
+                f"Slow down! You can use `{ctx.prefix}{ctx.invoked_with}` again in "
+                f"{math.ceil(error.retry_after)} seconds."
+            )
+    
+    async def _before_command(self, ctx: commands.Context):
+        """Attribute the command's work to its name and start its timer"""
+        ctx.operation_token = current_operation.set(ctx.command.qualified_name)
+        ctx.query_counter = None
+        if QUERY_DEBUG:
+            ctx.query_counter = QueryCounter(
+                ctx.command.qualified_name,
+                budget=ctx.command.extras.get("query_budget"),
+                strict=QUERY_DEBUG == "strict",
+            ).__enter__()
+        ctx.started_at = time.perf_counter()
+    
+    async def _after_command(self, ctx: commands.Context):
+        """Record command latency and restore the previous operation"""
+        status = "error" if ctx.command_failed else "ok"
+        metrics.COMMAND_LATENCY.labels(ctx.command.qualified_name, status).observe(
+            time.perf_counter() - ctx.started_at
+        )
+        try:
+            if ctx.query_counter is not None:
+                ctx.query_counter.log()
+                ctx.query_counter.__exit__(None, None, None)
+        finally:
+            current_operation.reset(ctx.operation_token)
+    
     async def on_ready(self):
         """Called when bot is ready"""
         logger.info(f"Logged in as {self.user} (ID: {self.user.id})")
         logger.info(f"Connected to {len(self.guilds)} guilds")
+        if startup_timer.mark("ready"):
+            logger.info(f"Startup took {startup_timer.report()}")
         
         # Set bot status
         activity = discord.Activity(
@@ -60,6 +252,14 @@ class CarFiguresBot(commands.Bot):
         )
         await self.change_presence(activity=activity)
     
+    async def on_interaction(self, interaction: discord.Interaction):
+        """Route catch guesses by the custom_id of their form"""
+        if interaction.type is not discord.InteractionType.modal_submit:
+            return
+        guess = CatchGuess.from_interaction(interaction)
+        if guess is not None:
+            await guess.submit(interaction)
+    
     async def on_message(self, message: discord.Message):
         """Handle message events for spawning and commands"""
         if message.author.bot:
@@ -75,31 +275,46 @@ class CarFiguresBot(commands.Bot):
     async def _handle_spawning(self, message: discord.Message):
         """Handle car spawning based on message activity"""
         guild_id = message.guild.id
+        settings = self.guild_configs.get(guild_id)
         
-        # Initialize tracking for this guild
-        if guild_id not in self.message_counts:
-            self.message_counts[guild_id] = 0
-            self.last_spawn[guild_id] = None
+        # Messages sent during the cooldown don't count
+        last_spawn = self.last_spawn.get(guild_id)
+        if last_spawn is not None and time.monotonic() - last_spawn < settings.cooldown:
+            return
         
-        self.message_counts[guild_id] += 1
+        self.message_counts[guild_id] = self.message_counts.get(guild_id, 0) + 1
         
-        # Check if we should spawn (simplified logic for now)
-        required_messages = self.config.spawn_manager.required_message_range[1]
+        # Drawn once per cycle, and again when the guild's settings change
+        drawn = self.required_messages.get(guild_id)
+        if drawn is None or drawn[0] is not settings:
+            drawn = self.required_messages[guild_id] = (
+                settings, random.randint(*settings.message_range)
+            )
+        # Spawn boosts lower the bar
+        required_messages = max(1, round(drawn[1] / self.events.spawn_multiplier))
         
         if self.message_counts[guild_id] >= required_messages:
             # Check member requirement
             if len(message.guild.members) >= self.config.spawn_manager.minimum_members_required:
-                await self._spawn_car(message.channel)
+                channel = self.spawn_targets.resolve(message, settings.spawn_channels)
                 self.message_counts[guild_id] = 0
+                del self.required_messages[guild_id]
+                if channel is not None:
+                    # Set before sending, messages arriving meanwhile are in the cooldown
+                    self.last_spawn[guild_id] = time.monotonic()
+                    await self._spawn_car(channel)
     
     async def _spawn_car(self, channel: discord.TextChannel):
         """Spawn a car in the channel"""
-        import random
+        car = self.catalog.sample()
+        if car is None:
+            logger.warning("No car can spawn, the catalog is empty")
+            return
+        # Render before the spawn clock starts, cached cards come back immediately
+        card = await self._spawn_card(car)
         
         # Select spawn message based on rarity
-        spawn_messages = self.config.spawn_manager.spawn_messages
-        weights = [msg.rarity for msg in spawn_messages]
-        selected_msg = random.choices(spawn_messages, weights=weights)[0]
+        selected_msg = pick_message(self.config.spawn_manager.spawn_messages)
         
         # Create spawn embed
         embed = discord.Embed(
@@ -109,53 +324,377 @@ class CarFiguresBot(commands.Bot):
         )
         
         # Select catch button message
-        button_messages = self.config.spawn_manager.catch_button_messages
-        button_weights = [msg.rarity for msg in button_messages]
-        button_msg = random.choices(button_messages, weights=button_weights)[0]
+        button_msg = pick_message(self.config.spawn_manager.catch_button_messages)
         
-        # Create view with catch button
-        view = CarCatchView(self, selected_msg.rarity)
+        # The button carries the spawn, no view object is kept around
+        spawn = SpawnState(
+            new_spawn_id(), channel.id, int(time.time()) + SPAWN_TIMEOUT, car.rarity,
+            car_id=car.id,
+        )
+        view = discord.ui.View(timeout=None)
+        view.add_item(CatchButton(spawn.spawn_id, int(spawn.expires_at), button_msg.message))
         
+        # The row must exist before anyone can click, catches are claimed against it
         try:
-            await channel.send(embed=embed, view=view)
+            await CatchManager.record_spawn(
+                spawn.spawn_id, channel.guild.id, channel.id, car.id, spawn.expires_at
+            )
+        except Exception:
+            logger.exception(f"Could not record spawn in {channel.guild.name}#{channel.name}")
+            return
+        self.spawns.add(spawn)
+        
+        send = functools.partial(channel.send, embed=embed, view=view)
+        if card is not None:
+            embed.set_image(url=f"attachment://{self.cards.filename}")
+            send = functools.partial(send, file=self.cards.file(card))
+        
+        try:
+            # Lowest priority, a newer spawn for the same channel replaces a waiting one
+            message = await self.outbound.send(
+                Priority.SPAWN, channel.id, send, coalesce_key=channel.id
+            )
+            spawn.message_id = message.id
+            metrics.SPAWNS.labels(metrics.guild_bucket(channel.guild.member_count)).inc()
+            self.spawn_targets.mark_success(channel.id)
             logger.info(f"Spawned car in {channel.guild.name}#{channel.name}")
+        except SendDropped as exc:
+            self.spawns.discard(spawn.spawn_id)
+            logger.debug(f"Dropped spawn in {channel.guild.name}#{channel.name}: {exc}")
         except discord.Forbidden:
-            logger.warning(f"Cannot send message in {channel.guild.name}#{channel.name}")
+            self.spawns.discard(spawn.spawn_id)
+            self.spawn_targets.quarantine(channel)
+    
+    async def spawn_car_id(
+        self, spawn_id: int, expires_at: int, channel_id: Optional[int]
+    ) -> Optional[int]:
+        """
+        Car of a spawn, None once it is purged
+        Spawns this process did not send, before a restart or by another process, are
+        read from their row once and then tracked like the others until they expire.
+        """
+        state = self.spawns.get(spawn_id)
+        if state is not None and state.car_id is not None:
+            return state.car_id
+        car_id = await CatchManager.spawn_car_id(spawn_id)
+        if car_id is None:
+            return None
+        if state is not None:
+            state.car_id = car_id
+        elif time.time() < expires_at:
+            self.spawns.add(SpawnState(spawn_id, channel_id, expires_at, car_id=car_id))
+        return car_id
+    
+    async def _spawn_card(self, car) -> Optional[bytes]:
+        """Rendered card of a car, None to spawn without one"""
+        if self.cards is None:
+            return None
+        try:
+            return await asyncio.wait_for(self.cards.get(car), CARD_RENDER_TIMEOUT)
+        except Exception as exc:
+            logger.warning(f"Spawning car {car.id} without a card: {exc!r}")
+            return None
+    
+    async def _sweep_spawns(self):
+        """Periodically disable the buttons of spawns nobody caught in time, and expire trades"""
+        last_purge = time.monotonic()
+        while True:
+            await asyncio.sleep(SPAWN_SWEEP_INTERVAL)
+            if time.monotonic() - last_purge >= SPAWN_PURGE_INTERVAL:
+                last_purge = time.monotonic()
+                asyncio.create_task(self._purge_spawns())
+                asyncio.create_task(self._refresh_catalog())
+            for spawn in self.spawns.pop_expired(limit=SPAWN_SWEEP_BATCH):
+                if spawn.message_id is None:
+                    continue
+                message = self.get_partial_messageable(spawn.channel_id).get_partial_message(
+                    spawn.message_id
+                )
+                task = self.outbound.send(
+                    Priority.SPAWN,
+                    spawn.channel_id,
+                    functools.partial(message.edit, view=disabled_catch_view()),
+                )
+                asyncio.create_task(self._expire_spawn_message(task))
+            # The trade cog closes the messages of trades nobody settled in time
+            for trade in self.trades.pop_expired(limit=SPAWN_SWEEP_BATCH):
+                self.dispatch("trade_expired", trade)
+    
+    @staticmethod
+    async def _purge_spawns():
+        before = datetime.now(timezone.utc) - timedelta(seconds=SPAWN_RETENTION)
+        try:
+            purged = await CatchManager.purge_spawns(before)
+        except Exception:
+            logger.exception("Could not purge old spawns")
+        else:
+            logger.debug(f"Purged {purged} old spawns")
+    
+    async def _refresh_catalog(self):
+        try:
+            await self.catalog.refresh()
+        except Exception:
+            logger.exception("Could not refresh the car catalog")
+    
+    @staticmethod
+    async def _expire_spawn_message(send):
+        try:
+            await send
+        except (SendDropped, discord.HTTPException) as exc:
+            logger.debug(f"Could not disable an expired spawn: {exc}")
+    
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ):
+        """Recompute spawn permissions when overwrites change"""
+        if isinstance(after, discord.CategoryChannel):
+            # Synced children inherit the category's overwrites
+            for channel in after.channels:
+                self.spawn_targets.invalidate_channel(channel.id)
+        self.spawn_targets.invalidate_channel(after.id)
+    
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        """Forget spawn state of deleted channels"""
+        self.spawn_targets.forget_channel(channel.id)
+    
+    async def on_guild_role_create(self, role: discord.Role):
+        """Recompute spawn permissions of the role's guild"""
+        self.spawn_targets.invalidate_guild(role.guild)
+    
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        """Recompute spawn permissions of the role's guild"""
+        self.spawn_targets.invalidate_guild(after.guild)
+    
+    async def on_guild_role_delete(self, role: discord.Role):
+        """Recompute spawn permissions of the role's guild"""
+        self.spawn_targets.invalidate_guild(role.guild)
+    
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        """Recompute spawn permissions when the bot's own roles change"""
+        if after.id == self.user.id and before.roles != after.roles:
+            self.spawn_targets.invalidate_guild(after.guild)
+    
+    async def on_guild_remove(self, guild: discord.Guild):
+        """Forget spawn state of guilds the bot left"""
+        self.spawn_targets.forget_guild(guild)
+
+
+def pick_message(messages: Sequence[SpawnMessage]) -> SpawnMessage:
+    """Random message, weighted by its rarity"""
+    return random.choices(messages, weights=[msg.rarity for msg in messages])[0]
+
 
+def disabled_catch_view(label: str = "Catch Me!") -> discord.ui.View:
+    """Finished view showing a greyed out catch button"""
+    view = discord.ui.View(timeout=None)
+    view.add_item(discord.ui.Button(
+        label=label, style=discord.ButtonStyle.primary, emoji="🚗", disabled=True
+    ))
+    # A stopped view is not registered in the view store when sent
+    view.stop()
+    return view
 
-class CarCatchView(discord.ui.View):
-    """View for catching cars"""
+
+class CatchButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"cf:catch:(?P<spawn_id>[0-9a-z]+):(?P<expires_at>[0-9]+)",
+):
+    """
+    Catch button routed by custom_id instead of a live view per spawn
+    The car stays server-side, looked up by spawn id, so the message does not give it away.
+    """
+    
+    def __init__(self, spawn_id: int, expires_at: int, label: str = "Catch Me!"):
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=discord.ButtonStyle.primary,
+            emoji="🚗",
+            custom_id=f"cf:catch:{_base36(spawn_id)}:{expires_at}",
+        ))
+        self.spawn_id = spawn_id
+        self.expires_at = expires_at
     
-    def __init__(self, bot: CarFiguresBot, rarity: float):
-        super().__init__(timeout=60.0)
-        self.bot = bot
-        self.rarity = rarity
-        self.caught = False
+    @classmethod
+    async def from_custom_id(
+        cls, interaction: discord.Interaction, item: discord.ui.Button, match
+    ) -> "CatchButton":
+        return cls(int(match["spawn_id"], 36), int(match["expires_at"]), item.label)
     
-    @discord.ui.button(label="Catch Me!", style=discord.ButtonStyle.primary, emoji="🚗")
-    async def catch_car(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def callback(self, interaction: discord.Interaction):
+        """Ask for the car's name, unless the spawn is already gone"""
+        started_at = time.perf_counter()
+        try:
+            bot: CarFiguresBot = interaction.client
+            try:
+                await bot.rate_limiter.acquire("catch", interaction.user.id, interaction.guild_id)
+            except RateLimited as exc:
+                await _answer(
+                    interaction,
+                    f"Slow down! You can try again in {math.ceil(exc.retry_after)} seconds."
+                )
+                return
+            bot.catch_timing.record_click(
+                interaction.user.id,
+                snowflake_delay(_spawn_message_id(interaction, self.spawn_id), interaction.id),
+            )
+            result = bot.spawns.status(self.spawn_id, self.expires_at)
+            if result is None:
+                car_id = await bot.spawn_car_id(
+                    self.spawn_id, self.expires_at, interaction.channel_id
+                )
+                if car_id is None or bot.catalog.get(car_id) is None:
+                    result = ClaimResult.EXPIRED  # Purged, or the car was removed since
+            
+            if result is not None:
+                await _answer_missed(interaction, result)
+            else:
+                await bot.outbound.send(
+                    Priority.INTERACTION,
+                    None,
+                    functools.partial(
+                        interaction.response.send_modal,
+                        CatchModal(self.spawn_id, self.expires_at, interaction.id),
+                    )
+                )
+        finally:
+            metrics.INTERACTION_LATENCY.labels("catch_button").observe(
+                time.perf_counter() - started_at
+            )
+
+
+class CatchModal(discord.ui.Modal, title="Catch this car!"):
+    """
+    Name guess form for a spawn
+    The form only carries the spawn in its custom_id, submissions are routed by that
+    custom_id through CarFiguresBot.on_interaction, so names typed across a restart
+    still count.
+    """
+    
+    name = discord.ui.TextInput(label="Name of this car", max_length=255)
+    
+    def __init__(self, spawn_id: int, expires_at: int, clicked_id: int):
+        # The click that opened the form times the typing
+        super().__init__(
+            timeout=max(1.0, expires_at - time.time()),
+            custom_id=f"cf:guess:{_base36(spawn_id)}:{expires_at}:{_base36(clicked_id)}",
+        )
+
+
+class CatchGuess:
+    """A submitted name guess, the first right answer catches the spawn"""
+    
+    CUSTOM_ID = re.compile(
+        r"cf:guess:(?P<spawn_id>[0-9a-z]+):(?P<expires_at>[0-9]+):(?P<clicked_id>[0-9a-z]+)"
+    )
+    
+    def __init__(self, spawn_id: int, expires_at: int, clicked_id: int, name: str):
+        self.spawn_id = spawn_id
+        self.expires_at = expires_at
+        self.clicked_id = clicked_id  # Snowflake of the click that opened the form
+        self.name = name
+    
+    @classmethod
+    def from_interaction(cls, interaction: discord.Interaction) -> Optional["CatchGuess"]:
+        """The guess a modal submission carries, None if it is not a catch form"""
+        data = interaction.data or {}
+        match = cls.CUSTOM_ID.fullmatch(data.get("custom_id", ""))
+        if match is None:
+            return None
+        values = _text_values(data.get("components", ()))
+        return cls(
+            int(match["spawn_id"], 36),
+            int(match["expires_at"]),
+            int(match["clicked_id"], 36),
+            values[0] if values else "",
+        )
+    
+    async def submit(self, interaction: discord.Interaction):
         """Handle car catch attempt"""
-        if self.caught:
-            await interaction.response.send_message(
-                "This car has already been caught!", 
-                ephemeral=True
+        started_at = time.perf_counter()
+        try:
+            with operation("catch"):
+                if QUERY_DEBUG:
+                    with QueryCounter("catch", budget=CATCH_QUERY_BUDGET) as counter:
+                        await self._handle_catch(interaction)
+                    counter.log()
+                else:
+                    await self._handle_catch(interaction)
+        finally:
+            metrics.INTERACTION_LATENCY.labels("catch").observe(time.perf_counter() - started_at)
+    
+    async def _handle_catch(self, interaction: discord.Interaction):
+        """Award the car to the first user who names it"""
+        bot: CarFiguresBot = interaction.client
+        car_id = await bot.spawn_car_id(self.spawn_id, self.expires_at, interaction.channel_id)
+        car = bot.catalog.get(car_id) if car_id is not None else None
+        if car is None:
+            await _answer_missed(interaction, ClaimResult.EXPIRED)
+            return
+        
+        if not car.matches(self.name):
+            wrong_msg = pick_message(bot.config.spawn_manager.wrong_name_messages)
+            await bot.outbound.send(
+                Priority.INTERACTION,
+                None,
+                functools.partial(
+                    interaction.response.send_message, wrong_msg.message, ephemeral=True
+                )
             )
             return
         
-        self.caught = True
+        user_id = interaction.user.id
+        bot.catch_timing.record_typing(user_id, snowflake_delay(self.clicked_id, interaction.id))
+        since_spawn = snowflake_delay(_spawn_message_id(interaction, self.spawn_id), interaction.id)
+        if bot.catch_timing.is_held_back(user_id, since_spawn):
+            # Shadow limit, a flagged user is not told they were held back
+            await _answer_missed(interaction, ClaimResult.ALREADY_CAUGHT)
+            return
         
-        # Award coins for catching
-        config = self.bot.config.coin_config
-        coins_earned = await CoinManager.reward_catch(
+        # Guesses on a spawn this process already saw caught or expired never reach the DB
+        result, _ = bot.spawns.claim(
+            self.spawn_id,
             interaction.user.id,
-            config.catch_reward_base,
-            config.catch_reward_bonus_range
+            self.expires_at,
+            interaction.channel_id,
+            interaction.message.id if interaction.message else None,
         )
+        if result is not ClaimResult.CLAIMED:
+            await _answer_missed(interaction, result)
+            return
+        
+        # The database arbitrates between processes and awards the catch in the same write
+        config = bot.config.coin_config
+        reward_multiplier = bot.events.reward_multiplier
+        if interaction.guild_id is not None:
+            reward_multiplier *= bot.guild_configs.get(interaction.guild_id).reward_multiplier
+        try:
+            caught = await CatchManager.claim_catch(
+                self.spawn_id,
+                car.id,
+                interaction.user.id,
+                round(config.catch_reward_base * reward_multiplier),
+                config.catch_reward_bonus_range,
+                bot.config.spawn_manager.catch_bonus_rate,
+            )
+        except Exception:
+            bot.spawns.release(self.spawn_id)
+            raise
+        
+        if caught is None:
+            # Another process won, the spawn stays marked as caught locally
+            await _answer_missed(interaction, ClaimResult.ALREADY_CAUGHT)
+            return
+        coins_earned, _ = caught
+        if bot.garages:
+            bot.garages.invalidate(user_id)
+        
+        if interaction.guild:
+            metrics.CATCHES.labels(metrics.guild_bucket(interaction.guild.member_count)).inc()
         
         # Create success embed
         embed = discord.Embed(
             title="🎉 Car Caught!",
-            description=f"{interaction.user.mention} caught the Aston Martin!",
+            description=f"{interaction.user.mention} caught the **{car.name}**!",
             color=0x00ff00
         )
         embed.add_field(
@@ -163,16 +702,72 @@ class CarCatchView(discord.ui.View):
             value=f"+{coins_earned} coins",
             inline=True
         )
+        if interaction.message and interaction.message.attachments:
+            # The spawn card stays attached, keep showing it
+            embed.set_image(url=f"attachment://{interaction.message.attachments[0].filename}")
         
         # Disable button
-        button.disabled = True
-        await interaction.response.edit_message(embed=embed, view=self)
-        
-        # Stop the view
-        self.stop()
-    
-    async def on_timeout(self):
-        """Handle view timeout"""
-        # Disable all buttons
-        for item in self.children:
-            item.disabled = True
\ No newline at end of file
+        await bot.outbound.send(
+            Priority.INTERACTION,
+            None,
+            functools.partial(
+                interaction.response.edit_message,
+                embed=embed,
+                view=disabled_catch_view(_catch_label(interaction))
+            )
+        )
+
+
+def _spawn_message_id(interaction: discord.Interaction, spawn_id: int) -> int:
+    """Snowflake of the spawn message, the spawn id when the message is not known"""
+    return interaction.message.id if interaction.message else spawn_id
+
+
+def _catch_label(interaction: discord.Interaction) -> str:
+    """Label of the catch button on the spawn message, kept when disabling it"""
+    if interaction.message:
+        for row in interaction.message.components:
+            for component in getattr(row, "children", ()):
+                if (getattr(component, "custom_id", None) or "").startswith("cf:catch:"):
+                    return component.label or "Catch Me!"
+    return "Catch Me!"
+
+
+def _text_values(components) -> List[str]:
+    """Values of the text inputs in a submitted modal, in order"""
+    values = []
+    for component in components:
+        if component.get("type") == 4:
+            values.append(component.get("value", ""))
+        values.extend(_text_values(component.get("components", ())))
+        if "component" in component:
+            values.extend(_text_values([component["component"]]))
+    return values
+
+
+async def _answer_missed(interaction: discord.Interaction, result: ClaimResult):
+    """Tell a user the spawn is already gone"""
+    text = (
+        "This car has already been caught!"
+        if result is ClaimResult.ALREADY_CAUGHT
+        else "This car has already driven away!"
+    )
+    await _answer(interaction, text)
+
+
+async def _answer(interaction: discord.Interaction, text: str):
+    """Reply to an interaction with a message only its user sees"""
+    await interaction.client.outbound.send(
+        Priority.INTERACTION,
+        None,
+        functools.partial(interaction.response.send_message, text, ephemeral=True)
+    )
+
+
+def _base36(number: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 36)
+        encoded = digits[remainder] + encoded
+    return encoded or "0"
@@ -0,0 +1,273 @@
+"""Spawn card rendering with a process pool and a two-level cache"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+import aiohttp
+import discord
+from cachetools import LRUCache
+
+from carfigures.core.catalog import CatalogCar
+from carfigures.core.metrics import record_cache_lookup
+from carfigures.models import Car
+
+logger = logging.getLogger(__name__)
+
+CARD_SIZE = (800, 500)
+# (highest rarity value, tier name, frame color), lower rarity = rarer, same tiers as packs
+RARITY_TIERS = (
+    (1.0, "LEGENDARY", (241, 196, 15)),
+    (2.0, "EPIC", (155, 89, 182)),
+    (5.0, "RARE", (52, 152, 219)),
+    (float("inf"), "COMMON", (149, 165, 166)),
+)
+
+ImageSource = Union[bytes, str, None]
+
+
+def rarity_tier(rarity: float):
+    """Tier name and frame color for a rarity value"""
+    for threshold, name, color in RARITY_TIERS:
+        if rarity <= threshold:
+            return name, color
+    return RARITY_TIERS[-1][1:]
+
+
+def render_card(
+    car: Dict[str, Any], image: ImageSource, logo: ImageSource, path: str, fmt: str
+) -> bytes:
+    """
+    Composite a spawn card and write it to `path`
+    Runs in a worker process. The car name is left out, catching means guessing it.
+    """
+    from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+    width, height = CARD_SIZE
+    tier, color = rarity_tier(car["rarity"])
+    card = Image.new("RGB", CARD_SIZE, (24, 26, 31))
+    draw = ImageDraw.Draw(card)
+
+    # Rarity frame
+    draw.rectangle((0, 0, width - 1, height - 1), outline=color, width=10)
+    draw.rectangle((10, 10, 190, 48), fill=color)
+    draw.text((22, 16), tier, fill=(0, 0, 0), font=ImageFont.load_default(24))
+
+    picture = _open_image(image)
+    if picture is not None:
+        picture = ImageOps.contain(picture.convert("RGBA"), (width - 60, height - 170))
+        card.paste(picture, ((width - picture.width) // 2, 60), picture)
+
+    badge = _open_image(logo)
+    if badge is not None:
+        badge = ImageOps.contain(badge.convert("RGBA"), (64, 64))
+        card.paste(badge, (width - 20 - badge.width, 20), badge)
+
+    # Stats strip
+    draw.rectangle((10, height - 100, width - 11, height - 11), fill=(36, 39, 46))
+    stats = f"{car['horsepower']} HP   |   {car['weight']} KG   |   {car['year']}"
+    font = ImageFont.load_default(30)
+    draw.text((width // 2, height - 70), stats, fill=(255, 255, 255), font=font, anchor="mm")
+    draw.text(
+        (width // 2, height - 35), car["type"], fill=color,
+        font=ImageFont.load_default(22), anchor="mm"
+    )
+
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        card.save(buffer, "WEBP", quality=85, method=4)
+    else:
+        card.save(buffer, "PNG", optimize=True)
+    data = buffer.getvalue()
+
+    # Atomic write, then drop cards of older revisions of the same car
+    target = Path(path)
+    write_atomic(target, data)
+    for old in target.parent.glob(f"{car['id']}-*.{fmt}"):
+        if old != target:
+            old.unlink(missing_ok=True)
+    return data
+
+
+def write_atomic(target: Path, data: bytes):
+    """
+    Write a file so readers only ever see it whole
+    The partial file has a unique name, so workers or processes writing the same
+    target at once never write into each other's file before replacing it.
+    """
+    partial = tempfile.NamedTemporaryFile(
+        dir=target.parent, prefix=f".{target.name}.", suffix=".tmp", delete=False
+    )
+    try:
+        with partial:
+            partial.write(data)
+        os.replace(partial.name, target)
+    except BaseException:
+        Path(partial.name).unlink(missing_ok=True)
+        raise
+
+
+def _open_image(source: ImageSource):
+    from PIL import Image
+
+    if source is None:
+        return None
+    try:
+        if isinstance(source, bytes):
+            return Image.open(io.BytesIO(source))
+        return Image.open(source)
+    except (OSError, ValueError):
+        return None
+
+
+class CardRenderer:
+    """
+    Render spawn cards off the event loop and cache them
+    Cards are keyed by car id and `updated_at`, so editing a car renders a new card.
+    Hits are served from an in-memory LRU, then from disk, and only then rendered.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "cache/cards",
+        memory_size: int = 128,
+        workers: int = 2,
+        fmt: str = "webp",
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers
+        self.fmt = "png" if fmt == "png" else "webp"
+        self._memory: LRUCache = LRUCache(maxsize=memory_size)
+        self._rendering: Dict[str, asyncio.Task] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def filename(self) -> str:
+        """Attachment name, embeds refer to it with attachment://"""
+        return f"card.{self.fmt}"
+
+    def start(self):
+        """Create the cache directory and the worker pool"""
+        if self._pool is not None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # The bot runs threads (logging, watchdog), never fork it
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    async def stop(self):
+        """Shut the worker pool and the HTTP session down"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def key(self, car: CatalogCar) -> str:
+        """Cache key of the current revision of a car"""
+        return f"{car.id}-{int(car.updated_at.timestamp())}"
+
+    def path(self, car: CatalogCar) -> Path:
+        """Where the card of the current revision of a car is cached on disk"""
+        return self.cache_dir / f"{self.key(car)}.{self.fmt}"
+
+    async def run(self, function: Callable[..., Any], *args) -> Any:
+        """Run a picklable function in the worker pool, for other renderers sharing it"""
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._pool, function, *args)
+
+    def file(self, data: bytes) -> discord.File:
+        """Attachment for a card, BytesIO shares the immutable buffer instead of copying it"""
+        return discord.File(io.BytesIO(data), filename=self.filename)
+
+    async def get(self, car: CatalogCar) -> bytes:
+        """Card for a car, rendering it if no cache has it"""
+        key = self.key(car)
+        data = self._memory.get(key)
+        record_cache_lookup("cards", data is not None)
+        if data is not None:
+            return data
+
+        # Concurrent spawns of the same car share one render, which outlives its waiters
+        task = self._rendering.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load_or_render(car, key))
+            self._rendering[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        del self._rendering[key]
+        if not task.cancelled() and task.exception() is None:
+            self._memory[key] = task.result()
+
+    async def warm(self, cars: Iterable[CatalogCar]) -> int:
+        """Render every card missing from the caches, returns how many failed"""
+        self.start()
+        limit = asyncio.Semaphore(self.workers * 2)
+
+        async def warm_one(car: CatalogCar) -> bool:
+            async with limit:
+                try:
+                    await self.get(car)
+                    return True
+                except Exception:
+                    logger.exception(f"Could not render the card of car {car.id}")
+                    return False
+
+        results = await asyncio.gather(*(warm_one(car) for car in cars))
+        return results.count(False)
+
+    def stats(self) -> Dict[str, int]:
+        """Cache sizes for the team commands"""
+        on_disk = sum(1 for _ in self.cache_dir.glob(f"*.{self.fmt}"))
+        return {"memory": len(self._memory), "disk": on_disk, "rendering": len(self._rendering)}
+
+    async def _load_or_render(self, car: CatalogCar, key: str) -> bytes:
+        loop = asyncio.get_running_loop()
+        path = self.path(car)
+        try:
+            return await loop.run_in_executor(None, path.read_bytes)
+        except FileNotFoundError:
+            pass
+
+        row = await Car.get(id=car.id)
+        image = await self._fetch(row.image_url)
+        logo = await self._fetch(row.logo_url)
+        fields = {
+            "id": row.id,
+            "rarity": row.rarity,
+            "horsepower": row.horsepower,
+            "weight": row.weight,
+            "year": row.year,
+            "type": row.type,
+        }
+        logger.debug(f"Rendering the card of car {car.id}")
+        return await self.run(render_card, fields, image, logo, str(path), self.fmt)
+
+    async def _fetch(self, url: Optional[str]) -> ImageSource:
+        """Download remote images here, local uploads are opened by the worker"""
+        if not url:
+            return None
+        if not url.startswith(("http://", "https://")):
+            # Panel uploads are stored as /static/uploads/..., relative to the working directory
+            return url[1:] if url.startswith("/static/") else url
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        try:
+            async with self._session.get(url) as response:
+                response.raise_for_status()
+                return await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            logger.warning(f"Could not download {url}: {exc}")
+            return None
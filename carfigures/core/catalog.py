@@ -0,0 +1,97 @@
+"""In-memory car catalog with constant time rarity-weighted sampling"""
+
+import logging
+import random
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from carfigures.models import Car
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCar(NamedTuple):
+    """The few car columns spawning and catching need"""
+    id: int
+    name: str
+    model: str
+    rarity: float
+    updated_at: datetime
+
+    def matches(self, guess: str) -> bool:
+        """Whether a catch guess names this car"""
+        guess = guess.strip().casefold()
+        return guess in (self.name.casefold(), self.model.casefold())
+
+
+class CarCatalog:
+    """
+    Cars that can spawn, weighted by `Car.rarity` (lower = rarer)
+    Sampling uses Vose's alias method, so picking a car costs the same whatever the
+    size of the catalog. The tables are rebuilt on refresh.
+    """
+
+    def __init__(self, cars: Sequence[CatalogCar] = ()):
+        self._cars: List[CatalogCar] = []
+        self._by_id: Dict[int, CatalogCar] = {}
+        self._prob: List[float] = []
+        self._alias: List[int] = []
+        self._build(cars)
+
+    def __len__(self) -> int:
+        return len(self._cars)
+
+    @classmethod
+    async def load(cls) -> "CarCatalog":
+        """Build a catalog from the database"""
+        catalog = cls()
+        await catalog.refresh()
+        return catalog
+
+    async def refresh(self):
+        """Reload the cars from the database"""
+        rows = await Car.all().values_list("id", "name", "model", "rarity", "updated_at")
+        self._build([CatalogCar(*row) for row in rows])
+        logger.info(f"Loaded {len(self._cars)} cars into the spawn catalog")
+
+    def cars(self) -> List[CatalogCar]:
+        """Every car that can spawn"""
+        return list(self._cars)
+
+    def get(self, car_id: int) -> Optional[CatalogCar]:
+        """Car by id, None if it is not in the catalog"""
+        return self._by_id.get(car_id)
+
+    def sample(self) -> Optional[CatalogCar]:
+        """Draw a car with probability proportional to its rarity"""
+        if not self._cars:
+            return None
+        column = random.randrange(len(self._cars))
+        if random.random() < self._prob[column]:
+            return self._cars[column]
+        return self._cars[self._alias[column]]
+
+    def _build(self, cars: Sequence[CatalogCar]):
+        cars = [car for car in cars if car.rarity > 0]
+        count = len(cars)
+        prob = [0.0] * count
+        alias = [0] * count
+        if count:
+            total = sum(car.rarity for car in cars)
+            scaled = [car.rarity * count / total for car in cars]
+            small = [i for i, weight in enumerate(scaled) if weight < 1]
+            large = [i for i, weight in enumerate(scaled) if weight >= 1]
+            while small and large:
+                less, more = small.pop(), large.pop()
+                prob[less] = scaled[less]
+                alias[less] = more
+                scaled[more] -= 1 - scaled[less]
+                (small if scaled[more] < 1 else large).append(more)
+            # Whatever is left is 1 up to rounding errors
+            for i in small + large:
+                prob[i] = 1.0
+
+        self._cars = cars
+        self._by_id = {car.id: car for car in cars}
+        self._prob = prob
+        self._alias = alias
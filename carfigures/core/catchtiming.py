@@ -0,0 +1,287 @@
+"""Reaction times of catchers and the flags raised by implausible ones"""
+
+import asyncio
+import logging
+import math
+from array import array
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+
+from cachetools import LRUCache
+
+from carfigures.core.config import CatchTimingConfig
+from carfigures.core.database import write_batcher
+from carfigures.models import CatchTiming
+
+logger = logging.getLogger(__name__)
+
+# Bucket 0 holds everything under FIRST_EDGE, then each bucket is GROWTH times wider
+# than the last up to about a minute (the spawn timeout), the last one is open ended
+FIRST_EDGE = 0.05
+GROWTH = 1.35
+BUCKETS = 26
+_LOG_GROWTH = math.log(GROWTH)
+# Counts are halved once a histogram holds this many, so recent behaviour weighs most
+MAX_SAMPLES = 512
+
+FLUSH_INTERVAL = 60.0
+
+
+def bucket_of(seconds: float) -> int:
+    """Histogram bucket of a duration"""
+    if seconds < FIRST_EDGE:
+        return 0
+    return min(BUCKETS - 1, 1 + int(math.log(seconds / FIRST_EDGE) / _LOG_GROWTH))
+
+
+def bucket_bounds(index: int) -> Tuple[float, float]:
+    """Lower and upper duration of a bucket, the last one is capped at twice its lower"""
+    if index == 0:
+        return 0.0, FIRST_EDGE
+    low = FIRST_EDGE * GROWTH ** (index - 1)
+    return low, low * (2 if index == BUCKETS - 1 else GROWTH)
+
+
+def snowflake_delay(earlier: int, later: int) -> float:
+    """Seconds between two Discord snowflakes, taken from Discord's clock rather than ours"""
+    return ((later >> 22) - (earlier >> 22)) / 1000
+
+
+class Histogram:
+    """Fixed log spaced histogram of durations, adding one is O(1)"""
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self, counts: Iterable[int] = ()):
+        self.counts = array("I", counts)
+        if len(self.counts) != BUCKETS:
+            # New, or written with another bucket layout
+            self.counts = array("I", [0]) * BUCKETS
+        self.total = sum(self.counts)
+
+    def add(self, seconds: float):
+        self.counts[bucket_of(seconds)] += 1
+        self.total += 1
+        if self.total >= MAX_SAMPLES:
+            for index, count in enumerate(self.counts):
+                self.counts[index] = count // 2
+            self.total = sum(self.counts)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile, interpolated geometrically within its bucket"""
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low, high = bucket_bounds(index)
+                fraction = (rank - seen) / count
+                if index == 0:
+                    return high * fraction
+                return low * (high / low) ** fraction
+            seen += count
+        return bucket_bounds(BUCKETS - 1)[1]
+
+    def share_below(self, seconds: float) -> float:
+        """Share of durations in buckets entirely below `seconds`"""
+        if not self.total:
+            return 0.0
+        return sum(self.counts[:bucket_of(seconds)]) / self.total
+
+
+class UserTiming:
+    """What is kept per user, two histograms of BUCKETS counters"""
+
+    __slots__ = ("clicks", "typing", "reasons", "flagged_at")
+
+    def __init__(self, clicks: Iterable[int] = (), typing: Iterable[int] = ()):
+        self.clicks = Histogram(clicks)
+        self.typing = Histogram(typing)
+        self.reasons: Tuple[str, ...] = ()
+        self.flagged_at: Optional[datetime] = None
+
+
+class CatchTimingAnalyzer:
+    """
+    Spawn to click and click to name times of every catcher
+    Each catch adds to two fixed histograms per user and re-checks them, a constant
+    amount of work whatever the history. A user is flagged when too many clicks are
+    faster than a human reads, when clicks are too regular, or when names are typed
+    in too fast. Histograms are flushed to catch_timings for the panel, flagged users
+    can be held back from catching in the first seconds of a spawn.
+    """
+
+    def __init__(self, config: CatchTimingConfig, flush_interval: float = FLUSH_INTERVAL):
+        self.config = config
+        self.flush_interval = flush_interval
+        self._users: LRUCache = LRUCache(maxsize=config.max_users)
+        # Kept apart from the LRU, an evicted user stays flagged
+        self.flagged: Set[int] = set()
+        self._dirty: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, user_id: int) -> Optional[UserTiming]:
+        return self._users.get(user_id)
+
+    def _timing(self, user_id: int) -> UserTiming:
+        timing = self._users.get(user_id)
+        if timing is None:
+            timing = self._users[user_id] = UserTiming()
+        self._dirty.add(user_id)
+        return timing
+
+    # Recording
+
+    def record_click(self, user_id: int, seconds: float):
+        """Time from a spawn being sent to the user clicking its catch button"""
+        if self.config.enabled:
+            timing = self._timing(user_id)
+            timing.clicks.add(seconds)
+            self._check(user_id, timing)
+
+    def record_typing(self, user_id: int, seconds: float):
+        """Time from the click to the right name being submitted"""
+        if self.config.enabled:
+            timing = self._timing(user_id)
+            timing.typing.add(seconds)
+            self._check(user_id, timing)
+
+    def reasons(self, timing: UserTiming) -> Tuple[str, ...]:
+        """Why a user's timings look automated, empty when they do not"""
+        config = self.config
+        reasons = []
+        clicks = timing.clicks
+        if clicks.total >= config.min_samples:
+            if clicks.share_below(config.fast_click) >= config.fast_share:
+                reasons.append("fast clicks")
+            low, high = clicks.quantile(0.1), clicks.quantile(0.9)
+            if high < low * config.min_spread:
+                reasons.append("regular clicks")
+        typing = timing.typing
+        if typing.total >= config.min_samples:
+            if typing.quantile(0.5) < config.min_typing:
+                reasons.append("fast typing")
+        return tuple(reasons)
+
+    def _check(self, user_id: int, timing: UserTiming):
+        reasons = self.reasons(timing)
+        if reasons == timing.reasons:
+            return
+        if reasons and not timing.reasons:
+            timing.flagged_at = datetime.now(timezone.utc)
+            self.flagged.add(user_id)
+            logger.warning(f"Flagged catcher {user_id}: {', '.join(reasons)}")
+        elif not reasons:
+            timing.flagged_at = None
+            self.flagged.discard(user_id)
+            logger.info(f"Catcher {user_id} is no longer flagged")
+        timing.reasons = reasons
+
+    def is_held_back(self, user_id: int, since_spawn: float) -> bool:
+        """Whether a flagged user's catch this long after the spawn should be refused"""
+        return (
+            self.config.shadow_limit
+            and since_spawn < self.config.shadow_delay
+            and user_id in self.flagged
+        )
+
+    async def clear(self, user_id: int):
+        """Forget a user's timings and flag, for a team member who checked them"""
+        self._users.pop(user_id, None)
+        self._dirty.discard(user_id)
+        self.flagged.discard(user_id)
+        await CatchTiming.filter(user_id=user_id).delete()
+
+    # Persistence
+
+    async def load(self):
+        """Read back the most recently updated users and everyone flagged"""
+        rows = await CatchTiming.all().order_by("-updated_at").limit(self._users.maxsize)
+        loaded = {row.user_id for row in rows}
+        flagged = [
+            row for row in await CatchTiming.filter(flagged=True) if row.user_id not in loaded
+        ]
+        # Oldest first, so the most recent end up last in the LRU
+        for row in [*flagged, *reversed(rows)]:
+            if row.flagged:
+                self.flagged.add(row.user_id)
+            # Timings recorded since startup are newer than the stored ones
+            if row.user_id in self._users:
+                continue
+            timing = UserTiming(row.clicks, row.typing)
+            timing.reasons = tuple(filter(None, row.reasons.split(", ")))
+            timing.flagged_at = row.flagged_at
+            self._users[row.user_id] = timing
+        logger.info(f"Loaded the catch timings of {len(rows) + len(flagged)} users")
+
+    def start(self):
+        """Load stored timings, then flush periodically on the running loop"""
+        if self.config.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="carfigures-catch-timing")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write the users recorded since the last flush, returns how many"""
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+        now = datetime.now(timezone.utc)
+        rows = [
+            _row(user_id, timing, now)
+            for user_id in dirty
+            if (timing := self._users.get(user_id)) is not None
+        ]
+        try:
+            await write_batcher.submit(_save, rows)
+        except Exception:
+            self._dirty |= dirty
+            raise
+        return len(rows)
+
+    async def _run(self):
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Could not load catch timings")
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Could not flush catch timings")
+
+
+def _row(user_id: int, timing: UserTiming, now: datetime) -> CatchTiming:
+    return CatchTiming(
+        user_id=user_id,
+        clicks=list(timing.clicks.counts),
+        typing=list(timing.typing.counts),
+        samples=timing.clicks.total,
+        median_click=timing.clicks.quantile(0.5),
+        median_typing=timing.typing.quantile(0.5),
+        flagged=bool(timing.reasons),
+        reasons=", ".join(timing.reasons),
+        flagged_at=timing.flagged_at,
+        updated_at=now,
+    )
+
+
+async def _save(rows: List[CatchTiming]):
+    await CatchTiming.bulk_create(
+        rows,
+        batch_size=500,
+        on_conflict=["user_id"],
+        update_fields=[
+            "clicks", "typing", "samples", "median_click", "median_typing",
+            "flagged", "reasons", "flagged_at", "updated_at",
+        ],
+    )
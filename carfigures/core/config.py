@@ -21,6 +21,7 @@ class SpawnManagerConfig:
     catch_bonus_rate: List[int]
     cooldown_time: int
     minimum_members_required: int
+    spawn_channels: Dict[int, List[int]]
 
 
 @dataclass
@@ -39,6 +40,82 @@ class CoinConfig:
     pack_prices: Dict[str, int]
 
 
+@dataclass
+class PrometheusConfig:
+    enabled: bool
+    host: str
+    port: int
+
+
+@dataclass
+class LoggingConfig:
+    path: str
+    json: bool
+    max_bytes: int
+    rotate_when: str
+    backup_count: int
+    dedup_window: float
+
+
+@dataclass
+class CardsConfig:
+    enabled: bool
+    cache_dir: str
+    memory_cache_size: int
+    workers: int
+    format: str
+    garage_cache_dir: str
+    garage_cache_size: int  # Bytes
+
+
+@dataclass
+class RateLimit:
+    rate: int  # Calls allowed every `per` seconds
+    per: float
+    burst: int  # Calls allowed at once, defaults to `rate`
+
+
+@dataclass
+class RateLimitConfig:
+    commands: Dict[str, Dict[str, RateLimit]]  # command -> "user" or "guild" -> limit
+    max_keys: int
+    store: str
+
+
+@dataclass
+class CatchTimingConfig:
+    enabled: bool
+    min_samples: int
+    fast_click: float
+    fast_share: float
+    min_spread: float
+    min_typing: float
+    shadow_limit: bool
+    shadow_delay: float
+    max_users: int
+
+
+@dataclass
+class TradeConfig:
+    timeout: float  # Seconds a trade stays open without being settled
+    max_cars: int  # Cars each side can offer
+
+
+@dataclass
+class EventConfig:
+    warm_ahead: float  # Seconds before a pack release its caches are warmed
+    reload_interval: float  # Seconds between reads of the events scheduled by other processes
+    max_multiplier: float  # Largest spawn or reward boost the team commands accept
+
+
+@dataclass
+class GuildConfigLimits:
+    refresh_interval: float  # Seconds between reads of the settings changed by other processes
+    min_messages: int  # Fewest messages a guild can require between spawns
+    min_cooldown: int  # Shortest cooldown a guild can set, in seconds
+    max_reward_multiplier: float  # Largest catch reward multiplier the team can give a guild
+
+
 @dataclass
 class Config:
     bot_token: str
@@ -50,6 +127,14 @@ class Config:
     spawn_manager: SpawnManagerConfig
     team: TeamConfig
     coin_config: CoinConfig
+    prometheus: PrometheusConfig
+    logging: LoggingConfig
+    cards: CardsConfig
+    rate_limits: RateLimitConfig
+    catch_timing: CatchTimingConfig
+    trades: TradeConfig
+    events: EventConfig
+    guild_config: GuildConfigLimits
     
     @classmethod
     def from_file(cls, path: Path) -> "Config":
@@ -79,7 +164,11 @@ class Config:
             wrong_name_messages=wrong_name_messages,
             catch_bonus_rate=data["spawn-manager"]["catchBonusRate"],
             cooldown_time=data["spawn-manager"]["cooldownTime"],
-            minimum_members_required=data["spawn-manager"]["minimumMembersRequired"]
+            minimum_members_required=data["spawn-manager"]["minimumMembersRequired"],
+            spawn_channels={
+                int(guild_id): [int(channel_id) for channel_id in channel_ids]
+                for guild_id, channel_ids in data["spawn-manager"].get("spawnChannels", {}).items()
+            }
         )
         
         team = TeamConfig(
@@ -102,6 +191,83 @@ class Config:
             })
         )
         
+        prometheus_data = data.get("prometheus", {})
+        prometheus = PrometheusConfig(
+            enabled=prometheus_data.get("enabled", False),
+            host=prometheus_data.get("host", "0.0.0.0"),
+            port=prometheus_data.get("port", 15260)
+        )
+        
+        logging_data = data.get("logging", {})
+        logging_config = LoggingConfig(
+            path=logging_data.get("path", "carfigures.log"),
+            json=logging_data.get("json", True),
+            max_bytes=logging_data.get("maxBytes", 10 * 1024 * 1024),
+            rotate_when=logging_data.get("rotateWhen", "midnight"),
+            backup_count=logging_data.get("backupCount", 7),
+            dedup_window=logging_data.get("dedupWindow", 1.0)
+        )
+        
+        cards_data = data.get("cards", {})
+        cards = CardsConfig(
+            enabled=cards_data.get("enabled", True),
+            cache_dir=cards_data.get("cacheDir", "cache/cards"),
+            memory_cache_size=cards_data.get("memoryCacheSize", 128),
+            workers=cards_data.get("workers", 2),
+            format=cards_data.get("format", "webp"),
+            garage_cache_dir=cards_data.get("garageCacheDir", "cache/garages"),
+            garage_cache_size=cards_data.get("garageCacheMegabytes", 256) * 1024 * 1024
+        )
+        
+        rate_limit_data = data.get("rate-limits", {})
+        rate_limits = RateLimitConfig(
+            commands={
+                command: {
+                    scope: RateLimit(
+                        limit["rate"], limit["per"], limit.get("burst", limit["rate"])
+                    )
+                    for scope, limit in scopes.items()
+                }
+                for command, scopes in rate_limit_data.get("commands", {}).items()
+            },
+            max_keys=rate_limit_data.get("maxKeys", 100_000),
+            store=rate_limit_data.get("store", "")
+        )
+        
+        timing_data = data.get("catch-timing", {})
+        catch_timing = CatchTimingConfig(
+            enabled=timing_data.get("enabled", True),
+            min_samples=timing_data.get("minSamples", 20),
+            fast_click=timing_data.get("fastClick", 0.4),
+            fast_share=timing_data.get("fastShare", 0.3),
+            min_spread=timing_data.get("minSpread", 1.5),
+            min_typing=timing_data.get("minTyping", 0.8),
+            shadow_limit=timing_data.get("shadowLimit", False),
+            shadow_delay=timing_data.get("shadowDelay", 5.0),
+            max_users=timing_data.get("maxUsers", 50_000)
+        )
+        
+        trade_data = data.get("trades", {})
+        trades = TradeConfig(
+            timeout=trade_data.get("timeout", 300.0),
+            max_cars=trade_data.get("maxCars", 10)
+        )
+        
+        event_data = data.get("events", {})
+        events = EventConfig(
+            warm_ahead=event_data.get("warmAhead", 120.0),
+            reload_interval=event_data.get("reloadInterval", 60.0),
+            max_multiplier=event_data.get("maxMultiplier", 5.0)
+        )
+        
+        guild_config_data = data.get("guild-config", {})
+        guild_config = GuildConfigLimits(
+            refresh_interval=guild_config_data.get("refreshInterval", 60.0),
+            min_messages=guild_config_data.get("minMessages", 5),
+            min_cooldown=guild_config_data.get("minCooldown", 60),
+            max_reward_multiplier=guild_config_data.get("maxRewardMultiplier", 2.0)
+        )
+        
         return cls(
             bot_token=data["settings"]["botToken"],
             bot_description=data["settings"]["botDescription"],
@@ -111,5 +277,13 @@ class Config:
             default_embed_color=data["settings"]["defaultEmbedColor"],
             spawn_manager=spawn_manager,
             team=team,
-            coin_config=coin_config
+            coin_config=coin_config,
+            prometheus=prometheus,
+            logging=logging_config,
+            cards=cards,
+            rate_limits=rate_limits,
+            catch_timing=catch_timing,
+            trades=trades,
+            events=events,
+            guild_config=guild_config
         )
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""Per-task execution context shared by the instrumentation code"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, List, Tuple
+
+# Name of the command, interaction or background job the current task is running
+current_operation: ContextVar[str] = ContextVar("carfigures_current_operation", default="background")
+
+# Variables carried over when work is handed to another task, like the database writer
+PROPAGATED_VARS: List[ContextVar] = [current_operation]
+
+# Snapshots of every task a shared piece of work is done for, like one INSERT of rows
+# deferred by several batched writes
+_shared_with: ContextVar[Tuple[List[Tuple[ContextVar, Any]], ...]] = ContextVar(
+    "carfigures_shared_with", default=()
+)
+
+
+@contextmanager
+def operation(name: str) -> Iterator[str]:
+    """Attribute everything done inside the block to an operation name"""
+    token = current_operation.set(name)
+    try:
+        yield name
+    finally:
+        current_operation.reset(token)
+
+
+def capture() -> List[Tuple[ContextVar, Any]]:
+    """Snapshot the propagated variables of the current task"""
+    return [(var, var.get()) for var in PROPAGATED_VARS]
+
+
+def values(var: ContextVar) -> List[Any]:
+    """Value of a propagated variable in the current task, or in every task sharing its work"""
+    snapshots = _shared_with.get()
+    if not snapshots:
+        return [var.get()]
+    return [dict(snapshot).get(var, var.get()) for snapshot in snapshots]
+
+
+@contextmanager
+def shared(snapshots: List[List[Tuple[ContextVar, Any]]]) -> Iterator[None]:
+    """Do the work of the block on behalf of every task a snapshot was captured in"""
+    token = _shared_with.set(tuple(snapshots))
+    try:
+        yield
+    finally:
+        _shared_with.reset(token)
+
+
+@contextmanager
+def restore(captured: List[Tuple[ContextVar, Any]]) -> Iterator[None]:
+    """Apply a snapshot taken with capture() for the duration of the block"""
+    tokens = [(var, var.set(value)) for var, value in captured]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
@@ -0,0 +1,217 @@
+"""Cached statistics for the admin panel dashboard"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from tortoise.expressions import Q
+from tortoise.functions import Count, Sum
+
+from carfigures.core.database import read_connection
+from carfigures.models import (
+    Car, EconomyMetric, EconomyRollup, Pack, Resolution, User, UserCar, UserCoins, UserPack
+)
+
+logger = logging.getLogger(__name__)
+
+# Tables whose exact row count is swapped for the planner estimate once they get this big
+APPROXIMATE_TABLES = ("users", "user_cars", "user_packs")
+
+# Bucket name -> (SQLite strftime format, Postgres date_trunc unit)
+HISTORY_BUCKETS = {
+    "hour": ("%Y-%m-%d %H:00", "hour"),
+    "day": ("%Y-%m-%d", "day"),
+}
+
+# Table -> (timestamp column, chart series -> aggregated value), one query per table
+HISTORY_SERIES = {
+    "users": ("created_at", {"new_users": "COUNT(*)"}),
+    "user_packs": ("purchased_at", {"packs_sold": "COUNT(*)", "pack_revenue": "SUM(price_paid)"}),
+}
+
+
+class DashboardStats:
+    """
+    Dashboard numbers computed with one aggregate query per table
+    Results are cached for `ttl` seconds and concurrent refreshes share one computation,
+    so admins reloading the dashboard do not add load next to the bot.
+    """
+
+    def __init__(self, ttl: float = 30.0, approximate_above: int = 1_000_000):
+        self.ttl = ttl
+        self.approximate_above = approximate_above
+        self._cache: Dict[Any, Tuple[float, Any]] = {}
+        self._pending: Dict[Any, asyncio.Task] = {}
+
+    async def summary(self) -> Dict[str, Any]:
+        """Counts, economy totals and pack sales"""
+        return await self._cached("summary", self._compute_summary)
+
+    async def history(self, bucket: str = "day", days: int = 30) -> Dict[str, List[Dict]]:
+        """Time-bucketed series for charts, oldest bucket first"""
+        if bucket not in HISTORY_BUCKETS:
+            raise ValueError(f"Unknown bucket {bucket!r}, use one of {list(HISTORY_BUCKETS)}")
+        return await self._cached(
+            ("history", bucket, days), lambda: self._compute_history(bucket, days)
+        )
+
+    def invalidate(self):
+        """Drop cached results, the next call recomputes them"""
+        self._cache.clear()
+
+    async def _cached(self, key, compute):
+        entry = self._cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(compute())
+            self._pending[key] = task
+            task.add_done_callback(lambda done: self._store(key, done))
+        return await asyncio.shield(task)
+
+    def _store(self, key, task: asyncio.Task):
+        del self._pending[key]
+        if not task.cancelled() and task.exception() is None:
+            self._cache[key] = (time.monotonic(), task.result())
+
+    async def _compute_summary(self) -> Dict[str, Any]:
+        # Tables past the threshold are never counted, only their estimate is read
+        estimates = await self._estimates()
+        queries = {
+            "users": User.annotate(
+                count=Count("id"), cars_caught=Sum("cars_caught")
+            ).values("count", "cars_caught"),
+            "cars": Car.annotate(
+                count=Count("id"), exclusive=Count("id", _filter=Q(is_exclusive=True))
+            ).values("count", "exclusive"),
+            "packs": Pack.annotate(
+                count=Count("id"), active=Count("id", _filter=Q(is_active=True))
+            ).values("count", "active"),
+            "coins": UserCoins.annotate(
+                circulation=Sum("balance"),
+                earned=Sum("lifetime_earned"),
+                spent=Sum("lifetime_spent"),
+            ).values("circulation", "earned", "spent"),
+        }
+        if "users" in estimates:
+            # The caught total has no estimate, it is the only thing still read from users
+            queries["users"] = User.annotate(cars_caught=Sum("cars_caught")).values("cars_caught")
+        if "user_cars" not in estimates:
+            queries["owned"] = UserCar.annotate(count=Count("id")).values("count")
+        if "user_packs" not in estimates:
+            queries["sales"] = UserPack.annotate(
+                sold=Count("id"),
+                opened=Count("id", _filter=Q(is_opened=True)),
+                revenue=Sum("price_paid"),
+            ).values("sold", "opened", "revenue")
+        results = dict(zip(queries, await asyncio.gather(*queries.values())))
+        users, cars, packs, coins = (
+            results[name][0] for name in ("users", "cars", "packs", "coins")
+        )
+
+        if "user_packs" in estimates:
+            sales = await self._estimated_sales(estimates["user_packs"])
+        else:
+            sales = results["sales"][0]
+        total_users = estimates["users"] if "users" in estimates else users["count"]
+        owned = estimates["user_cars"] if "user_cars" in estimates else results["owned"][0]["count"]
+        sold = sales["sold"] or 0
+        opened = sales["opened"] or 0
+        return {
+            "total_users": total_users,
+            "total_cars": cars["count"],
+            "exclusive_cars": cars["exclusive"] or 0,
+            "total_packs": packs["count"],
+            "active_packs": packs["active"] or 0,
+            "cars_caught": users["cars_caught"] or 0,
+            "cars_owned": owned,
+            "coins_in_circulation": coins["circulation"] or 0,
+            "coins_earned": coins["earned"] or 0,
+            "coins_spent": coins["spent"] or 0,
+            "packs_sold": sold,
+            "packs_opened": opened,
+            "pack_open_rate": opened / sold if sold else 0.0,
+            "pack_revenue": sales["revenue"] or 0,
+            "approximate": sorted(estimates),
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    async def _estimates(self) -> Dict[str, int]:
+        """Planner row estimates of the big tables, only those past the threshold"""
+        connection = read_connection()
+        if connection.capabilities.dialect != "postgres":
+            return {}
+        rows = await connection.execute_query_dict(
+            "SELECT relname, reltuples::bigint AS estimate FROM pg_class "
+            "WHERE relkind = 'r' AND relname = ANY($1)",
+            [list(APPROXIMATE_TABLES)],
+        )
+        # reltuples is -1 until the table was first analyzed
+        return {
+            row["relname"]: row["estimate"]
+            for row in rows
+            if row["estimate"] >= self.approximate_above
+        }
+
+    async def _estimated_sales(self, sold: int) -> Dict[str, int]:
+        """
+        Pack sales without reading user_packs
+        The opened share comes from the planner statistics of is_opened, the same
+        source as the row estimate, so the count and the open rate agree. Revenue has
+        no estimate and comes from the day buckets of the economy rollups.
+        """
+        rows = await read_connection().execute_query_dict(
+            "SELECT most_common_vals::text AS vals, most_common_freqs AS freqs FROM pg_stats "
+            "WHERE tablename = 'user_packs' AND attname = 'is_opened'"
+        )
+        opened_share = 0.0
+        if rows and rows[0]["vals"]:
+            values = rows[0]["vals"].strip("{}").split(",")
+            opened_share = dict(zip(values, rows[0]["freqs"])).get("t", 0.0)
+        revenue = await EconomyRollup.filter(
+            resolution=Resolution.DAY, metric=EconomyMetric.PACK_REVENUE
+        ).annotate(total=Sum("value")).values("total")
+        return {
+            "sold": sold,
+            "opened": round(sold * opened_share),
+            "revenue": revenue[0]["total"],
+        }
+
+    async def _compute_history(self, bucket: str, days: int) -> Dict[str, List[Dict]]:
+        connection = read_connection()
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        sqlite_format, postgres_unit = HISTORY_BUCKETS[bucket]
+
+        history = {}
+        for table, (column, series) in HISTORY_SERIES.items():
+            values = ", ".join(f"{value} AS {name}" for name, value in series.items())
+            if connection.capabilities.dialect == "postgres":
+                query = (
+                    f"SELECT date_trunc('{postgres_unit}', {column}) AS bucket, {values} "
+                    f"FROM {table} WHERE {column} >= $1 GROUP BY 1 ORDER BY 1"
+                )
+            else:
+                query = (
+                    f"SELECT strftime('{sqlite_format}', {column}) AS bucket, {values} "
+                    f"FROM {table} WHERE {column} >= ? GROUP BY 1 ORDER BY 1"
+                )
+            rows = await connection.execute_query_dict(query, [since])
+            for name in series:
+                history[name] = [
+                    {"bucket": _bucket_label(row["bucket"]), "value": row[name] or 0}
+                    for row in rows
+                ]
+        return history
+
+
+def _bucket_label(bucket: Optional[Any]) -> str:
+    if isinstance(bucket, datetime):
+        return bucket.isoformat()
+    return str(bucket)
+
+
+dashboard_stats = DashboardStats()
@@ -0,0 +1,393 @@
+"""Database configuration and SQLite production tuning"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from tortoise.backends.base.client import BaseDBAsyncClient, BaseTransactionWrapper
+from tortoise.connection import connections
+from tortoise.exceptions import ConfigurationError, OperationalError
+from tortoise.transactions import in_transaction
+
+from carfigures.core.context import capture, restore, shared
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_DB_URL = "sqlite://db.sqlite3"
+# aerich migrations of the models app, see [tool.aerich] in pyproject.toml
+MIGRATIONS_DIR = Path("migrations") / "models"
+
+# Applied by the Tortoise SQLite client on every new connection.
+SQLITE_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # Durable in WAL mode, only the last commits may roll back on power loss
+    "journal_size_limit": 64 * 1024 * 1024,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # Negative values are in KiB, so 64 MiB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+    "foreign_keys": "ON",
+}
+
+WRITER_CONNECTION = "default"
+READER_CONNECTION = "reader"
+
+
+class _Batch:
+    """Rows deferred and callbacks registered by the jobs of one write transaction"""
+
+    __slots__ = ("deferred", "owners", "committed")
+
+    def __init__(self):
+        self.deferred: Dict[Callable[[List[Any]], Awaitable[Any]], List[Any]] = {}
+        # Context of the jobs that deferred rows to each flush, the flush is done for them all
+        self.owners: Dict[Callable[[List[Any]], Awaitable[Any]], List[list]] = {}
+        self.committed: List[Callable[[], Any]] = []
+
+
+# Set while the jobs of a batch run, so nested batched writes join it instead of re-queueing.
+_current_batch: contextvars.ContextVar[Optional[_Batch]] = contextvars.ContextVar(
+    "carfigures_current_batch", default=None
+)
+
+
+def is_sqlite(db_url: str) -> bool:
+    """Check if a database URL points to SQLite"""
+    return db_url.startswith("sqlite://")
+
+
+def build_tortoise_config(db_url: str) -> Dict[str, Any]:
+    """
+    Build the Tortoise ORM configuration for a database URL
+    SQLite gets tuned pragmas and, for file databases, a separate reader connection.
+    """
+    config: Dict[str, Any] = {
+        "connections": {WRITER_CONNECTION: db_url},
+        "apps": {
+            "models": {
+                "models": ["carfigures.models", "aerich.models"],
+                "default_connection": WRITER_CONNECTION,
+            }
+        },
+    }
+
+    if not is_sqlite(db_url):
+        return config
+
+    file_path = db_url[len("sqlite://"):].split("?", 1)[0]
+    credentials = {"file_path": file_path, **SQLITE_PRAGMAS}
+    config["connections"][WRITER_CONNECTION] = {
+        "engine": "tortoise.backends.sqlite",
+        "credentials": credentials,
+    }
+
+    # Every in-memory connection is its own database, so readers must share the writer there
+    if file_path != ":memory:":
+        config["connections"][READER_CONNECTION] = {
+            "engine": "tortoise.backends.sqlite",
+            "credentials": dict(credentials),
+        }
+        config["routers"] = ["carfigures.core.database.SQLiteRouter"]
+
+    return config
+
+
+def read_connection() -> BaseDBAsyncClient:
+    """Connection for raw read queries, the SQLite reader when there is one"""
+    try:
+        return connections.get(READER_CONNECTION)
+    except ConfigurationError:  # Not configured, e.g. Postgres or in-memory SQLite
+        return connections.get(WRITER_CONNECTION)
+
+
+def latest_migration(directory: Path = MIGRATIONS_DIR) -> Optional[str]:
+    """File name of the newest aerich migration, None when there are none"""
+    if not directory.is_dir():
+        return None
+    # aerich 0.6 writes its migrations as .sql files and records them by file name
+    versions = [
+        path.name for path in directory.glob("*.sql") if path.name.split("_", 1)[0].isdigit()
+    ]
+    return max(versions, key=lambda name: int(name.split("_", 1)[0]), default=None)
+
+
+async def schema_is_current(app: str = "models") -> bool:
+    """
+    Whether aerich recorded the newest migration as applied
+    Then every table and index already exists and schema generation can be skipped.
+    """
+    latest = latest_migration()
+    if latest is None:
+        return False
+
+    from aerich.models import Aerich
+
+    try:
+        applied = await Aerich.filter(app=app).order_by("-id").first().values_list(
+            "version", flat=True
+        )
+    except OperationalError:  # aerich was never initialised on this database
+        return False
+    return applied == latest
+
+
+class SQLiteRouter:
+    """Send reads to the reader connection unless they belong to an open write transaction"""
+
+    def db_for_read(self, model) -> str:
+        if isinstance(connections.get(WRITER_CONNECTION), BaseTransactionWrapper):
+            return WRITER_CONNECTION
+        return READER_CONNECTION
+
+    def db_for_write(self, model) -> str:
+        return WRITER_CONNECTION
+
+
+_Job = Tuple[Callable[..., Awaitable[Any]], tuple, dict, Optional[asyncio.Future], list]
+
+
+class WriteBatcher:
+    """
+    Single writer task that groups small writes into short transactions
+    With SQLite every commit is an fsync, so committing a batch at once is far cheaper,
+    and on every backend the rows the jobs defer go out as one INSERT per batch.
+    """
+
+    def __init__(self, max_batch: int = 64, max_delay: float = 0.005):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        """Whether writes are currently routed through the writer task"""
+        return self._task is not None and not self._task.done() and not self._closing
+
+    def start(self):
+        """Start the writer task on the running loop"""
+        if self.running:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="carfigures-db-writer")
+        logger.info("Write batcher started")
+
+    async def stop(self):
+        """Flush pending writes and stop the writer task"""
+        if not self.running:
+            return
+        self._closing = True
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        logger.info("Write batcher stopped")
+
+    async def submit(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """
+        Run a write coroutine function inside the next batch and wait for its result
+        While the writer task is stopped the function runs in a transaction of its own.
+        """
+        if _current_batch.get() is not None:
+            return await func(*args, **kwargs)
+        if not self.running:
+            return (await self._run_batch([(func, args, kwargs, None, capture())]))[0]
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((func, args, kwargs, future, capture()))
+        return await future
+
+    async def defer(self, flush: Callable[[List[Any]], Awaitable[Any]], item: Any):
+        """
+        Queue a row for `flush`, which receives every row deferred in the same batch
+        Outside a batched write the row is flushed on its own straight away.
+        """
+        batch = _current_batch.get()
+        if batch is None:
+            await flush([item])
+            return
+        batch.deferred.setdefault(flush, []).append(item)
+        batch.owners.setdefault(flush, []).append(capture())
+
+    def after_commit(self, callback: Callable[[], Any]):
+        """
+        Call `callback` once the batch of the current job has committed
+        Callbacks of a batch that fails are dropped, so jobs retried one by one are only
+        counted once. Outside a batched write the callback runs straight away.
+        """
+        batch = _current_batch.get()
+        if batch is None:
+            callback()
+            return
+        batch.committed.append(callback)
+
+    async def _run(self):
+        stopping = False
+
+        while not stopping:
+            job = await self._queue.get()
+            if job is None:
+                break
+
+            # Give concurrent writers a moment to join the transaction
+            await asyncio.sleep(self.max_delay)
+
+            batch: List[_Job] = [job]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                job = self._queue.get_nowait()
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[_Job]):
+        try:
+            results = await self._run_batch(batch)
+        except Exception as exc:
+            if len(batch) == 1:
+                _settle(batch[0][3], exception=exc)
+                return
+
+            # One job failed and rolled the whole batch back, so retry them one by one
+            logger.debug(f"Write batch of {len(batch)} failed, retrying individually: {exc}")
+            for job in batch:
+                try:
+                    result = (await self._run_batch([job]))[0]
+                except Exception as job_exc:
+                    _settle(job[3], exception=job_exc)
+                else:
+                    _settle(job[3], result=result)
+            return
+
+        for job, result in zip(batch, results):
+            _settle(job[3], result=result)
+
+    async def _run_batch(self, batch: List[_Job]) -> List[Any]:
+        results = []
+        current = _Batch()
+        token = _current_batch.set(current)
+        try:
+            async with in_transaction(WRITER_CONNECTION):
+                for func, args, kwargs, _, captured in batch:
+                    # Keep each job attributed to the command that submitted it
+                    with restore(captured):
+                        results.append(await func(*args, **kwargs))
+                for flush, items in current.deferred.items():
+                    with shared(current.owners[flush]):
+                        await flush(items)
+        finally:
+            _current_batch.reset(token)
+
+        for callback in current.committed:
+            try:
+                callback()
+            except Exception:
+                logger.exception("After commit callback failed")
+        return results
+
+
+def _settle(future: asyncio.Future, result: Any = None, exception: Optional[BaseException] = None):
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+write_batcher = WriteBatcher()
+
+
+def batched_write(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Route a write coroutine function through the shared write batcher when it is running"""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs) -> T:
+        return await write_batcher.submit(func, *args, **kwargs)
+
+    return wrapper
+
+
+# Receive (query, duration in seconds) for every SQL statement once the hook is installed
+QueryListener = Callable[[str, float], None]
+
+_QUERY_METHODS = (
+    "execute_insert",
+    "execute_many",
+    "execute_query",
+    "execute_query_dict",
+    "execute_script",
+)
+_query_listeners: List[QueryListener] = []
+_in_query: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "carfigures_in_query", default=False
+)
+
+
+def add_query_listener(listener: QueryListener):
+    """Register a callback for every executed SQL statement"""
+    if listener not in _query_listeners:
+        _query_listeners.append(listener)
+
+
+def remove_query_listener(listener: QueryListener):
+    """Unregister a query callback"""
+    if listener in _query_listeners:
+        _query_listeners.remove(listener)
+
+
+def _instrument(method: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(method)
+    async def wrapper(self, query, *args, **kwargs):
+        # Base implementations may delegate to each other, only time the outermost call
+        if not _query_listeners or _in_query.get():
+            return await method(self, query, *args, **kwargs)
+
+        token = _in_query.set(True)
+        start = time.perf_counter()
+        try:
+            return await method(self, query, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _in_query.reset(token)
+            for listener in tuple(_query_listeners):
+                try:
+                    listener(query, elapsed)
+                except Exception:
+                    logger.exception("Query listener failed")
+
+    wrapper._carfigures_instrumented = True
+    return wrapper
+
+
+def install_query_hook():
+    """
+    Wrap the execute methods of every loaded Tortoise client class
+    Call it after Tortoise.init so the configured backends are imported. Costs a
+    single list check per query while no listener is registered.
+    """
+    pending = [BaseDBAsyncClient]
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        for name in _QUERY_METHODS:
+            method = cls.__dict__.get(name)
+            if method is None or getattr(method, "_carfigures_instrumented", False):
+                continue
+            setattr(cls, name, _instrument(method))
+
+
+DB_URL = os.environ.get("CARFIGURESBOT_DB_URL", DEFAULT_DB_URL)
+
+# Database configuration for Tortoise ORM
+TORTOISE_ORM = build_tortoise_config(DB_URL)
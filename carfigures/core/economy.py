@@ -0,0 +1,337 @@
+"""Rolling mint, burn and pack sale counters, flushed to the economy_rollups table"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from tortoise import Tortoise
+from tortoise.functions import Sum
+
+from carfigures.core.database import TORTOISE_ORM, WRITER_CONNECTION, write_batcher
+from carfigures.models import (
+    CoinReason, CoinTransaction, DailyClaim, EconomyMetric, EconomyRollup, Resolution, UserPack
+)
+
+logger = logging.getLogger(__name__)
+
+# Buckets of each resolution kept in memory, older ones only live in the rollup table
+WINDOWS = {Resolution.MINUTE: 60, Resolution.HOUR: 24, Resolution.DAY: 7}
+# Rollup rows older than this are purged, day buckets are kept forever
+RETENTION = {Resolution.MINUTE: timedelta(days=2), Resolution.HOUR: timedelta(days=90)}
+PURGE_INTERVAL = 3600
+# Source rows per query of the backfill
+CHUNK_SIZE = 5000
+# Balance changes that move coins between users, neither minting nor burning any
+TRANSFERS = (CoinReason.TRADE,)
+# Balance changes that restore data rather than move coins, journaled but not counted
+RESTORES = (CoinReason.OPENING_BALANCE, CoinReason.IMPORT)
+
+# (resolution, bucket start as a UNIX timestamp, metric, dimension)
+_Key = Tuple[Resolution, int, EconomyMetric, int]
+# (metric, dimension) -> total
+Totals = Dict[Tuple[EconomyMetric, int], int]
+
+
+def bucket_start(timestamp: float, resolution: Resolution) -> int:
+    """Start of the bucket a UNIX timestamp falls in"""
+    return int(timestamp) // resolution.seconds * resolution.seconds
+
+
+def _datetime(timestamp: int) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+class EconomyStats:
+    """
+    Coins minted and burned by reason, and pack sales by pack
+    Recording is a few dict updates on the coin and pack paths. The latest buckets
+    of every resolution stay in memory for live numbers, and the increments are
+    flushed to economy_rollups every `flush_interval` seconds as additive upserts,
+    so the panel and reports read a small table instead of the economy tables.
+    """
+
+    def __init__(self, flush_interval: float = 60.0):
+        self.flush_interval = flush_interval
+        self._windows: Dict[Resolution, Dict[int, Counter]] = {
+            resolution: {} for resolution in Resolution
+        }
+        self._pending: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+
+    # Recording
+
+    def record(
+        self, metric: EconomyMetric, dimension: int, value: int, at: Optional[float] = None
+    ):
+        """Add `value` to a metric in the current bucket of every resolution"""
+        at = time.time() if at is None else at
+        for resolution in Resolution:
+            bucket = bucket_start(at, resolution)
+            window = self._windows[resolution]
+            counts = window.get(bucket)
+            if counts is None:
+                counts = window[bucket] = Counter()
+                oldest = bucket - WINDOWS[resolution] * resolution.seconds
+                for stale in [start for start in window if start <= oldest]:
+                    del window[stale]
+            counts[metric, dimension] += value
+            self._pending[resolution, bucket, metric, dimension] += value
+
+    def record_coins(self, delta: int, reason: CoinReason):
+        """Count a balance change as minted or burned coins"""
+        if reason in TRANSFERS or reason in RESTORES:
+            return
+        if delta > 0:
+            self.record(EconomyMetric.COINS_MINTED, reason, delta)
+        elif delta < 0:
+            self.record(EconomyMetric.COINS_BURNED, reason, -delta)
+
+    def record_pack_sale(self, pack_id: int, price: int):
+        self.record(EconomyMetric.PACKS_SOLD, pack_id, 1)
+        self.record(EconomyMetric.PACK_REVENUE, pack_id, price)
+
+    # Queries
+
+    def recent(self, resolution: Resolution, buckets: int) -> Totals:
+        """
+        Totals of the last `buckets` buckets, the current one included, from memory
+        Only covers what this process recorded since it started.
+        """
+        since = bucket_start(time.time(), resolution) - (buckets - 1) * resolution.seconds
+        totals: Counter = Counter()
+        for bucket, counts in self._windows[resolution].items():
+            if bucket >= since:
+                totals.update(counts)
+        return dict(totals)
+
+    async def totals(
+        self, since: datetime, resolution: Resolution = Resolution.HOUR
+    ) -> Totals:
+        """Totals since a point in time from the rollup table, plus what is not flushed yet"""
+        rows = await EconomyRollup.filter(resolution=resolution, bucket__gte=since).annotate(
+            total=Sum("value")
+        ).group_by("metric", "dimension").values_list("metric", "dimension", "total")
+        totals: Counter = Counter({
+            (metric, dimension): total for metric, dimension, total in rows
+        })
+        start = since.timestamp()
+        for (pending_resolution, bucket, metric, dimension), value in self._pending.items():
+            if pending_resolution == resolution and bucket >= start:
+                totals[metric, dimension] += value
+        return dict(totals)
+
+    async def series(
+        self, resolution: Resolution, since: datetime, metrics: Iterable[EconomyMetric] = ()
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Flushed buckets per metric name, oldest first, summed over dimensions"""
+        qs = EconomyRollup.filter(resolution=resolution, bucket__gte=since)
+        metrics = list(metrics)
+        if metrics:
+            qs = qs.filter(metric__in=metrics)
+        rows = await qs.annotate(total=Sum("value")).group_by("metric", "bucket").order_by(
+            "bucket"
+        ).values_list("metric", "bucket", "total")
+        series: Dict[str, List[Dict[str, Any]]] = {
+            metric.name.lower(): [] for metric in metrics or EconomyMetric
+        }
+        for metric, bucket, total in rows:
+            series[EconomyMetric(metric).name.lower()].append(
+                {"bucket": bucket.isoformat(), "value": total}
+            )
+        return series
+
+    # Flushing
+
+    def start(self):
+        """Flush periodically on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="carfigures-economy-flush")
+
+    async def stop(self):
+        """Stop flushing periodically and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write pending increments, returns how many buckets were updated"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, Counter()
+        try:
+            await write_batcher.submit(_increment, pending)
+        except Exception:
+            # Keep them for the next flush, increments are not lost on a transient error
+            self._pending.update(pending)
+            raise
+        return len(pending)
+
+    async def _run(self):
+        last_purge = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - last_purge >= PURGE_INTERVAL:
+                    last_purge = time.monotonic()
+                    await write_batcher.submit(purge_rollups)
+            except Exception:
+                logger.exception("Could not flush economy counters")
+
+
+economy_stats = EconomyStats()
+
+
+async def _increment(counts: Dict[_Key, int]):
+    """Add to rollup buckets, creating the missing ones"""
+    connection = Tortoise.get_connection(WRITER_CONNECTION)
+    table = EconomyRollup._meta.db_table
+    if connection.capabilities.dialect == "postgres":
+        placeholders = "$1, $2, $3, $4, $5"
+    else:
+        placeholders = "?, ?, ?, ?, ?"
+    bucket_field = EconomyRollup._meta.fields_map["bucket"]
+    await connection.execute_many(
+        f"INSERT INTO {table} (resolution, bucket, metric, dimension, value) "
+        f"VALUES ({placeholders}) "
+        f"ON CONFLICT (resolution, bucket, metric, dimension) "
+        f"DO UPDATE SET value = {table}.value + excluded.value",
+        [
+            [
+                int(resolution),
+                bucket_field.to_db_value(_datetime(bucket), EconomyRollup),
+                int(metric),
+                int(dimension),
+                value,
+            ]
+            for (resolution, bucket, metric, dimension), value in counts.items()
+            if value
+        ],
+    )
+
+
+async def purge_rollups() -> int:
+    """Delete minute and hour buckets past their retention"""
+    now = datetime.now(timezone.utc)
+    purged = 0
+    for resolution, retention in RETENTION.items():
+        purged += await EconomyRollup.filter(
+            resolution=resolution, bucket__lt=now - retention
+        ).delete()
+    return purged
+
+
+# Backfill
+
+
+async def _stream(qs, fields: Tuple[str, ...], chunk_size: int):
+    """Rows of a queryset in id order, a chunk at a time"""
+    last_id = None
+    while True:
+        chunk = qs if last_id is None else qs.filter(id__gt=last_id)
+        rows = await chunk.order_by("id").limit(chunk_size).values_list("id", *fields)
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            break
+        last_id = rows[-1][0]
+
+
+def _daily_claim(at: datetime, amount: int):
+    yield at, EconomyMetric.COINS_MINTED, CoinReason.DAILY_CLAIM, amount
+
+
+def _pack_purchase(at: datetime, pack_id: int, price: int):
+    yield at, EconomyMetric.COINS_BURNED, CoinReason.PACK_PURCHASE, price
+    yield at, EconomyMetric.PACKS_SOLD, pack_id, 1
+    yield at, EconomyMetric.PACK_REVENUE, pack_id, price
+
+
+def _transaction(at: datetime, reason: int, delta: int):
+    metric = EconomyMetric.COINS_MINTED if delta > 0 else EconomyMetric.COINS_BURNED
+    yield at, metric, reason, abs(delta)
+
+
+async def backfill(chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Rebuild the hour and day buckets before today from the economy tables
+    Daily claims and pack purchases come from their own tables, other coin changes
+    from the journal. Existing buckets in that range are replaced, so running it again
+    gives the same result. Today's buckets are left to the live counters.
+    """
+    cutoff = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    resolutions = (Resolution.HOUR, Resolution.DAY)
+    await EconomyRollup.filter(resolution__in=resolutions, bucket__lt=cutoff).delete()
+
+    sources = (
+        (DailyClaim.filter(created_at__lt=cutoff), ("created_at", "amount_claimed"), _daily_claim),
+        (
+            UserPack.filter(purchased_at__lt=cutoff),
+            ("purchased_at", "pack_id", "price_paid"),
+            _pack_purchase,
+        ),
+        (
+            CoinTransaction.filter(created_at__lt=cutoff).exclude(reason__in=(
+                *RESTORES,
+                CoinReason.DAILY_CLAIM,
+                CoinReason.PACK_PURCHASE,
+                *TRANSFERS,
+            )),
+            ("created_at", "reason", "delta"),
+            _transaction,
+        ),
+    )
+    rows_read = 0
+    for qs, fields, increments in sources:
+        async for rows in _stream(qs, fields, chunk_size):
+            counts: Counter = Counter()
+            for row in rows:
+                for at, metric, dimension, value in increments(*row[1:]):
+                    for resolution in resolutions:
+                        bucket = bucket_start(at.timestamp(), resolution)
+                        counts[resolution, bucket, metric, dimension] += value
+            # Increments add up, so each chunk is written and forgotten
+            await write_batcher.submit(_increment, counts)
+            rows_read += len(rows)
+
+    logger.info(f"Backfilled economy rollups from {rows_read} rows")
+    return rows_read
+
+
+async def run(args: argparse.Namespace):
+    await Tortoise.init(config=TORTOISE_ORM)
+    await Tortoise.generate_schemas()
+    try:
+        if args.command == "backfill":
+            print(f"{await backfill(args.chunk_size)} rows read")
+        else:
+            print(f"{await purge_rollups()} buckets purged")
+    finally:
+        await Tortoise.close_connections()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m carfigures.core.economy",
+        description="Maintain the economy rollup table",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subparsers.add_parser(
+        "backfill", help="Rebuild hour and day buckets before today from the economy tables"
+    )
+    backfill_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    subparsers.add_parser("purge", help="Delete minute and hour buckets past their retention")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
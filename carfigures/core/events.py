@@ -0,0 +1,336 @@
+"""Scheduled pack releases and boosts, run from a heap of timers backed by the database"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from datetime import datetime
+from enum import IntEnum
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from tortoise.transactions import in_transaction
+
+from carfigures.core.config import EventConfig
+from carfigures.core.database import WRITER_CONNECTION, write_batcher
+from carfigures.models import EventKind, EventState, Pack, PackContent, ScheduledEvent
+
+if TYPE_CHECKING:
+    from carfigures.core.bot import CarFiguresBot
+
+logger = logging.getLogger(__name__)
+
+# Longest the scheduler sleeps without looking at the heap, a safety net for clock jumps
+MAX_SLEEP = 30.0
+# A timer that failed, usually on a database error, is tried again after this long
+RETRY_DELAY = 10.0
+
+
+class Action(IntEnum):
+    """Timer kinds, in the order they run when due at the same moment"""
+    WARM = 0
+    START = 1
+    END = 2
+
+
+# (due as a UNIX timestamp, action, tie breaker, event id, event version)
+_Timer = Tuple[float, Action, int, int, int]
+
+
+class EventScheduler:
+    """
+    Starts and ends scheduled events in every bot process
+    The warm-up, start and end of each known event are timers in a min-heap, and one
+    task sleeps until the earliest is due or an event is scheduled. Events are read
+    back from scheduled_events on startup and every `reload_interval`, so schedules
+    survive restarts and reach every process. An event whose start passed while the
+    bot was down starts right away.
+
+    Before a pack goes on sale its row is read and the cards of its cars rendered,
+    each process at a random moment of the warm-up window, so the drop itself puts
+    the pack in the shop cache without a query.
+    """
+
+    def __init__(self, bot: "CarFiguresBot", config: EventConfig):
+        self.bot = bot
+        self.config = config
+        self._events: Dict[int, ScheduledEvent] = {}
+        # Bumped when an event is re-read with another schedule, older timers are skipped
+        self._versions: Dict[int, int] = {}
+        self._timers: List[_Timer] = []
+        self._sequence = itertools.count()
+        self._active: Dict[int, ScheduledEvent] = {}
+        self._warmed: Dict[int, Pack] = {}
+        self._warming: Dict[int, asyncio.Task] = {}
+        self._multipliers: Dict[EventKind, float] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # Effects
+
+    @property
+    def spawn_multiplier(self) -> float:
+        """Spawns need this many times fewer messages"""
+        return self._multipliers.get(EventKind.SPAWN_BOOST, 1.0)
+
+    @property
+    def reward_multiplier(self) -> float:
+        """Catch rewards are this many times larger"""
+        return self._multipliers.get(EventKind.REWARD_BOOST, 1.0)
+
+    def active(self) -> List[ScheduledEvent]:
+        """Running events, soonest to end first"""
+        return sorted(self._active.values(), key=lambda event: event.ends_at)
+
+    def upcoming(self) -> List[ScheduledEvent]:
+        """Events that have not started yet, soonest first"""
+        return sorted(
+            (event for event_id, event in self._events.items() if event_id not in self._active),
+            key=lambda event: event.starts_at,
+        )
+
+    # Scheduling
+
+    async def schedule(
+        self,
+        name: str,
+        kind: EventKind,
+        starts_at: datetime,
+        ends_at: datetime,
+        pack_id: Optional[int] = None,
+        multiplier: float = 1.0,
+        created_by: Optional[int] = None,
+    ) -> ScheduledEvent:
+        """Store a new event and arm its timers"""
+        if ends_at <= starts_at:
+            raise ValueError("An event must end after it starts")
+        event = await write_batcher.submit(
+            ScheduledEvent.create,
+            name=name,
+            kind=kind,
+            pack_id=pack_id,
+            multiplier=multiplier,
+            starts_at=starts_at,
+            ends_at=ends_at,
+            created_by=created_by,
+        )
+        self._track(event)
+        self._wake.set()
+        logger.info(f"Scheduled event {event.id} ({name}) from {starts_at} to {ends_at}")
+        return event
+
+    async def cancel(self, event_id: int) -> bool:
+        """Cancel an event that has not ended, False if there is none"""
+        cancelled = await write_batcher.submit(_cancel, event_id)
+        if cancelled:
+            # Other processes drop it on their next reload
+            self._forget(event_id)
+            logger.info(f"Cancelled event {event_id}")
+        return cancelled
+
+    def _track(self, event: ScheduledEvent):
+        known = self._events.get(event.id)
+        if known is not None and (known.starts_at, known.ends_at) == (
+            event.starts_at, event.ends_at
+        ):
+            known.state = event.state
+            return
+        self._events[event.id] = event
+        version = self._versions[event.id] = self._versions.get(event.id, 0) + 1
+
+        now = time.time()
+        starts_at = event.starts_at.timestamp()
+        if event.kind is EventKind.PACK_RELEASE and starts_at > now:
+            # Spread over the second half of the window, processes warm one after another
+            warm_at = starts_at - self.config.warm_ahead * random.uniform(0.5, 1.0)
+            self._push(max(warm_at, now), Action.WARM, event.id, version)
+        self._push(starts_at, Action.START, event.id, version)
+        self._push(event.ends_at.timestamp(), Action.END, event.id, version)
+
+    def _push(self, due: float, action: Action, event_id: int, version: int):
+        heapq.heappush(self._timers, (due, action, next(self._sequence), event_id, version))
+
+    def _forget(self, event_id: int):
+        event = self._events.pop(event_id, None)
+        self._versions.pop(event_id, None)
+        self._warmed.pop(event_id, None)
+        task = self._warming.pop(event_id, None)
+        if task is not None:
+            task.cancel()
+        if self._active.pop(event_id, None) is not None:
+            self._apply_end(event)
+
+    # Running
+
+    def start(self):
+        """Load stored events, then run their timers on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="carfigures-events")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._warming.values():
+            task.cancel()
+        self._warming.clear()
+
+    async def reload(self):
+        """Sync with the events that are not over, scheduled or cancelled by any process"""
+        rows = await ScheduledEvent.filter(
+            state__in=(EventState.SCHEDULED, EventState.ACTIVE)
+        ).order_by("starts_at")
+        current = {row.id for row in rows}
+        for event_id in [event_id for event_id in self._events if event_id not in current]:
+            self._forget(event_id)
+        for row in rows:
+            self._track(row)
+
+    async def _run(self):
+        interval = self.config.reload_interval
+        last_reload = None
+        while True:
+            if last_reload is None or time.monotonic() - last_reload >= interval:
+                try:
+                    await self.reload()
+                except Exception:
+                    logger.exception("Could not read the scheduled events")
+                last_reload = time.monotonic()
+
+            now = time.time()
+            while self._timers and self._timers[0][0] <= now:
+                _, action, _, event_id, version = heapq.heappop(self._timers)
+                if self._versions.get(event_id) != version:
+                    continue
+                try:
+                    await self._fire(action, self._events[event_id])
+                except Exception:
+                    logger.exception(f"Could not {action.name.lower()} event {event_id}")
+                    self._push(time.time() + RETRY_DELAY, action, event_id, version)
+
+            delay = min(last_reload + interval - time.monotonic(), MAX_SLEEP)
+            if self._timers:
+                delay = min(delay, self._timers[0][0] - time.time())
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, action: Action, event: ScheduledEvent):
+        if action is Action.WARM:
+            if event.id not in self._warming:
+                task = asyncio.create_task(self._warm(event))
+                task.add_done_callback(lambda _: self._warming.pop(event.id, None))
+                self._warming[event.id] = task
+        elif action is Action.START:
+            await self._start(event)
+        else:
+            await self._end(event)
+
+    async def _warm(self, event: ScheduledEvent):
+        """Read the pack of a release and render the cards of its cars ahead of the drop"""
+        try:
+            await self._warm_pack(event)
+            car_ids = await PackContent.filter(pack_id=event.pack_id).values_list(
+                "car_id", flat=True
+            )
+            if self.bot.cards:
+                cars = [car for car in map(self.bot.catalog.get, car_ids) if car is not None]
+                failed = await self.bot.cards.warm(cars)
+                logger.info(
+                    f"Warmed event {event.id}: {len(cars) - failed} of {len(cars)} cards ready"
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"Could not warm event {event.id}")
+
+    async def _warm_pack(self, event: ScheduledEvent) -> Optional[Pack]:
+        pack = self._warmed.get(event.id)
+        if pack is None:
+            pack = await Pack.get_or_none(id=event.pack_id)
+            if pack is not None:
+                self._warmed[event.id] = pack
+        return pack
+
+    async def _start(self, event: ScheduledEvent):
+        if event.id in self._active:
+            return
+        pack_id = event.pack_id if event.kind is EventKind.PACK_RELEASE else None
+        state = await write_batcher.submit(
+            _advance, event.id, EventState.SCHEDULED, EventState.ACTIVE, pack_id, event.ends_at
+        )
+        if state != EventState.ACTIVE:
+            # Cancelled or over since it was read, the next reload forgets it
+            return
+        event.state = state
+        self._active[event.id] = event
+        if pack_id is not None:
+            pack = await self._warm_pack(event)
+            if pack is not None:
+                pack.is_active = True
+                pack.is_limited_time = True
+                pack.available_until = event.ends_at
+                self.bot.shop.put(pack)
+        self._update_multipliers()
+        logger.info(f"Started event {event.id} ({event.name})")
+
+    async def _end(self, event: ScheduledEvent):
+        pack_id = event.pack_id if event.kind is EventKind.PACK_RELEASE else None
+        await write_batcher.submit(
+            _advance, event.id, EventState.ACTIVE, EventState.ENDED, pack_id
+        )
+        self._forget(event.id)
+        logger.info(f"Ended event {event.id} ({event.name})")
+
+    def _apply_end(self, event: ScheduledEvent):
+        if event.kind is EventKind.PACK_RELEASE:
+            self.bot.shop.drop(event.pack_id)
+        self._update_multipliers()
+
+    def _update_multipliers(self):
+        multipliers: Dict[EventKind, float] = {}
+        for event in self._active.values():
+            if event.kind is not EventKind.PACK_RELEASE:
+                multipliers[event.kind] = multipliers.get(event.kind, 1.0) * event.multiplier
+        self._multipliers = multipliers
+
+
+async def _advance(
+    event_id: int,
+    before: EventState,
+    after: EventState,
+    pack_id: Optional[int] = None,
+    available_until: Optional[datetime] = None,
+) -> Optional[EventState]:
+    """
+    Move an event on, and its pack with it, if no other process did already
+    Returns the state the event is in afterwards, None if it no longer exists.
+    """
+    async with in_transaction(WRITER_CONNECTION):
+        moved = await ScheduledEvent.filter(id=event_id, state=before).update(state=after)
+        if not moved:
+            return await ScheduledEvent.filter(id=event_id).first().values_list("state", flat=True)
+        if pack_id is not None:
+            if after is EventState.ACTIVE:
+                await Pack.filter(id=pack_id).update(
+                    is_active=True, is_limited_time=True, available_until=available_until
+                )
+            else:
+                await Pack.filter(id=pack_id).update(is_active=False)
+        return after
+
+
+async def _cancel(event_id: int) -> bool:
+    async with in_transaction(WRITER_CONNECTION):
+        event = await ScheduledEvent.filter(
+            id=event_id, state__in=(EventState.SCHEDULED, EventState.ACTIVE)
+        ).select_for_update().first()
+        if event is None:
+            return False
+        await ScheduledEvent.filter(id=event_id).update(state=EventState.CANCELLED)
+        if event.state is EventState.ACTIVE and event.kind is EventKind.PACK_RELEASE:
+            await Pack.filter(id=event.pack_id).update(is_active=False)
+        return True
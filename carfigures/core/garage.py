@@ -0,0 +1,276 @@
+"""Garage grid images built from the spawn cards, rendered in the card pool"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import discord
+
+from carfigures.core.cards import CardRenderer, rarity_tier, write_atomic
+from carfigures.core.catalog import CatalogCar
+from carfigures.core.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+GRID_COLUMNS = 4
+GRID_ROWS = 3
+PAGE_SIZE = GRID_COLUMNS * GRID_ROWS
+THUMB_SIZE = (240, 150)
+LABEL_HEIGHT = 40
+PADDING = 12
+# Part of every page key, bump it when the layout changes so old pages miss the cache
+GRID_VERSION = 1
+
+_PAGE_NAME = re.compile(r"[0-9]+-[0-9]+-[0-9a-f]+\.(webp|png)")
+
+# card key, card path or None when it could not be rendered, name, rarity, shiny, favorite
+Tile = Tuple[str, Optional[str], str, float, bool, bool]
+
+
+def render_garage_page(tiles: List[Tile], thumb_dir: str, path: str, fmt: str) -> bytes:
+    """
+    Lay the tiles of a garage page out in a grid and write it to `path`
+    Runs in a worker process. Cards are shrunk to thumbnails once, later pages
+    showing the same car revision read the thumbnail back.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    tile_width, thumb_height = THUMB_SIZE
+    tile_height = thumb_height + LABEL_HEIGHT
+    rows = -(-len(tiles) // GRID_COLUMNS)
+    size = (
+        GRID_COLUMNS * tile_width + (GRID_COLUMNS + 1) * PADDING,
+        rows * tile_height + (rows + 1) * PADDING,
+    )
+    page = Image.new("RGB", size, (24, 26, 31))
+    draw = ImageDraw.Draw(page)
+    name_font = ImageFont.load_default(18)
+    mark_font = ImageFont.load_default(13)
+
+    for index, (key, card_path, name, rarity, shiny, favorite) in enumerate(tiles):
+        row, column = divmod(index, GRID_COLUMNS)
+        left = PADDING + column * (tile_width + PADDING)
+        top = PADDING + row * (tile_height + PADDING)
+        _, color = rarity_tier(rarity)
+
+        thumb = _thumbnail(key, card_path, Path(thumb_dir), fmt)
+        if thumb is None:
+            draw.rectangle(
+                (left, top, left + tile_width - 1, top + thumb_height - 1), fill=(36, 39, 46)
+            )
+        else:
+            page.paste(thumb, (left, top))
+
+        # Label under the thumbnail, in the rarity color
+        label_top = top + thumb_height
+        draw.rectangle(
+            (left, label_top, left + tile_width - 1, label_top + LABEL_HEIGHT - 1), fill=color
+        )
+        if len(name) > 22:
+            name = name[:21] + "…"
+        draw.text((left + 8, label_top + 4), name, fill=(0, 0, 0), font=name_font)
+        marks = "  ".join(
+            mark for mark, shown in (("SHINY", shiny), ("FAVORITE", favorite)) if shown
+        )
+        if marks:
+            draw.text((left + 8, label_top + 24), marks, fill=(0, 0, 0), font=mark_font)
+        draw.rectangle(
+            (left, top, left + tile_width - 1, top + tile_height - 1), outline=color, width=2
+        )
+
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        page.save(buffer, "WEBP", quality=85, method=4)
+    else:
+        page.save(buffer, "PNG", optimize=True)
+    data = buffer.getvalue()
+    write_atomic(Path(path), data)
+    return data
+
+
+def _thumbnail(key: str, card_path: Optional[str], thumb_dir: Path, fmt: str):
+    """Thumbnail of a card revision, made from the card and cached the first time"""
+    from PIL import Image, ImageOps
+
+    target = thumb_dir / f"{key}.{fmt}"
+    try:
+        return Image.open(target).convert("RGB")
+    except (OSError, ValueError):
+        pass
+    if card_path is None:
+        return None
+    try:
+        thumb = ImageOps.fit(Image.open(card_path).convert("RGB"), THUMB_SIZE)
+    except (OSError, ValueError):
+        return None
+
+    buffer = io.BytesIO()
+    thumb.save(buffer, "WEBP" if fmt == "webp" else "PNG")
+    write_atomic(target, buffer.getvalue())
+    # Drop the thumbnails of older revisions of the same car
+    car_id = key.split("-", 1)[0]
+    for old in thumb_dir.glob(f"{car_id}-*.{fmt}"):
+        if old != target:
+            old.unlink(missing_ok=True)
+    return thumb
+
+
+class GarageRenderer:
+    """
+    Paginated grid images of garages, cached on disk
+    A page is named after a hash of what it shows (the cars, their revision and the
+    shiny and favorite marks), so an unchanged page is read back without rendering.
+    Pages are dropped least recently viewed first past `max_bytes`, and all pages of
+    a user go as soon as a car is added to their garage.
+    """
+
+    def __init__(self, cards: CardRenderer, cache_dir: str, max_bytes: int):
+        self.cards = cards
+        self.cache_dir = Path(cache_dir)
+        self.thumb_dir = self.cache_dir / "thumbs"
+        self.max_bytes = max_bytes
+        # File name -> size, least recently viewed first
+        self._pages: OrderedDict[str, int] = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._size = 0
+        self._rendering: Dict[str, asyncio.Task] = {}
+
+    @property
+    def fmt(self) -> str:
+        return self.cards.fmt
+
+    @property
+    def filename(self) -> str:
+        """Attachment name, embeds refer to it with attachment://"""
+        return f"garage.{self.fmt}"
+
+    def file(self, data: bytes) -> discord.File:
+        return discord.File(io.BytesIO(data), filename=self.filename)
+
+    def start(self):
+        """Create the cache directories and index the pages cached by earlier runs"""
+        self.thumb_dir.mkdir(parents=True, exist_ok=True)
+        pages = []
+        for entry in os.scandir(self.cache_dir):
+            # Pages are named user-page-hash.fmt, anything else is left alone
+            if entry.is_file() and _PAGE_NAME.fullmatch(entry.name):
+                stat = entry.stat()
+                pages.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(pages):
+            self._remember(name, size)
+        self._evict()
+
+    def page_name(self, user_id: int, page: int, user_cars: Sequence) -> str:
+        """File name of a page, `user_cars` are the ones it shows with their car fetched"""
+        state = hashlib.blake2b(digest_size=12)
+        state.update(f"{GRID_VERSION}".encode())
+        for user_car in user_cars:
+            state.update(
+                f"|{user_car.id}:{user_car.car_id}:{user_car.car.updated_at.timestamp():.0f}"
+                f":{user_car.is_shiny:d}{user_car.is_favorite:d}".encode()
+            )
+        return f"{user_id}-{page}-{state.hexdigest()}.{self.fmt}"
+
+    async def get(self, user_id: int, page: int, user_cars: Sequence) -> bytes:
+        """Image of one garage page, rendered only if this state was never rendered"""
+        name = self.page_name(user_id, page, user_cars)
+        if name in self._pages:
+            self._pages.move_to_end(name)
+            try:
+                data = await asyncio.get_running_loop().run_in_executor(
+                    None, (self.cache_dir / name).read_bytes
+                )
+                record_cache_lookup("garages", True)
+                return data
+            except FileNotFoundError:
+                self._forget(name)
+        record_cache_lookup("garages", False)
+
+        # Double clicks on the same page share one render
+        task = self._rendering.get(name)
+        if task is None:
+            task = asyncio.create_task(self._render(user_id, name, list(user_cars)))
+            self._rendering[name] = task
+            task.add_done_callback(lambda _: self._rendering.pop(name, None))
+        return await asyncio.shield(task)
+
+    def invalidate(self, user_id: int):
+        """Drop the cached pages of a user whose garage changed"""
+        for name in list(self._by_user.get(user_id, ())):
+            self._forget(name)
+            (self.cache_dir / name).unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Cache sizes for the team commands"""
+        return {"pages": len(self._pages), "bytes": self._size, "rendering": len(self._rendering)}
+
+    async def _render(self, user_id: int, name: str, user_cars: List) -> bytes:
+        cars = {
+            user_car.car_id: CatalogCar(
+                user_car.car.id,
+                user_car.car.name,
+                user_car.car.model,
+                user_car.car.rarity,
+                user_car.car.updated_at,
+            )
+            for user_car in user_cars
+        }
+        # Cards come from their own caches, a failed one leaves an empty tile
+        cards = await asyncio.gather(
+            *(self.cards.get(car) for car in cars.values()), return_exceptions=True
+        )
+        available = {
+            car_id for car_id, card in zip(cars, cards) if not isinstance(card, BaseException)
+        }
+        tiles = [
+            (
+                self.cards.key(cars[user_car.car_id]),
+                str(self.cards.path(cars[user_car.car_id]))
+                if user_car.car_id in available else None,
+                user_car.car.name,
+                user_car.car.rarity,
+                user_car.is_shiny,
+                user_car.is_favorite,
+            )
+            for user_car in user_cars
+        ]
+
+        logger.debug(f"Rendering garage page {name}")
+        path = self.cache_dir / name
+        data = await self.cards.run(
+            render_garage_page, tiles, str(self.thumb_dir), str(path), self.fmt
+        )
+        self._remember(name, len(data))
+        self._evict()
+        return data
+
+    def _remember(self, name: str, size: int):
+        self._forget(name)
+        self._pages[name] = size
+        self._size += size
+        user_id = int(name.split("-", 1)[0])
+        self._by_user.setdefault(user_id, set()).add(name)
+
+    def _forget(self, name: str):
+        size = self._pages.pop(name, None)
+        if size is None:
+            return
+        self._size -= size
+        user_id = int(name.split("-", 1)[0])
+        names = self._by_user.get(user_id)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self._by_user[user_id]
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._pages:
+            name = next(iter(self._pages))
+            self._forget(name)
+            (self.cache_dir / name).unlink(missing_ok=True)
@@ -0,0 +1,147 @@
+"""Per-guild spawn and reward settings, resolved once and served from memory"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from carfigures.core.config import GuildConfigLimits, SpawnManagerConfig
+from carfigures.core.database import write_batcher
+from carfigures.models import GuildConfig
+
+logger = logging.getLogger(__name__)
+
+# Columns a guild can override, in the order of GuildConfig
+OVERRIDES = ("min_messages", "max_messages", "cooldown", "spawn_channels", "reward_multiplier")
+# Refreshes read again the rows written shortly before the last one seen, in case a
+# write timestamped earlier was committed later
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+
+class GuildSettings(NamedTuple):
+    """Settings of a guild with its overrides applied, shared and never modified"""
+    message_range: Tuple[int, int]  # Messages needed after the cooldown to spawn
+    cooldown: float  # Seconds after a spawn before messages count again
+    spawn_channels: Tuple[int, ...]  # Empty spawns where the activity happens
+    reward_multiplier: float
+    overridden: Tuple[str, ...] = ()  # Names of the overridden columns
+
+
+class GuildConfigCache:
+    """
+    Resolved settings of every guild, built from config.toml and guild_configs
+    The table is read once on startup and then polled for rows updated since, so a
+    spawn check is a dict lookup. Guilds without overrides share the settings built
+    from config.toml, a change made by this process is resolved again straight away.
+    """
+
+    def __init__(
+        self,
+        spawn_config: SpawnManagerConfig,
+        limits: GuildConfigLimits,
+    ):
+        self.spawn_config = spawn_config
+        self.limits = limits
+        low, high = spawn_config.required_message_range
+        self.default = GuildSettings((low, high), spawn_config.cooldown_time, (), 1.0)
+        self._resolved: Dict[int, GuildSettings] = {}
+        self._overrides: Dict[int, GuildConfig] = {}
+        self._last_update: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, guild_id: int) -> GuildSettings:
+        """Settings of a guild, without touching the database"""
+        settings = self._resolved.get(guild_id)
+        if settings is None:
+            settings = self._resolved[guild_id] = self._resolve(guild_id)
+        return settings
+
+    def _resolve(self, guild_id: int) -> GuildSettings:
+        default = self.default
+        channels = self.spawn_config.spawn_channels.get(guild_id)
+        if channels:
+            default = default._replace(spawn_channels=tuple(channels))
+        row = self._overrides.get(guild_id)
+        if row is None:
+            return default
+
+        overridden = tuple(name for name in OVERRIDES if getattr(row, name) is not None)
+        channels = row.spawn_channels
+        low = _pick(row.min_messages, default.message_range[0])
+        high = max(low, _pick(row.max_messages, default.message_range[1]))
+        return GuildSettings(
+            (low, high),
+            _pick(row.cooldown, default.cooldown),
+            default.spawn_channels if channels is None else tuple(channels),
+            _pick(row.reward_multiplier, default.reward_multiplier),
+            overridden,
+        )
+
+    # Changes
+
+    async def update(self, guild_id: int, **overrides: Any) -> GuildSettings:
+        """Override some settings of a guild, None puts one back to the global value"""
+        unknown = set(overrides) - set(OVERRIDES)
+        if unknown:
+            raise ValueError(f"Unknown guild settings: {', '.join(sorted(unknown))}")
+        current = self._overrides.get(guild_id)
+        values = {name: getattr(current, name, None) for name in OVERRIDES}
+        values.update(overrides)
+        row = GuildConfig(guild_id=guild_id, updated_at=datetime.now(timezone.utc), **values)
+        await write_batcher.submit(_save, [row])
+        self._remember(row)
+        return self.get(guild_id)
+
+    async def reset(self, guild_id: int) -> GuildSettings:
+        """Put every setting of a guild back to the global values"""
+        return await self.update(guild_id, **dict.fromkeys(OVERRIDES))
+
+    def _remember(self, row: GuildConfig):
+        self._overrides[row.guild_id] = row
+        self._resolved.pop(row.guild_id, None)
+
+    # Loading
+
+    async def refresh(self) -> int:
+        """Read the rows written since the last refresh, returns how many changed"""
+        qs = GuildConfig.all()
+        if self._last_update is not None:
+            qs = qs.filter(updated_at__gt=self._last_update - REFRESH_OVERLAP)
+        rows = await qs.order_by("updated_at")
+        changed = 0
+        for row in rows:
+            known = self._overrides.get(row.guild_id)
+            if known is None or known.updated_at != row.updated_at:
+                self._remember(row)
+                changed += 1
+        if rows:
+            self._last_update = max(self._last_update or rows[-1].updated_at, rows[-1].updated_at)
+        return changed
+
+    def start(self):
+        """Poll for rows written by other processes on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="carfigures-guild-config")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.limits.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Could not refresh guild settings")
+
+
+def _pick(override: Any, default: Any) -> Any:
+    return default if override is None else override
+
+
+async def _save(rows: List[GuildConfig]):
+    await GuildConfig.bulk_create(
+        rows, on_conflict=["guild_id"], update_fields=[*OVERRIDES, "updated_at"]
+    )
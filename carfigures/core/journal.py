@@ -0,0 +1,199 @@
+"""Coin transaction journal and the job checking balances against it"""
+
+import argparse
+import asyncio
+import functools
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from tortoise import Tortoise
+from tortoise.functions import Sum
+from tortoise.transactions import in_transaction
+
+from carfigures.core.database import TORTOISE_ORM, WRITER_CONNECTION, write_batcher
+from carfigures.core.economy import economy_stats
+from carfigures.models import CoinReason, CoinTransaction, UserCoins
+
+logger = logging.getLogger(__name__)
+
+# Users per query of the verification job
+CHUNK_SIZE = 1000
+
+_Entry = Tuple[int, int, CoinReason, Optional[int], datetime]
+
+
+async def record(
+    user_id: int, delta: int, reason: CoinReason, reference_id: Optional[int] = None
+):
+    """
+    Journal a balance change
+    Inside the write batcher the entry joins the single INSERT written before the batch
+    commits, so it lands in the same transaction as the balance without a round trip
+    of its own. The economy counters only see the change once the batch commits.
+    """
+    write_batcher.after_commit(functools.partial(economy_stats.record_coins, delta, reason))
+    await write_batcher.defer(
+        _append, (user_id, delta, reason, reference_id, datetime.now(timezone.utc))
+    )
+
+
+async def _append(entries: List[_Entry]):
+    await CoinTransaction.bulk_create([
+        CoinTransaction(
+            user_id=user_id,
+            delta=delta,
+            reason=reason,
+            reference_id=reference_id,
+            created_at=created_at,
+        )
+        for user_id, delta, reason, reference_id, created_at in entries
+    ])
+
+
+async def adjust(balances: Dict[int, int], reason: CoinReason = CoinReason.IMPORT) -> int:
+    """
+    Journal balances about to be overwritten outside the coin paths, returns how many change
+    Call it inside the transaction writing the new balances, before writing them. Each
+    user whose balance changes gets an entry for the difference, so the journal still
+    sums up to the balance afterwards.
+    """
+    current = dict(await UserCoins.filter(user_id__in=list(balances)).values_list(
+        "user_id", "balance"
+    ))
+    now = datetime.now(timezone.utc)
+    entries = [
+        (user_id, balance - current.get(user_id, 0), reason, None, now)
+        for user_id, balance in balances.items()
+        if balance != current.get(user_id, 0)
+    ]
+    if entries:
+        await _append(entries)
+    return len(entries)
+
+
+async def history(
+    user_id: int, limit: int = 10, before_id: Optional[int] = None
+) -> List[CoinTransaction]:
+    """A user's entries newest first, continue with the id of the last one as `before_id`"""
+    qs = CoinTransaction.filter(user_id=user_id)
+    if before_id is not None:
+        qs = qs.filter(id__lt=before_id)
+    return await qs.order_by("-id").limit(limit)
+
+
+class Mismatch(NamedTuple):
+    user_id: int
+    balance: int
+    journal: int  # Sum of the user's deltas
+
+    @property
+    def difference(self) -> int:
+        return self.balance - self.journal
+
+
+async def _balances(chunk_size: int) -> AsyncIterator[List[Tuple[int, int]]]:
+    """(user id, balance) of every user, a chunk at a time in user id order"""
+    last_id = None
+    while True:
+        qs = UserCoins.all()
+        if last_id is not None:
+            qs = qs.filter(user_id__gt=last_id)
+        rows = await qs.order_by("user_id").limit(chunk_size).values_list("user_id", "balance")
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            break
+        last_id = rows[-1][0]
+
+
+async def _journal_sums(user_ids: List[int]) -> Dict[int, int]:
+    rows = await CoinTransaction.filter(user_id__in=user_ids).annotate(
+        total=Sum("delta")
+    ).group_by("user_id").values_list("user_id", "total")
+    return dict(rows)
+
+
+async def verify_balances(chunk_size: int = CHUNK_SIZE) -> AsyncIterator[Mismatch]:
+    """
+    Rebuild every balance from the journal and yield those that differ
+    Users are read a chunk at a time and their journal summed with one grouped query
+    per chunk, so memory stays flat however many users and entries there are.
+    """
+    async for rows in _balances(chunk_size):
+        sums = await _journal_sums([user_id for user_id, _ in rows])
+        for user_id, balance in rows:
+            journal = sums.get(user_id) or 0
+            if journal != balance:
+                yield Mismatch(user_id, balance, journal)
+
+
+async def open_balances(chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Journal the current balance of users without any entry, returns how many
+    Run once when the journal is introduced, balances from before then have no history.
+    """
+    opened = 0
+    async for rows in _balances(chunk_size):
+        async with in_transaction(WRITER_CONNECTION):
+            journaled = set(await CoinTransaction.filter(
+                user_id__in=[user_id for user_id, _ in rows]
+            ).distinct().values_list("user_id", flat=True))
+            now = datetime.now(timezone.utc)
+            entries = [
+                (user_id, balance, CoinReason.OPENING_BALANCE, None, now)
+                for user_id, balance in rows
+                if user_id not in journaled and balance
+            ]
+            if entries:
+                await _append(entries)
+        opened += len(entries)
+    logger.info(f"Opened {opened} balances in the coin journal")
+    return opened
+
+
+# Command line
+
+
+async def run(args: argparse.Namespace) -> int:
+    await Tortoise.init(config=TORTOISE_ORM)
+    await Tortoise.generate_schemas()
+    try:
+        if args.command == "open":
+            print(f"{await open_balances()} balances opened")
+            return 0
+
+        mismatches = 0
+        async for mismatch in verify_balances():
+            mismatches += 1
+            if mismatches <= args.show:
+                print(
+                    f"user {mismatch.user_id}: balance {mismatch.balance}, "
+                    f"journal {mismatch.journal} ({mismatch.difference:+})"
+                )
+        print(f"{mismatches} balances differ from the journal")
+        return 1 if mismatches else 0
+    finally:
+        await Tortoise.close_connections()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m carfigures.core.journal",
+        description="Check coin balances against the transaction journal",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    verify_parser = subparsers.add_parser(
+        "verify", help="Rebuild balances from the journal and list those that differ"
+    )
+    verify_parser.add_argument("--show", type=int, default=20, help="Mismatches to print")
+    subparsers.add_parser("open", help="Journal the balance of users without history")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Non-blocking logging pipeline with rotation and deduplication"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has, anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "repeat_count"}
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        repeat_count = getattr(record, "repeat_count", 0)
+        if repeat_count:
+            payload["repeated"] = repeat_count
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in payload:
+                payload[key] = value
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain text formatter that mentions how many duplicates were collapsed"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        repeat_count = getattr(record, "repeat_count", 0)
+        if repeat_count:
+            line += f" (repeated {repeat_count} more times)"
+        return line
+
+
+class DeduplicationFilter(logging.Filter):
+    """
+    Collapse identical records logged within a time window
+    The first record goes through, duplicates inside the window are dropped and their
+    number is attached as `repeat_count` to the next identical record that gets out.
+    """
+
+    def __init__(self, window: float = 1.0, max_keys: int = 1024):
+        super().__init__()
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> (window start, duplicates dropped since the last emitted record)
+        self._seen: Dict[Tuple[str, int, str], List[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.window <= 0:
+            return True
+
+        key = (record.name, record.levelno, record.getMessage())
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and record.created - entry[0] < self.window:
+                entry[1] += 1
+                return False
+
+            if entry is not None and entry[1]:
+                record.repeat_count = int(entry[1])
+            elif len(self._seen) >= self.max_keys:
+                self._evict(record.created)
+            self._seen[key] = [record.created, 0]
+        return True
+
+    def _evict(self, now: float):
+        stale = [key for key, (start, dropped) in self._seen.items()
+                 if now - start >= self.window and not dropped]
+        for key in stale or list(self._seen)[: self.max_keys // 2]:
+            del self._seen[key]
+
+    def pending(self) -> List[logging.LogRecord]:
+        """Summary records for duplicates that were dropped and never reported"""
+        records = []
+        with self._lock:
+            for (name, levelno, message), (_, dropped) in self._seen.items():
+                if dropped:
+                    record = logging.makeLogRecord(
+                        {"name": name, "levelno": levelno,
+                         "levelname": logging.getLevelName(levelno), "msg": message}
+                    )
+                    record.repeat_count = int(dropped)
+                    records.append(record)
+            self._seen.clear()
+        return records
+
+
+class SizedTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """Rotate on a schedule, or earlier when the file grows past max_bytes"""
+
+    def __init__(self, filename: str, max_bytes: int = 0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes
+
+    def rotation_filename(self, default_name: str) -> str:
+        # Size rollovers can happen several times per period, never overwrite a backup
+        name = super().rotation_filename(default_name)
+        candidate, index = name, 1
+        while os.path.exists(candidate):
+            candidate = f"{name}.{index}"
+            index += 1
+        return candidate
+
+
+class LoggingPipeline:
+    """Queue based logging, all formatting of output and disk I/O happens off the loop"""
+
+    def __init__(self, listener: logging.handlers.QueueListener, dedup: DeduplicationFilter):
+        self.listener = listener
+        self.dedup = dedup
+
+    def stop(self):
+        """Report pending duplicates and flush everything to the handlers"""
+        for record in self.dedup.pending():
+            self.listener.queue.put_nowait(record)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+def setup_logging(
+    path: str = "carfigures.log",
+    level: int = logging.INFO,
+    json_output: bool = True,
+    max_bytes: int = 10 * 1024 * 1024,
+    rotate_when: str = "midnight",
+    backup_count: int = 7,
+    dedup_window: float = 1.0,
+) -> LoggingPipeline:
+    """Install the queue based logging pipeline on the root logger"""
+    file_handler = SizedTimedRotatingFileHandler(
+        path,
+        max_bytes=max_bytes,
+        when=rotate_when,
+        backupCount=backup_count,
+        encoding="utf-8",
+        delay=True,
+    )
+    file_handler.setFormatter(JSONFormatter() if json_output else TextFormatter(TEXT_FORMAT))
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(TextFormatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _RawQueueHandler(log_queue)
+    dedup = DeduplicationFilter(dedup_window)
+    queue_handler.addFilter(dedup)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    return LoggingPipeline(listener, dedup)
+
+
+class _RawQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only make the record safe to hand over: render args, keep exc_info for the
+        # formatters. Tracebacks hold frames but are not mutated after this point.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
@@ -0,0 +1,178 @@
+"""Prometheus metrics for commands, spawns, database and gateway"""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Optional, Sequence
+
+from carfigures.core.context import current_operation
+from carfigures.core.database import add_query_listener
+
+try:
+    import prometheus_client
+except ImportError:  # Only installed with the "metrics" dependency group
+    prometheus_client = None
+
+if TYPE_CHECKING:
+    from discord.ext import commands
+
+logger = logging.getLogger(__name__)
+
+
+class _NoopMetric:
+    """Stand-in used when prometheus-client is not installed"""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def observe(self, amount: float):
+        pass
+
+    def set(self, value: float):
+        pass
+
+
+def _counter(name: str, documentation: str, labels: Sequence[str] = ()):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Counter(name, documentation, labels)
+
+
+def _gauge(name: str, documentation: str, labels: Sequence[str] = ()):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Gauge(name, documentation, labels)
+
+
+def _histogram(name: str, documentation: str, labels: Sequence[str] = (), buckets=None):
+    if prometheus_client is None:
+        return _NoopMetric()
+    if buckets is None:
+        return prometheus_client.Histogram(name, documentation, labels)
+    return prometheus_client.Histogram(name, documentation, labels, buckets=buckets)
+
+
+_FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+COMMAND_LATENCY = _histogram(
+    "carfigures_command_duration_seconds",
+    "Time spent running prefix commands",
+    ["command", "status"],
+)
+INTERACTION_LATENCY = _histogram(
+    "carfigures_interaction_duration_seconds",
+    "Time spent handling component interactions",
+    ["component"],
+)
+SPAWNS = _counter(
+    "carfigures_spawns_total",
+    "Cars spawned, by guild size bucket",
+    ["guild_bucket"],
+)
+CATCHES = _counter(
+    "carfigures_catches_total",
+    "Cars caught, by guild size bucket",
+    ["guild_bucket"],
+)
+DB_QUERIES = _counter(
+    "carfigures_db_queries_total",
+    "SQL statements executed, by command or interaction",
+    ["operation"],
+)
+DB_QUERY_DURATION = _histogram(
+    "carfigures_db_query_duration_seconds",
+    "SQL statement duration, by command or interaction",
+    ["operation"],
+    buckets=_FAST_BUCKETS,
+)
+EVENT_LOOP_LAG = _gauge(
+    "carfigures_event_loop_lag_seconds",
+    "How late the last metrics sampler wake-up was",
+)
+GATEWAY_LATENCY = _gauge(
+    "carfigures_gateway_latency_seconds",
+    "Discord gateway heartbeat latency",
+)
+GUILDS = _gauge("carfigures_guilds", "Guilds the bot is connected to")
+CACHE_REQUESTS = _counter(
+    "carfigures_cache_requests_total",
+    "In-memory cache lookups, by cache and result",
+    ["cache", "result"],
+)
+OUTBOUND_QUEUE_DEPTH = _gauge(
+    "carfigures_outbound_queue_depth",
+    "Outgoing messages waiting for rate-limit budget, by priority",
+    ["priority"],
+)
+OUTBOUND_WAIT = _histogram(
+    "carfigures_outbound_wait_seconds",
+    "Time outgoing messages spent waiting for rate-limit budget, by priority",
+    ["priority"],
+    buckets=_FAST_BUCKETS,
+)
+OUTBOUND_DROPPED = _counter(
+    "carfigures_outbound_dropped_total",
+    "Outgoing messages dropped before being sent, by priority and reason",
+    ["priority", "reason"],
+)
+RATE_LIMITED = _counter(
+    "carfigures_rate_limited_total",
+    "Calls rejected by the rate limiter, by command and scope",
+    ["command", "scope"],
+)
+
+
+def guild_bucket(member_count: Optional[int]) -> str:
+    """Collapse guild sizes into a few buckets to keep label cardinality low"""
+    if not member_count:
+        return "unknown"
+    if member_count < 100:
+        return "<100"
+    if member_count < 1_000:
+        return "<1k"
+    if member_count < 10_000:
+        return "<10k"
+    return "10k+"
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def _observe_query(query: str, duration: float):
+    operation = current_operation.get()
+    DB_QUERIES.labels(operation).inc()
+    DB_QUERY_DURATION.labels(operation).observe(duration)
+
+
+def enable_query_metrics():
+    """Start counting SQL statements per operation"""
+    if prometheus_client is not None:
+        add_query_listener(_observe_query)
+
+
+def start_metrics_server(host: str, port: int) -> bool:
+    """Serve /metrics from a background thread, returns whether it started"""
+    if prometheus_client is None:
+        logger.warning("Prometheus is enabled but prometheus-client is not installed")
+        return False
+    prometheus_client.start_http_server(port, addr=host)
+    logger.info(f"Serving Prometheus metrics on {host}:{port}")
+    return True
+
+
+async def sample_runtime(bot: "commands.Bot", interval: float = 5.0):
+    """Periodically record event-loop lag, gateway latency and guild count"""
+    loop = asyncio.get_running_loop()
+    while not bot.is_closed():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - started - interval))
+
+        latency = bot.latency
+        if latency == latency and latency != float("inf"):  # NaN/inf before the first heartbeat
+            GATEWAY_LATENCY.set(latency)
+        GUILDS.set(len(bot.guilds))
@@ -0,0 +1,348 @@
+"""Priority scheduler and rate-limit budgeting for outgoing Discord messages"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from carfigures.core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Outgoing message classes, lower values go first"""
+    INTERACTION = 0
+    REPLY = 1
+    SPAWN = 2
+
+
+class SendDropped(Exception):
+    """Raised to the caller of a send that was dropped instead of delivered"""
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` tokens per second"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        """Consume a token, callers check delay() first"""
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket has fully refilled, so forgetting it loses nothing"""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+@dataclass(order=True)
+class _Send:
+    priority: int
+    seq: int
+    route: Optional[Hashable] = field(compare=False)
+    factory: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    coalesce_key: Optional[Hashable] = field(compare=False, default=None)
+    queued: bool = field(compare=False, default=True)  # Still counted in the queue depth
+
+
+# Sends of one priority on one route, they go out in order
+_QueueKey = Tuple[int, Optional[Hashable]]
+
+
+class OutboundScheduler:
+    """
+    Order outgoing messages by priority within a global and per-route budget
+    Interaction responses are exempt from Discord's global limit and always go first,
+    command replies come next and spawns last. A newer spawn for the same coalesce key
+    replaces the one still waiting, and spawns that waited too long are dropped.
+
+    Sends wait in one FIFO queue per priority and route, only queue heads are looked at.
+    Heads whose route has budget sit in a heap per priority ordered by arrival, the
+    others in a heap ordered by when their route refills, so picking the next send does
+    not scan everything waiting behind a busy channel.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 45.0,
+        route_rate: float = 1.0,
+        route_burst: float = 5.0,
+        spawn_max_age: float = 10.0,
+        max_routes: int = 10_000,
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.route_rate = route_rate
+        self.route_burst = route_burst
+        self.spawn_max_age = spawn_max_age
+        self.max_routes = max_routes
+
+        self._routes: Dict[Hashable, TokenBucket] = {}
+        self._queues: Dict[_QueueKey, Deque[_Send]] = {}
+        self._ready: Dict[int, List[Tuple[int, _QueueKey]]] = {p: [] for p in Priority}
+        self._waiting: List[Tuple[float, int, _QueueKey]] = []  # By route ready time
+        self._spawns: Deque[_Send] = deque()  # By age, stale ones are dropped from the front
+        self._depth: Dict[int, int] = {priority: 0 for priority in Priority}
+        self._coalesced: Dict[Hashable, _Send] = {}
+        self._dispatching: Set[asyncio.Task] = set()
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether sends are queued, otherwise they go straight through"""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the dispatch task on the running loop"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="carfigures-outbound")
+
+    async def stop(self):
+        """Stop dispatching and drop whatever is still waiting"""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        for queue in self._queues.values():
+            for job in queue:
+                self._drop(job, "shutdown")
+        self._queues.clear()
+        self._waiting.clear()
+        self._spawns.clear()
+        for ready in self._ready.values():
+            ready.clear()
+
+    def depth(self, priority: Priority) -> int:
+        """Number of messages of a priority class waiting for budget"""
+        return self._depth[priority]
+
+    async def send(
+        self,
+        priority: Priority,
+        route: Optional[Hashable],
+        factory: Callable[[], Awaitable[Any]],
+        coalesce_key: Optional[Hashable] = None,
+    ) -> Any:
+        """
+        Run `factory` once the budget allows it and return its result
+        `route` groups sends sharing a Discord rate-limit bucket, usually the channel id.
+        Raises SendDropped if the send was superseded, went stale or the bot shut down.
+        """
+        if not self.running:
+            return await factory()
+
+        now = time.monotonic()
+        # Fast path, nothing of equal or higher priority waiting and budget available
+        if not any(self._depth[p] for p in Priority if p <= priority):
+            if self._ready_delay(priority, route, now) == 0:
+                self._acquire(priority, route, now)
+                metrics.OUTBOUND_WAIT.labels(priority.name.lower()).observe(0)
+                return await factory()
+
+        job = _Send(
+            priority, next(self._seq), route, factory,
+            asyncio.get_running_loop().create_future(), now, coalesce_key,
+        )
+        if coalesce_key is not None:
+            previous = self._coalesced.get(coalesce_key)
+            if previous is not None:
+                self._drop(previous, "superseded")
+            self._coalesced[coalesce_key] = job
+
+        key = (job.priority, route)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+        queue.append(job)
+        if len(queue) == 1:
+            self._schedule(key, now)
+        if job.priority == Priority.SPAWN:
+            self._spawns.append(job)
+        self._set_depth(job.priority, 1)
+        self._wakeup.set()
+        return await job.future
+
+    def _route_bucket(self, route: Hashable, now: float) -> TokenBucket:
+        bucket = self._routes.get(route)
+        if bucket is None:
+            if len(self._routes) >= self.max_routes:
+                for key in [k for k, b in self._routes.items() if b.is_full(now)]:
+                    del self._routes[key]
+            bucket = self._routes[route] = TokenBucket(self.route_rate, self.route_burst, now)
+        return bucket
+
+    def _ready_delay(self, priority: int, route: Optional[Hashable], now: float) -> float:
+        delay = 0.0
+        if priority != Priority.INTERACTION:
+            delay = self.global_bucket.delay(now)
+        if route is not None:
+            delay = max(delay, self._route_bucket(route, now).delay(now))
+        return delay
+
+    def _acquire(self, priority: int, route: Optional[Hashable], now: float):
+        if priority != Priority.INTERACTION:
+            self.global_bucket.take(now)
+        if route is not None:
+            self._route_bucket(route, now).take(now)
+
+    def _set_depth(self, priority: int, change: int):
+        self._depth[priority] += change
+        metrics.OUTBOUND_QUEUE_DEPTH.labels(Priority(priority).name.lower()).set(
+            self._depth[priority]
+        )
+
+    def _remove(self, job: _Send):
+        # Jobs stay in their queue until they reach its head, they are skipped there
+        if job.queued:
+            job.queued = False
+            self._set_depth(job.priority, -1)
+        if job.coalesce_key is not None and self._coalesced.get(job.coalesce_key) is job:
+            del self._coalesced[job.coalesce_key]
+
+    def _drop(self, job: _Send, reason: str):
+        self._remove(job)
+        metrics.OUTBOUND_DROPPED.labels(Priority(job.priority).name.lower(), reason).inc()
+        if not job.future.done():
+            job.future.set_exception(SendDropped(reason))
+
+    def _schedule(self, key: _QueueKey, now: float):
+        """Put a queue with a new head in the ready heap, or wait for its route"""
+        priority, route = key
+        head = self._queues[key][0]
+        delay = 0.0 if route is None else self._route_bucket(route, now).delay(now)
+        if delay == 0:
+            heapq.heappush(self._ready[priority], (head.seq, key))
+        else:
+            heapq.heappush(self._waiting, (now + delay, head.seq, key))
+
+    def _head(self, key: _QueueKey) -> Optional[_Send]:
+        """First live send of a queue, the queue is forgotten once empty"""
+        queue = self._queues[key]
+        while queue and (not queue[0].queued or queue[0].future.done()):
+            self._remove(queue.popleft())  # Dropped, or the caller gave up
+        if not queue:
+            del self._queues[key]
+            return None
+        return queue[0]
+
+    def _next_ready(self, now: float) -> Tuple[Optional[_Send], float]:
+        """Highest priority send that can go now, or how long until one might"""
+        while self._spawns and (
+            not self._spawns[0].queued or now - self._spawns[0].enqueued_at > self.spawn_max_age
+        ):
+            job = self._spawns.popleft()
+            if job.queued and not job.future.done():
+                self._drop(job, "stale")
+
+        while self._waiting and self._waiting[0][0] <= now:
+            _, _, key = heapq.heappop(self._waiting)
+            if self._head(key) is not None:
+                self._schedule(key, now)
+
+        waits = []
+        for priority in Priority:
+            ready = self._ready[priority]
+            if ready and priority != Priority.INTERACTION:
+                delay = self.global_bucket.delay(now)
+                if delay > 0:
+                    waits.append(delay)
+                    continue
+            while ready:
+                seq, key = ready[0]
+                job = self._head(key)
+                if job is not None and job.seq == seq and (
+                    key[1] is None or self._route_bucket(key[1], now).delay(now) == 0
+                ):
+                    return job, 0.0
+                # The head changed or another priority used the route's budget
+                heapq.heappop(ready)
+                if job is not None:
+                    self._schedule(key, now)
+        if self._waiting:
+            waits.append(self._waiting[0][0] - now)
+        if self._spawns:
+            # Wake up to drop the oldest spawn, its caller should not wait for the route
+            waits.append(self._spawns[0].enqueued_at + self.spawn_max_age - now)
+        return None, min(waits, default=1.0)
+
+    def _pop(self, job: _Send, now: float):
+        """Take the head of its queue for dispatch, the next one gets scheduled"""
+        key = (job.priority, job.route)
+        heapq.heappop(self._ready[job.priority])
+        self._queues[key].popleft()
+        self._remove(job)
+        if self._head(key) is not None:
+            self._schedule(key, now)
+
+    async def _run(self):
+        while True:
+            if not any(self._depth.values()):
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            job, wait = self._next_ready(now)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._acquire(job.priority, job.route, now)
+            self._pop(job, now)
+            metrics.OUTBOUND_WAIT.labels(Priority(job.priority).name.lower()).observe(
+                now - job.enqueued_at
+            )
+            task = asyncio.create_task(self._dispatch(job))
+            self._dispatching.add(task)
+            task.add_done_callback(self._dispatching.discard)
+
+    @staticmethod
+    async def _dispatch(job: _Send):
+        try:
+            result = await job.factory()
+        except Exception as exc:
+            if not job.future.done():
+                job.future.set_exception(exc)
+            else:
+                logger.debug(f"Outbound send failed after its caller left: {exc}")
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
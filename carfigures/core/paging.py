@@ -0,0 +1,52 @@
+"""Keyset pagination over Tortoise querysets"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from tortoise.queryset import QuerySet
+
+
+@dataclass
+class KeysetPage:
+    rows: List[Dict[str, Any]]
+    next_cursor: Optional[int]  # Pass as `after` to get the following (older) rows
+    prev_cursor: Optional[int]  # Pass as `before` to get the previous (newer) rows
+
+
+async def keyset_page(
+    qs: QuerySet,
+    fields: Sequence[str],
+    page_size: int,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    key: str = "id",
+) -> KeysetPage:
+    """
+    One page of `qs`, newest first, seeking on `key` instead of using OFFSET
+    Every page costs the same index range scan however deep it is, and no count is run.
+    """
+    fields = list(fields) if key in fields else [key, *fields]
+
+    if before is not None:
+        # Walk backwards in ascending order, then flip the page back
+        rows = await (
+            qs.filter(**{f"{key}__gt": before}).order_by(key).limit(page_size + 1).values(*fields)
+        )
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=rows[-1][key] if rows else None,
+            prev_cursor=rows[0][key] if rows and has_more else None,
+        )
+
+    if after is not None:
+        qs = qs.filter(**{f"{key}__lt": after})
+    rows = await qs.order_by(f"-{key}").limit(page_size + 1).values(*fields)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return KeysetPage(
+        rows,
+        next_cursor=rows[-1][key] if rows and has_more else None,
+        prev_cursor=rows[0][key] if rows and after is not None else None,
+    )
@@ -1,21 +1,42 @@
 """Admin panel using FastAPI and fastapi-admin"""
 
+import io
 import os
-from fastapi import FastAPI
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Type
+
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Path, UploadFile
 from fastapi_admin.app import app as admin_app
+from fastapi_admin.depends import get_current_admin, get_model, get_model_resource, get_resources
 from fastapi_admin.enums import Method
 from fastapi_admin.file_upload import FileUpload
 from fastapi_admin.middlewares import AdminMiddleware
 from fastapi_admin.models import AbstractAdmin
 from fastapi_admin.providers.login import UsernamePasswordProvider
 from fastapi_admin.resources import Action, Dropdown, Field, Link, Model, ToolbarAction
+from fastapi_admin.resources import render_values
+from fastapi_admin.routes.resources import list_view
+from fastapi_admin.template import add_template_folder, templates
+from fastapi_admin.widgets import filters
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.requests import Request
+from starlette.responses import StreamingResponse
 from starlette.staticfiles import StaticFiles
 from tortoise import Tortoise
+from tortoise.models import Model as TortoiseModel
+
+from carfigures.models import (
+    User, Car, CatchTiming, CoinTransaction, Pack, PackContent, Resolution, UserCoins, UserPack
+)
+from carfigures.core import metrics, transfer
+from carfigures.core.context import operation
+from carfigures.core.dashboard import dashboard_stats
+from carfigures.core.database import TORTOISE_ORM, install_query_hook
+from carfigures.core.economy import economy_stats
+from carfigures.core.paging import keyset_page
 
-from carfigures.models import User, Car, Pack, PackContent, UserCoins, UserPack
-from carfigures.__main__ import TORTOISE_ORM
+# Rows per list page, whatever the page_size query parameter says
+MAX_PAGE_SIZE = 100
 
 # Create FastAPI app
 _app = FastAPI()
@@ -32,6 +53,17 @@ _app.add_middleware(AdminMiddleware)
 # Mount static files
 _app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Expose Prometheus metrics when the metrics dependency group is installed
+if metrics.prometheus_client is not None:
+    _app.mount("/metrics", metrics.prometheus_client.make_asgi_app())
+
+
+@_app.middleware("http")
+async def track_operation(request: Request, call_next):
+    """Attribute database queries made while serving the panel"""
+    with operation("panel"):
+        return await call_next(request)
+
 
 class AdminUser(AbstractAdmin):
     """Admin user for login"""
@@ -67,18 +99,171 @@ admin_app.add_provider(
 # File upload configuration
 upload = FileUpload(uploads_dir="static/uploads")
 
+# Templates shipped with the panel, searched before the fastapi-admin ones
+add_template_folder(os.path.join(os.path.dirname(__file__), "templates"))
+
+
+def _indexed_fields(model: Type[TortoiseModel]) -> Set[str]:
+    """Fields a filter can use without scanning the table"""
+    meta = model._meta
+    indexed = {meta.pk_attr}
+    leading = [group[0] for group in (*meta.indexes, *meta.unique_together)
+               if isinstance(group, (tuple, list))]
+    for name, field in meta.fields_map.items():
+        if field.pk or field.unique or field.index or name in leading:
+            indexed.add(name)
+            source_field = getattr(field, "source_field", None)
+            if source_field:
+                indexed.add(source_field)
+    return indexed
+
+
+class KeysetModel(Model):
+    """
+    Resource listed with keyset pagination
+    The list only fetches `list_fields`, following foreign keys with joins
+    (``user__username``), heavy columns are left to the update view. Filters must hit an
+    index, which is checked when the resource is declared.
+    """
+    list_fields: List[Field] = []
+    page_size = 25
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        indexed = _indexed_fields(cls.model)
+        for widget in cls.filters:
+            column = widget.context.get("name").split("__", 1)[0]
+            if column not in indexed:
+                raise ValueError(f"{cls.__name__} filters on {column}, which has no index")
+
+
+@admin_app.get("/{resource}/list", dependencies=[Depends(get_current_admin)])
+async def keyset_list_view(
+    request: Request,
+    model=Depends(get_model),
+    resources=Depends(get_resources),
+    model_resource=Depends(get_model_resource),
+    resource: str = Path(...),
+    page_size: int = 0,
+    page_num: int = 1,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+):
+    """List view of keyset resources, others keep the stock offset pagination"""
+    if not isinstance(model_resource, KeysetModel):
+        return await list_view(
+            request, model, resources, model_resource, resource, page_size or 10, page_num
+        )
+    
+    page_size = min(page_size or model_resource.page_size, MAX_PAGE_SIZE)
+    qs = model.all()
+    params, qs = await model_resource.resolve_query_params(request, dict(request.query_params), qs)
+    widgets = await model_resource.get_filters(request, params)
+    
+    fields = model_resource.list_fields
+    page = await keyset_page(
+        qs,
+        [field.name for field in fields],
+        page_size,
+        after=int(after) if after else None,
+        before=int(before) if before else None,
+    )
+    rendered_values, row_attributes, column_attributes, cell_attributes = await render_values(
+        request, model_resource, fields, page.rows
+    )
+    return templates.TemplateResponse(
+        "keyset_list.html",
+        context={
+            "request": request,
+            "resources": resources,
+            "fields_label": [field.label for field in fields],
+            "rendered_values": rendered_values,
+            "row_attributes": row_attributes,
+            "column_attributes": column_attributes,
+            "cell_attributes": cell_attributes,
+            "pks": [row["id"] for row in page.rows],
+            "filters": widgets,
+            "resource": resource,
+            "model_resource": model_resource,
+            "resource_label": model_resource.label,
+            "page_size": page_size,
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+            "page_title": model_resource.page_title,
+            "page_pre_title": model_resource.page_pre_title,
+        },
+    )
+
+
+# Routes match in order, put the keyset list view in front of the stock one
+admin_app.router.routes.insert(0, admin_app.router.routes.pop())
+
+
+@admin_app.get("/transfer/{table}.{fmt}", dependencies=[Depends(get_current_admin)])
+async def export_table(table: str, fmt: str):
+    """Download a table as CSV or NDJSON, streamed a chunk of rows at a time"""
+    try:
+        transfer.get_table(table)
+        fmt = transfer.format_for(table, fmt)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    
+    return StreamingResponse(
+        transfer.export_rows(table, fmt),
+        media_type="text/csv" if fmt == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{table}.{fmt}"'},
+    )
+
+
+@admin_app.post("/transfer/{table}", dependencies=[Depends(get_current_admin)])
+async def import_table(
+    table: str, file: UploadFile = File(...), fmt: Optional[str] = Form(None)
+):
+    """Upsert an uploaded CSV or NDJSON file, read straight from the spooled upload"""
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        fmt = transfer.format_for(file.filename or "", fmt)
+        with operation("panel_import"):
+            count = await transfer.import_rows(table, transfer.read_rows(stream, fmt))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        stream.detach()
+    return {"table": table, "rows": count}
+
+
+@admin_app.get("/economy", dependencies=[Depends(get_current_admin)])
+async def economy_series(resolution: str = "hour", days: int = 7):
+    """Mint, burn and pack sale series from the rollup table, for the economy charts"""
+    try:
+        bucket = Resolution[resolution.upper()]
+    except KeyError:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown resolution {resolution!r}, use minute, hour or day"
+        )
+    since = datetime.now(timezone.utc) - timedelta(days=max(1, min(days, 365)))
+    return await economy_stats.series(bucket, since)
+
 
 # Admin resources
 @admin_app.register
-class UserResource(Model):
+class UserResource(KeysetModel):
     label = "Users"
     model = User
     icon = "fas fa-users"
     page_pre_title = "User Management"
     page_title = "Users"
     filters = [
+        filters.Search(name="id", label="Discord ID"),
+        filters.Search(name="username", label="Username"),
+    ]
+    list_fields = [
+        Field("id", label="Discord ID"),
         Field("username", label="Username"),
         Field("cars_caught", label="Cars Caught"),
+        Field("total_coins_earned", label="Total Coins Earned"),
+        Field("packs_opened", label="Packs Opened"),
+        Field("created_at", label="Joined At"),
     ]
     fields = [
         Field("id", label="Discord ID"),
@@ -150,15 +335,21 @@ class PackResource(Model):
 
 
 @admin_app.register
-class PackContentResource(Model):
+class PackContentResource(KeysetModel):
     label = "Pack Contents"
     model = PackContent
     icon = "fas fa-list"
     page_pre_title = "Pack Management"
     page_title = "Pack Contents"
     filters = [
-        Field("pack", label="Pack"),
-        Field("car", label="Car"),
+        filters.ForeignKey(Pack, name="pack_id", label="Pack"),
+        filters.ForeignKey(Car, name="car_id", label="Car"),
+    ]
+    list_fields = [
+        Field("id", label="ID"),
+        Field("pack__name", label="Pack"),
+        Field("car__name", label="Car"),
+        Field("drop_rate", label="Drop Rate %"),
     ]
     fields = [
         Field("id", label="ID"),
@@ -169,15 +360,23 @@ class PackContentResource(Model):
 
 
 @admin_app.register
-class UserCoinsResource(Model):
+class UserCoinsResource(KeysetModel):
     label = "User Coins"
     model = UserCoins
     icon = "fas fa-coins"
     page_pre_title = "Economy"
     page_title = "User Coins"
     filters = [
-        Field("balance", label="Balance"),
+        filters.Search(name="user_id", label="Discord ID"),
+    ]
+    list_fields = [
+        Field("id", label="ID"),
+        Field("user_id", label="Discord ID"),
+        Field("user__username", label="User"),
+        Field("balance", label="Current Balance"),
         Field("lifetime_earned", label="Lifetime Earned"),
+        Field("lifetime_spent", label="Lifetime Spent"),
+        Field("updated_at", label="Last Updated"),
     ]
     fields = [
         Field("id", label="ID"),
@@ -190,16 +389,26 @@ class UserCoinsResource(Model):
 
 
 @admin_app.register
-class UserPackResource(Model):
+class UserPackResource(KeysetModel):
     label = "Pack Purchases"
     model = UserPack
     icon = "fas fa-shopping-cart"
     page_pre_title = "Economy"
     page_title = "Pack Purchases"
     filters = [
-        Field("user", label="User"),
-        Field("pack", label="Pack"),
+        filters.Search(name="user_id", label="Discord ID"),
+        filters.ForeignKey(Pack, name="pack_id", label="Pack"),
+        filters.Boolean(name="is_opened", label="Opened"),
+    ]
+    # cars_received can be large, it is only shown on the update view
+    list_fields = [
+        Field("id", label="ID"),
+        Field("user__username", label="User"),
+        Field("pack__name", label="Pack"),
+        Field("price_paid", label="Price Paid"),
+        Field("purchased_at", label="Purchased At"),
         Field("is_opened", label="Opened"),
+        Field("opened_at", label="Opened At"),
     ]
     fields = [
         Field("id", label="ID"),
@@ -213,6 +422,71 @@ class UserPackResource(Model):
     ]
 
 
+@admin_app.register
+class CoinTransactionResource(KeysetModel):
+    """The coin journal is append-only, so it is listed without any edit action"""
+    label = "Coin Journal"
+    model = CoinTransaction
+    icon = "fas fa-receipt"
+    page_pre_title = "Economy"
+    page_title = "Coin Journal"
+    filters = [
+        filters.Search(name="user_id", label="Discord ID"),
+    ]
+    list_fields = [
+        Field("id", label="ID"),
+        Field("user_id", label="Discord ID"),
+        Field("delta", label="Change"),
+        Field("reason", label="Reason"),
+        Field("reference_id", label="Reference"),
+        Field("created_at", label="At"),
+    ]
+    fields = list_fields
+    
+    async def get_toolbar_actions(self, request: Request) -> List[ToolbarAction]:
+        return []
+    
+    async def get_actions(self, request: Request) -> List[Action]:
+        return []
+    
+    async def get_bulk_actions(self, request: Request) -> List[Action]:
+        return []
+
+
+@admin_app.register
+class CatchTimingResource(KeysetModel):
+    """Written by the bot, flags are cleared with its !catchtiming clear command"""
+    label = "Catch Timings"
+    model = CatchTiming
+    icon = "fas fa-stopwatch"
+    page_pre_title = "Moderation"
+    page_title = "Catch Timings"
+    filters = [
+        filters.Search(name="user_id", label="Discord ID"),
+        filters.Boolean(name="flagged", label="Flagged"),
+    ]
+    list_fields = [
+        Field("user_id", label="Discord ID"),
+        Field("samples", label="Clicks"),
+        Field("median_click", label="Median Click (s)"),
+        Field("median_typing", label="Median Typing (s)"),
+        Field("flagged", label="Flagged"),
+        Field("reasons", label="Reasons"),
+        Field("flagged_at", label="Flagged At"),
+        Field("updated_at", label="Updated At"),
+    ]
+    fields = list_fields
+    
+    async def get_toolbar_actions(self, request: Request) -> List[ToolbarAction]:
+        return []
+    
+    async def get_actions(self, request: Request) -> List[Action]:
+        return []
+    
+    async def get_bulk_actions(self, request: Request) -> List[Action]:
+        return []
+
+
 # Custom actions
 @admin_app.register
 class PackActions:
@@ -233,23 +507,19 @@ class PackActions:
 @admin_app.register
 class Dashboard:
     async def get_dashboard_data(self):
-        """Get dashboard statistics"""
-        total_users = await User.all().count()
-        total_cars = await Car.all().count()
-        total_packs = await Pack.all().count()
-        active_packs = await Pack.filter(is_active=True).count()
-        
-        return {
-            "total_users": total_users,
-            "total_cars": total_cars,
-            "total_packs": total_packs,
-            "active_packs": active_packs,
-        }
+        """Get dashboard statistics, cached for a few seconds"""
+        return await dashboard_stats.summary()
+    
+    async def get_dashboard_history(self, bucket: str = "day", days: int = 30):
+        """Get time-bucketed series for the dashboard charts"""
+        return await dashboard_stats.history(bucket, days)
 
 
 async def init_admin():
     """Initialize admin panel"""
     await Tortoise.init(config=TORTOISE_ORM)
+    install_query_hook()
+    metrics.enable_query_metrics()
     await admin_app.init()
 
 
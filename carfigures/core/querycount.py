@@ -0,0 +1,121 @@
+"""Per-command SQL statement counting and N+1 detection for development and tests"""
+
+import logging
+import os
+import re
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from carfigures.core.context import PROPAGATED_VARS, values
+from carfigures.core.database import add_query_listener, install_query_hook
+
+logger = logging.getLogger(__name__)
+
+# "1" counts and warns, "strict" also raises once a command over its budget is done
+QUERY_DEBUG = os.environ.get("CARFIGURESBOT_QUERY_DEBUG", "").lower()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_active_counter: ContextVar[Optional["QueryCounter"]] = ContextVar(
+    "carfigures_query_counter", default=None
+)
+PROPAGATED_VARS.append(_active_counter)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a strict QueryCounter sees more statements than its budget"""
+
+
+def query_shape(query: str) -> str:
+    """Normalize a statement so queries differing only by their values compare equal"""
+    shape = _STRING.sub("?", query)
+    # Postgres placeholders first, the number pattern would leave their $ behind
+    shape = re.sub(r"\$\d+|%s", "?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryCounter:
+    """
+    Count the SQL statements run by the current task and whatever it hands to the writer
+    Use it as a context manager around a command, an interaction or a test. Rows the
+    writer defers and flushes for several commands at once count against each of them.
+    With strict set, leaving the block over budget raises QueryBudgetExceeded. That
+    happens once the block is done, so a command's replies were already sent: strict
+    mode is a gate for tests and development, it does not stop the statements.
+    """
+
+    def __init__(
+        self,
+        operation: str = "block",
+        budget: Optional[int] = None,
+        repeat_threshold: int = 3,
+        strict: bool = False,
+    ):
+        self.operation = operation
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+        self.strict = strict
+        self.count = 0
+        self.shapes: Counter = Counter()
+        self._token = None
+
+    def __enter__(self) -> "QueryCounter":
+        _install()
+        self._token = _active_counter.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _active_counter.reset(self._token)
+        if exc_type is None and self.strict and self.over_budget:
+            raise QueryBudgetExceeded(self.summary())
+
+    def add(self, query: str):
+        """Record one executed statement"""
+        self.count += 1
+        self.shapes[query_shape(query)] += 1
+
+    @property
+    def over_budget(self) -> bool:
+        """Whether more statements ran than the declared budget"""
+        return self.budget is not None and self.count > self.budget
+
+    def repeated_shapes(self) -> List[Tuple[str, int]]:
+        """Statement shapes run often enough to look like an N+1 pattern"""
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= self.repeat_threshold
+        ]
+
+    def summary(self) -> str:
+        """Human readable report of the counted statements"""
+        budget = f"/{self.budget}" if self.budget is not None else ""
+        lines = [f"{self.operation}: {self.count}{budget} queries"]
+        for shape, count in self.repeated_shapes():
+            lines.append(f"  repeated {count}x: {shape[:200]}")
+        return "\n".join(lines)
+
+    def log(self):
+        """Warn about budget overruns and repeated statement shapes"""
+        if self.over_budget or self.repeated_shapes():
+            logger.warning(self.summary())
+        else:
+            logger.debug(self.summary())
+
+
+def _record(query: str, duration: float):
+    counters = {id(counter): counter for counter in values(_active_counter) if counter is not None}
+    for counter in counters.values():
+        counter.add(query)
+
+
+def _install():
+    # Both calls are idempotent, repeating them picks up backends loaded since
+    install_query_hook()
+    add_query_listener(_record)
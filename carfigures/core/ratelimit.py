@@ -0,0 +1,209 @@
+"""Per-user and per-guild rate limits on the economy commands and catch clicks"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from discord.ext import commands
+
+from carfigures.core import metrics
+from carfigures.core.config import RateLimit, RateLimitConfig
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # Comes with the panel dependencies, only needed for a shared store
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ("user", "guild")
+# A user over a command limit is told so at most once in this many seconds
+WARN_INTERVAL = 10.0
+
+# Same algorithm as GCRA.acquire, on the store's clock so every process agrees. Every
+# key is checked before any is taken, ARGV holds the interval and capacity of each.
+# Returns the milliseconds to wait and the 1-based index of the rejecting key, {0, 0}
+# when the call is allowed.
+_GCRA_SCRIPT = """
+local clock = redis.call("TIME")
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[2 * i - 1])
+    local capacity = tonumber(ARGV[2 * i])
+    local tat = math.max(tonumber(redis.call("GET", key)) or now, now) + interval
+    local wait = tat - now - capacity
+    if wait > 0 then
+        return {wait, i}
+    end
+    tats[i] = tat
+end
+for i, key in ipairs(KEYS) do
+    redis.call("SET", key, tats[i], "PX", tats[i] - now)
+end
+return {0, 0}
+"""
+
+
+class RateLimited(commands.CheckFailure):
+    """A call rejected by the rate limiter"""
+
+    def __init__(self, command: str, scope: str, retry_after: float):
+        super().__init__(f"{command} is rate limited per {scope} for {retry_after:.1f}s")
+        self.command = command
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class GCRA:
+    """
+    Generic cell rate algorithm for one limit
+    Each key costs a single float, the time at which it is back on schedule. A call is
+    let through while that time is at most `burst` intervals ahead, which allows `burst`
+    calls at once and then one every `per / rate` seconds. Keys are kept least recently
+    used first, so the ones back on schedule are evicted from the front as calls come
+    in, and never more than `max_keys` are held.
+    """
+
+    __slots__ = ("interval", "capacity", "max_keys", "_tats")
+
+    def __init__(self, limit: RateLimit, max_keys: int):
+        self.interval = limit.per / limit.rate
+        self.capacity = self.interval * limit.burst
+        self.max_keys = max_keys
+        self._tats: OrderedDict[int, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def acquire(self, key: int, now: Optional[float] = None) -> float:
+        """Take a call for `key`, returns 0 when allowed or the seconds until it would be"""
+        now = time.monotonic() if now is None else now
+        wait = self.wait(key, now)
+        if wait > 0:
+            return wait
+        self.take(key, now)
+        return 0.0
+
+    def wait(self, key: int, now: Optional[float] = None) -> float:
+        """Seconds until a call for `key` would be allowed, without taking it"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, max(self._tats.get(key, now), now) + self.interval - now - self.capacity)
+
+    def take(self, key: int, now: Optional[float] = None):
+        """Take a call for `key` whatever its wait, callers check wait() first"""
+        now = time.monotonic() if now is None else now
+        tats = self._tats
+        tats[key] = max(tats.get(key, now), now) + self.interval
+        tats.move_to_end(key)
+        while tats:
+            oldest, oldest_tat = next(iter(tats.items()))
+            if oldest_tat > now and len(tats) <= self.max_keys:
+                break
+            del tats[oldest]
+
+    def refund(self, key: int):
+        """Give back a call taken for `key`, when another limit rejected it after all"""
+        if key in self._tats:
+            self._tats[key] -= self.interval
+
+
+class SharedStore:
+    """Limits kept in Redis, so they hold across every bot process using it"""
+
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("A shared rate limit store needs the redis package")
+        self._redis = aioredis.from_url(url)
+        self._script = self._redis.register_script(_GCRA_SCRIPT)
+
+    async def acquire(self, keys: List[str], limiters: List[GCRA]) -> Tuple[float, int]:
+        """Take a call for every key or none, returns the wait and the rejecting index"""
+        args = []
+        for limiter in limiters:
+            args += [round(limiter.interval * 1000), round(limiter.capacity * 1000)]
+        wait, index = await self._script(keys=keys, args=args)
+        return int(wait) / 1000, int(index) - 1
+
+    async def close(self):
+        await self._redis.close()
+
+
+class RateLimiter:
+    """
+    Limits from the rate-limits section of the configuration, by command and scope
+    Calls are checked against the in-memory limiters first, so rejections never leave
+    the process. With a shared store configured, calls allowed locally are then checked
+    against the store, and if it cannot be reached the local limits are all that apply.
+    """
+
+    def __init__(self, config: RateLimitConfig):
+        self._limiters: Dict[Tuple[str, str], GCRA] = {}
+        for command, scopes in config.commands.items():
+            for scope, limit in scopes.items():
+                if scope not in SCOPES:
+                    raise ValueError(f"Unknown rate limit scope {scope!r} for {command}")
+                self._limiters[command, scope] = GCRA(limit, config.max_keys)
+        self._warnings = GCRA(RateLimit(1, WARN_INTERVAL, 1), config.max_keys)
+        self._store = SharedStore(config.store) if config.store else None
+        self._store_down = False
+
+    async def acquire(self, command: str, user_id: int, guild_id: Optional[int] = None):
+        """
+        Take a call of `command`, raises RateLimited when a limit rejects it
+        Every scope is checked before any is taken, so a call the guild limit rejects
+        does not cost the user anything.
+        """
+        now = time.monotonic()
+        limits = []
+        for scope, key in (("user", user_id), ("guild", guild_id)):
+            limiter = self._limiters.get((command, scope))
+            if limiter is None or key is None:
+                continue
+            wait = limiter.wait(key, now)
+            if wait:
+                self._reject(command, scope, wait)
+            limits.append((scope, key, limiter))
+        if not limits:
+            return
+
+        for _, key, limiter in limits:
+            limiter.take(key, now)
+        if self._store is not None:
+            wait, index = await self._shared_acquire(command, limits)
+            if wait:
+                for _, key, limiter in limits:
+                    limiter.refund(key)
+                self._reject(command, limits[index][0], wait)
+
+    def should_warn(self, user_id: int) -> bool:
+        """Whether to tell a rate limited user, the rest of their calls are dropped silently"""
+        return not self._warnings.acquire(user_id)
+
+    @staticmethod
+    def _reject(command: str, scope: str, wait: float):
+        metrics.RATE_LIMITED.labels(command, scope).inc()
+        raise RateLimited(command, scope, wait)
+
+    async def _shared_acquire(
+        self, command: str, limits: List[Tuple[str, int, GCRA]]
+    ) -> Tuple[float, int]:
+        try:
+            wait, index = await self._store.acquire(
+                [f"cf:rl:{command}:{scope}:{key}" for scope, key, _ in limits],
+                [limiter for _, _, limiter in limits],
+            )
+        except Exception as exc:
+            if not self._store_down:
+                logger.warning(f"Rate limit store unreachable, only local limits apply: {exc!r}")
+                self._store_down = True
+            return 0.0, 0
+        if self._store_down:
+            logger.info("Rate limit store reachable again")
+            self._store_down = False
+        return wait, index
+
+    async def close(self):
+        if self._store is not None:
+            await self._store.close()
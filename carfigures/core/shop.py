@@ -0,0 +1,89 @@
+"""Packs on sale, cached between the changes that affect them"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from carfigures.core.metrics import record_cache_lookup
+from carfigures.models import Pack
+from carfigures.utils.packs import PackManager
+
+logger = logging.getLogger(__name__)
+
+
+class ShopCache:
+    """
+    Available packs, read once per change rather than on every !shop and !buy
+    Callers arriving while the packs are read wait on the same query, so a drop going
+    live in front of a crowd costs one. Limited time packs leave the cache at their
+    `available_until` even if nothing invalidates it.
+    """
+
+    def __init__(self):
+        self._packs: Optional[List[Pack]] = None
+        self._expires_at: Optional[datetime] = None
+        self._loading: Optional[asyncio.Task] = None
+        # Bumped by invalidate, a read started before then is not kept
+        self._generation = 0
+
+    async def get(self) -> List[Pack]:
+        """Packs on sale right now"""
+        packs = self._packs
+        if packs is not None and (
+            self._expires_at is None or datetime.now(timezone.utc) < self._expires_at
+        ):
+            record_cache_lookup("shop", True)
+            return packs
+        record_cache_lookup("shop", False)
+
+        task = self._loading
+        if task is None:
+            task = self._loading = asyncio.create_task(self._load(self._generation))
+            task.add_done_callback(self._loaded)
+        return await asyncio.shield(task)
+
+    async def find(self, name: str) -> Optional[Pack]:
+        """Pack on sale whose name contains `name`, ignoring case"""
+        name = name.casefold()
+        return next((pack for pack in await self.get() if name in pack.name.casefold()), None)
+
+    def invalidate(self):
+        """Read the packs again on the next call, after packs were changed"""
+        self._packs = None
+        self._loading = None
+        self._generation += 1
+
+    def put(self, pack: Pack):
+        """Put a pack that just went on sale in the shop, without reading the others again"""
+        if self._packs is None:
+            self.invalidate()
+            return
+        self._set([*(known for known in self._packs if known.id != pack.id), pack])
+
+    def drop(self, pack_id: int):
+        """Take a pack off sale"""
+        if self._packs is None:
+            self.invalidate()
+            return
+        self._set([known for known in self._packs if known.id != pack_id])
+
+    def _set(self, packs: List[Pack]):
+        self._packs = packs
+        ends = [pack.available_until for pack in packs if pack.is_limited_time]
+        self._expires_at = min(filter(None, ends), default=None)
+        # A read still running started before this change
+        self._loading = None
+        self._generation += 1
+
+    async def _load(self, generation: int) -> List[Pack]:
+        packs = await PackManager.get_available_packs()
+        if generation == self._generation:
+            self._set(packs)
+        return packs
+
+    def _loaded(self, task: asyncio.Task):
+        if self._loading is task:
+            self._loading = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Could not read the packs on sale: {task.exception()!r}")
@@ -0,0 +1,111 @@
+"""Permission-aware spawn channel resolution"""
+
+import logging
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import discord
+
+from carfigures.core.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+class SpawnTargetResolver:
+    """
+    Pick the channel a spawn should go to without asking Discord first
+    Send permissions are computed from the cached overwrites and roles and kept until
+    a channel, role or member event invalidates them. Channels that still answer
+    Forbidden are quarantined with an exponential backoff.
+    """
+
+    def __init__(
+        self,
+        base_backoff: float = 60.0,
+        max_backoff: float = 6 * 3600.0,
+    ):
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._can_spawn: Dict[int, bool] = {}
+        # channel_id -> (quarantined until, consecutive failures)
+        self._quarantine: Dict[int, Tuple[float, int]] = {}
+
+    def resolve(
+        self, message: discord.Message, spawn_channels: Sequence[int] = ()
+    ) -> Optional[discord.TextChannel]:
+        """
+        Channel a spawn triggered by this message should be sent to, if any
+        With no spawn channels configured for the guild, spawns go where the message was.
+        """
+        guild = message.guild
+        if spawn_channels:
+            candidates = [guild.get_channel(channel_id) for channel_id in spawn_channels]
+        else:
+            candidates = [message.channel]
+
+        now = time.monotonic()
+        for channel in candidates:
+            if not isinstance(channel, discord.TextChannel):
+                continue
+            if self.is_quarantined(channel.id, now):
+                continue
+            if self.can_spawn_in(channel):
+                return channel
+        return None
+
+    def can_spawn_in(self, channel: discord.TextChannel) -> bool:
+        """Whether the bot can send spawn embeds in a channel, from cached state only"""
+        allowed = self._can_spawn.get(channel.id)
+        record_cache_lookup("spawn_permissions", allowed is not None)
+        if allowed is None:
+            permissions = channel.permissions_for(channel.guild.me)
+            allowed = (
+                permissions.view_channel
+                and permissions.send_messages
+                and permissions.embed_links
+            )
+            self._can_spawn[channel.id] = allowed
+        return allowed
+
+    def is_quarantined(self, channel_id: int, now: Optional[float] = None) -> bool:
+        """Whether a channel is still serving its quarantine"""
+        entry = self._quarantine.get(channel_id)
+        if entry is None:
+            return False
+        return (now if now is not None else time.monotonic()) < entry[0]
+
+    def quarantine(self, channel: discord.abc.GuildChannel) -> float:
+        """Stop spawning in a channel that answered Forbidden, returns the backoff"""
+        _, failures = self._quarantine.get(channel.id, (0.0, 0))
+        backoff = min(self.base_backoff * 2 ** failures, self.max_backoff)
+        self._quarantine[channel.id] = (time.monotonic() + backoff, failures + 1)
+        # The cached permissions were wrong, recompute them next time
+        self._can_spawn.pop(channel.id, None)
+        logger.warning(
+            f"Missing permission to spawn car in {channel.guild.name}#{channel.name}, "
+            f"quarantined for {backoff:.0f}s"
+        )
+        return backoff
+
+    def mark_success(self, channel_id: int):
+        """Reset the backoff of a channel once a spawn went through"""
+        self._quarantine.pop(channel_id, None)
+
+    def invalidate_channel(self, channel_id: int):
+        """Forget the cached permissions of a channel"""
+        self._can_spawn.pop(channel_id, None)
+
+    def invalidate_guild(self, guild: discord.Guild):
+        """Forget the cached permissions of every channel in a guild"""
+        for channel in guild.channels:
+            self._can_spawn.pop(channel.id, None)
+
+    def forget_channel(self, channel_id: int):
+        """Drop everything known about a deleted channel"""
+        self._can_spawn.pop(channel_id, None)
+        self._quarantine.pop(channel_id, None)
+
+    def forget_guild(self, guild: discord.Guild):
+        """Drop everything known about a guild the bot left"""
+        for channel in guild.channels:
+            self.forget_channel(channel.id)
@@ -0,0 +1,141 @@
+"""Live spawn state with heap based expiry"""
+
+import heapq
+import itertools
+import time
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+_spawn_counter = itertools.count()
+
+
+def new_spawn_id() -> int:
+    """Snowflake-like id, unique across restarts and sortable by creation time"""
+    snowflake = discord.utils.time_snowflake(datetime.now(timezone.utc))
+    return snowflake | (next(_spawn_counter) & 0x3FFFFF)
+
+
+class ClaimResult(Enum):
+    CLAIMED = "claimed"
+    ALREADY_CAUGHT = "already_caught"
+    EXPIRED = "expired"
+
+
+class SpawnState:
+    """A spawned car waiting to be caught"""
+
+    __slots__ = (
+        "spawn_id", "channel_id", "message_id", "rarity", "expires_at", "car_id", "caught_by"
+    )
+
+    def __init__(
+        self,
+        spawn_id: int,
+        channel_id: int,
+        expires_at: float,
+        rarity: float = 0.0,
+        message_id: Optional[int] = None,
+        car_id: Optional[int] = None,
+    ):
+        self.spawn_id = spawn_id
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.rarity = rarity
+        self.expires_at = expires_at  # Unix timestamp, it is encoded in the button
+        self.car_id = car_id  # Never sent to Discord, None until read from the spawn row
+        self.caught_by: Optional[int] = None
+
+
+class SpawnTable:
+    """
+    Compact table of live spawns
+    Expiry is tracked in a min-heap so cleanup only looks at spawns that are due.
+    """
+
+    def __init__(self):
+        self._spawns: Dict[int, SpawnState] = {}
+        self._expiry: List[Tuple[float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._spawns)
+
+    def get(self, spawn_id: int) -> Optional[SpawnState]:
+        """Live spawn by id"""
+        return self._spawns.get(spawn_id)
+
+    def add(self, state: SpawnState):
+        """Track a new spawn until it expires"""
+        self._spawns[state.spawn_id] = state
+        heapq.heappush(self._expiry, (state.expires_at, state.spawn_id))
+
+    def discard(self, spawn_id: int):
+        """Forget a spawn, its heap entry is skipped when it comes up"""
+        self._spawns.pop(spawn_id, None)
+
+    def status(
+        self, spawn_id: int, expires_at: float, now: Optional[float] = None
+    ) -> Optional[ClaimResult]:
+        """Why a spawn can no longer be caught, None while it still can"""
+        now = time.time() if now is None else now
+        state = self._spawns.get(spawn_id)
+        if state is not None and state.caught_by is not None:
+            return ClaimResult.ALREADY_CAUGHT
+        if now >= (state.expires_at if state is not None else expires_at):
+            return ClaimResult.EXPIRED
+        return None
+
+    def release(self, spawn_id: int):
+        """Undo a local claim whose confirmation failed, so the spawn can be clicked again"""
+        state = self._spawns.get(spawn_id)
+        if state is not None:
+            state.caught_by = None
+
+    def claim(
+        self,
+        spawn_id: int,
+        user_id: int,
+        expires_at: float,
+        channel_id: int,
+        message_id: Optional[int] = None,
+        now: Optional[float] = None,
+    ) -> Tuple[ClaimResult, Optional[SpawnState]]:
+        """
+        First click wins within this process
+        A CLAIMED result still has to be confirmed by the shared store, later clicks are
+        answered from this table without touching it. `expires_at` comes from the button
+        itself, so a spawn this process never saw (sent before a restart) can still be
+        caught until it expires.
+        """
+        now = time.time() if now is None else now
+        state = self._spawns.get(spawn_id)
+        if state is None:
+            if now >= expires_at:
+                return ClaimResult.EXPIRED, None
+            state = SpawnState(spawn_id, channel_id, expires_at, message_id=message_id)
+            self.add(state)
+
+        if state.caught_by is not None:
+            return ClaimResult.ALREADY_CAUGHT, state
+        if now >= state.expires_at:
+            return ClaimResult.EXPIRED, state
+
+        state.caught_by = user_id
+        return ClaimResult.CLAIMED, state
+
+    def pop_expired(self, now: Optional[float] = None, limit: int = 100) -> List[SpawnState]:
+        """Remove up to `limit` expired spawns and return the ones nobody caught"""
+        now = time.time() if now is None else now
+        uncaught = []
+        popped = 0
+        while self._expiry and self._expiry[0][0] <= now and popped < limit:
+            _, spawn_id = heapq.heappop(self._expiry)
+            state = self._spawns.pop(spawn_id, None)
+            if state is None:
+                continue
+            popped += 1
+            if state.caught_by is None:
+                uncaught.append(state)
+        return uncaught
@@ -0,0 +1,107 @@
+"""Startup phase timing and import time profiling"""
+
+import argparse
+import subprocess
+import sys
+import time
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+
+def startup_modules() -> Tuple[str, ...]:
+    """Everything the bot process imports before connecting to the gateway"""
+    # Imported here, the bot imports this module for its startup timer
+    from carfigures.core.bot import EXTENSIONS
+
+    return ("carfigures.__main__", "carfigures.core.bot", *EXTENSIONS)
+
+
+class StartupTimer:
+    """
+    Wall clock time of each boot phase, measured from when this module was imported
+    Each phase is recorded once, so reconnects do not overwrite the boot timings.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str) -> bool:
+        """Record the end of a phase, returns False if it was already recorded"""
+        if any(name == phase for name, _ in self.phases):
+            return False
+        self.phases.append((phase, time.perf_counter() - self.started_at))
+        return True
+
+    def report(self) -> str:
+        """One line summary, e.g. `0.84s (imports 0.61s, database 0.05s, ...)`"""
+        if not self.phases:
+            return "0.00s"
+        parts = []
+        previous = 0.0
+        for name, elapsed in self.phases:
+            parts.append(f"{name} {elapsed - previous:.2f}s")
+            previous = elapsed
+        return f"{previous:.2f}s ({', '.join(parts)})"
+
+
+startup_timer = StartupTimer()
+
+
+class ImportTime(NamedTuple):
+    module: str
+    depth: int  # 0 for modules imported directly, not as a dependency
+    self_us: int
+    cumulative_us: int
+
+
+def profile_imports(modules: Optional[Sequence[str]] = None) -> List[ImportTime]:
+    """
+    Import `modules` in a fresh interpreter with -X importtime and parse its report
+    By default the modules the bot imports on every boot, its extensions included.
+    """
+    modules = startup_modules() if modules is None else modules
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        lines = result.stderr.splitlines()
+        error = "\n".join(line for line in lines if not line.startswith("import time:"))
+        raise RuntimeError(f"Importing the bot failed:\n{error}")
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        times.append(ImportTime(module.strip(), depth, int(self_us), int(cumulative_us)))
+    return times
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m carfigures.core.startup",
+        description="Show which imports slow down the bot's cold start",
+    )
+    parser.add_argument("--top", type=int, default=25, help="How many modules to list")
+    parser.add_argument(
+        "--sort", choices=("cumulative", "self"), default="cumulative",
+        help="cumulative includes the imports a module triggers",
+    )
+    args = parser.parse_args(argv)
+
+    times = profile_imports()
+    # Top level imports add up to the whole import phase
+    total = sum(entry.cumulative_us for entry in times if entry.depth == 0)
+    key = "cumulative_us" if args.sort == "cumulative" else "self_us"
+
+    print(f"{len(times)} modules imported in {total / 1e6:.3f}s")
+    print(f"{'self [ms]':>10} {'cumulative [ms]':>16}  module")
+    for entry in sorted(times, key=lambda entry: getattr(entry, key), reverse=True)[:args.top]:
+        print(f"{entry.self_us / 1e3:>10.1f} {entry.cumulative_us / 1e3:>16.1f}  {entry.module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Pending trades between two users, kept in memory until settled or expired"""
+
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class Offer:
+    """What one side of a trade gives"""
+
+    __slots__ = ("user_id", "cars", "coins", "confirmed")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.cars: Dict[int, str] = {}  # Car id -> name, in the order they were added
+        self.coins = 0
+        self.confirmed = False
+
+    @property
+    def empty(self) -> bool:
+        return not self.cars and not self.coins
+
+
+class Trade:
+    """
+    Two offers and the message showing them
+    Any change to an offer takes both confirmations back, so nobody confirms something
+    they have not seen. Once both sides confirm the trade is settling and can no longer
+    change.
+    """
+
+    __slots__ = ("trade_id", "channel_id", "message_id", "offers", "expires_at", "settling")
+
+    def __init__(
+        self, trade_id: int, channel_id: int, user_id: int, partner_id: int, expires_at: float
+    ):
+        self.trade_id = trade_id  # Snowflake of the command that opened it
+        self.channel_id = channel_id
+        self.message_id: Optional[int] = None
+        self.offers = (Offer(user_id), Offer(partner_id))
+        self.expires_at = expires_at
+        self.settling = False
+
+    @property
+    def user_ids(self) -> Tuple[int, int]:
+        return self.offers[0].user_id, self.offers[1].user_id
+
+    def offer(self, user_id: int) -> Offer:
+        """Side of a user taking part in the trade"""
+        return self.offers[0] if self.offers[0].user_id == user_id else self.offers[1]
+
+    def other(self, user_id: int) -> Offer:
+        """Side of the user trading with `user_id`"""
+        return self.offers[1] if self.offers[0].user_id == user_id else self.offers[0]
+
+    @property
+    def confirmed(self) -> bool:
+        return all(offer.confirmed for offer in self.offers)
+
+    def changed(self):
+        """Take back both confirmations after an offer changed"""
+        for offer in self.offers:
+            offer.confirmed = False
+
+    def sides(self) -> Tuple[Tuple[int, Tuple[int, ...], int], ...]:
+        """(user id, car ids, coins) of each offer, what settling the trade needs"""
+        return tuple((offer.user_id, tuple(offer.cars), offer.coins) for offer in self.offers)
+
+
+class TradeTable:
+    """
+    Open trades, at most one per user
+    Expiry is tracked in a min-heap like the spawn table, so the sweeper only looks at
+    trades that are due.
+    """
+
+    def __init__(self):
+        self._trades: Dict[int, Trade] = {}
+        self._by_user: Dict[int, int] = {}
+        self._expiry: List[Tuple[float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._trades)
+
+    def get(self, trade_id: int) -> Optional[Trade]:
+        return self._trades.get(trade_id)
+
+    def for_user(self, user_id: int) -> Optional[Trade]:
+        """Open trade a user takes part in"""
+        trade_id = self._by_user.get(user_id)
+        return None if trade_id is None else self._trades.get(trade_id)
+
+    def add(self, trade: Trade) -> bool:
+        """Track a new trade, False when one of its users is already trading"""
+        if any(user_id in self._by_user for user_id in trade.user_ids):
+            return False
+        self._trades[trade.trade_id] = trade
+        for user_id in trade.user_ids:
+            self._by_user[user_id] = trade.trade_id
+        heapq.heappush(self._expiry, (trade.expires_at, trade.trade_id))
+        return True
+
+    def discard(self, trade_id: int):
+        """Forget a settled or cancelled trade, its heap entry is skipped when it comes up"""
+        trade = self._trades.pop(trade_id, None)
+        if trade is None:
+            return
+        for user_id in trade.user_ids:
+            if self._by_user.get(user_id) == trade_id:
+                del self._by_user[user_id]
+
+    def pop_expired(self, now: Optional[float] = None, limit: int = 100) -> List[Trade]:
+        """Remove up to `limit` expired trades, those being settled are left to finish"""
+        now = time.time() if now is None else now
+        expired = []
+        while self._expiry and self._expiry[0][0] <= now and len(expired) < limit:
+            _, trade_id = heapq.heappop(self._expiry)
+            trade = self._trades.get(trade_id)
+            if trade is None:
+                continue
+            if trade.settling:
+                # Settling takes moments, look at it again on the next sweep
+                heapq.heappush(self._expiry, (now + 1, trade_id))
+                continue
+            self.discard(trade_id)
+            expired.append(trade)
+        return expired
@@ -0,0 +1,370 @@
+"""Streaming CSV/NDJSON import and export of catalog and economy tables"""
+
+import argparse
+import asyncio
+import csv
+import io
+import itertools
+import json
+import logging
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from typing import (
+    Any, AsyncIterator, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+)
+
+from tortoise import Tortoise, fields
+from tortoise.models import Model
+from tortoise.transactions import in_transaction
+
+from carfigures.core import journal
+from carfigures.core.database import TORTOISE_ORM, WRITER_CONNECTION
+from carfigures.models import Car, Pack, PackContent, User, UserCar, UserCoins
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "ndjson")
+# Rows per transaction on import and per query on export
+CHUNK_SIZE = 1000
+# SQLite and Postgres both stop at 32766 bound parameters per statement
+MAX_PARAMETERS = 30000
+
+_TRUE = ("1", "true", "t", "yes", "y")
+
+
+class Table(NamedTuple):
+    model: type
+    columns: Tuple[str, ...]
+    key: Tuple[str, ...]  # Upsert conflict target, matching rows are updated in place
+
+
+# In dependency order, importing them in this order satisfies every foreign key
+TABLES: Dict[str, Table] = {
+    "cars": Table(
+        Car,
+        ("id", "name", "model", "year", "horsepower", "weight", "rarity", "image_url",
+         "logo_url", "type", "is_exclusive", "created_at"),
+        ("id",),
+    ),
+    "packs": Table(
+        Pack,
+        ("id", "name", "description", "price", "guaranteed_cars", "common_chance",
+         "rare_chance", "epic_chance", "legendary_chance", "image_url", "color", "is_active",
+         "is_limited_time", "available_until", "created_at"),
+        ("id",),
+    ),
+    "pack_contents": Table(PackContent, ("pack_id", "car_id", "drop_rate"), ("pack_id", "car_id")),
+    "users": Table(
+        User,
+        ("id", "username", "discriminator", "avatar_url", "cars_caught", "total_coins_earned",
+         "packs_opened", "created_at"),
+        ("id",),
+    ),
+    "user_coins": Table(
+        UserCoins,
+        ("user_id", "balance", "lifetime_earned", "lifetime_spent", "created_at"),
+        ("user_id",),
+    ),
+    "user_cars": Table(
+        UserCar,
+        ("user_id", "car_id", "caught_at", "catch_bonus", "is_favorite", "is_shiny"),
+        ("user_id", "car_id"),
+    ),
+}
+
+
+def get_table(name: str) -> Table:
+    """Table by name, ValueError listing the valid names otherwise"""
+    try:
+        return TABLES[name]
+    except KeyError:
+        raise ValueError(f"Unknown table {name!r}, use one of {', '.join(TABLES)}") from None
+
+
+def format_for(path: str, fmt: Optional[str] = None) -> str:
+    """Explicit format, or the one a file name implies"""
+    if fmt is None:
+        fmt = "csv" if path.endswith(".csv") else "ndjson"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, use one of {', '.join(FORMATS)}")
+    return fmt
+
+
+# Reading
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Parse rows one at a time, nothing but the current line is held in memory"""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Line {line_number} is not valid JSON: {exc}") from None
+        if not isinstance(row, dict):
+            raise ValueError(f"Line {line_number} is not a JSON object")
+        yield row
+
+
+def _coerce(field: fields.Field, value: Any) -> Any:
+    """Convert a parsed value, CSV cells are all strings, to what the field stores"""
+    if value is None or (value == "" and field.null):
+        return None
+    if isinstance(field, fields.BooleanField):
+        return value if isinstance(value, bool) else str(value).strip().lower() in _TRUE
+    if isinstance(field, (fields.IntField, fields.BigIntField, fields.SmallIntField)):
+        return int(value)
+    if isinstance(field, fields.FloatField):
+        return float(value)
+    if isinstance(field, fields.DatetimeField):
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if isinstance(field, fields.DateField):
+        return value if isinstance(value, date) else date.fromisoformat(value)
+    return value
+
+
+def _required(field: fields.Field) -> bool:
+    """Whether a new row cannot be inserted without a value for the field"""
+    if field.pk or field.null or field.default is not None:
+        return False
+    return not getattr(field, "auto_now", False) and not getattr(field, "auto_now_add", False)
+
+
+def _prepare(
+    table: Table, rows: List[Dict[str, Any]], offset: int
+) -> Dict[Tuple[str, ...], List[Model]]:
+    """Validate and convert rows, grouped by the columns they carry in table order"""
+    fields_map = table.model._meta.fields_map
+    # Postgres refuses to upsert the same row twice in one statement, the last one wins
+    objects: Dict[Tuple[Any, ...], Tuple[Tuple[str, ...], Model]] = {}
+    required = [*table.key, *(column for column in table.columns if _required(fields_map[column]))]
+    for number, row in enumerate(rows, offset + 1):
+        unknown = row.keys() - set(table.columns)
+        if unknown:
+            raise ValueError(f"Row {number} has unknown columns: {', '.join(sorted(unknown))}")
+        missing = [column for column in required if row.get(column) in (None, "")]
+        if missing:
+            raise ValueError(f"Row {number} is missing {', '.join(missing)}")
+        try:
+            values = {column: _coerce(fields_map[column], value) for column, value in row.items()}
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"Row {number} has an invalid value: {exc}") from None
+        key = tuple(values[column] for column in table.key)
+        columns = tuple(column for column in table.columns if column in values)
+        objects[key] = (columns, table.model(**values))
+
+    groups: Dict[Tuple[str, ...], List[Model]] = {}
+    for columns, obj in objects.values():
+        groups.setdefault(columns, []).append(obj)
+    return groups
+
+
+async def import_rows(
+    name: str, rows: Iterable[Dict[str, Any]], chunk_size: int = CHUNK_SIZE
+) -> int:
+    """
+    Upsert rows into a table, returns how many were written
+    Rows are consumed in chunks, each chunk in its own transaction with one multi-row
+    INSERT ... ON CONFLICT per set of columns its rows carry. Optional columns a row
+    leaves out keep their current value, or take the model default for new rows, so
+    running an import twice changes nothing. Imported balances are journaled as the
+    difference to the current ones, so the coin journal keeps matching them.
+    """
+    table = get_table(name)
+    batch_size = max(1, min(chunk_size, MAX_PARAMETERS // len(table.columns)))
+    has_updated_at = "updated_at" in table.model._meta.fields_map
+    rows = iter(rows)
+    read = written = 0
+
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        groups = _prepare(table, chunk, read)
+        read += len(chunk)
+
+        async with in_transaction(WRITER_CONNECTION) as connection:
+            for columns, objects in groups.items():
+                # Only update the columns these rows carry, plus the modification timestamp
+                update_fields = [
+                    column for column in columns
+                    if column not in table.key and column != "created_at"
+                ]
+                if update_fields and has_updated_at:
+                    update_fields.append("updated_at")
+                if table.model is UserCoins and "balance" in columns:
+                    await journal.adjust({obj.user_id: obj.balance for obj in objects})
+
+                if update_fields:
+                    await table.model.bulk_create(
+                        objects,
+                        batch_size=batch_size,
+                        on_conflict=table.key,
+                        update_fields=update_fields,
+                        using_db=connection,
+                    )
+                else:
+                    await table.model.bulk_create(
+                        objects, batch_size=batch_size, ignore_conflicts=True, using_db=connection
+                    )
+                written += len(objects)
+        logger.debug(f"Imported {written} rows into {name}")
+
+    if written and table.key == ("id",):
+        await _sync_sequence(table)
+    logger.info(f"Imported {written} rows into {name}")
+    return written
+
+
+async def _sync_sequence(table: Table):
+    """Move the Postgres id sequence past ids that were inserted explicitly"""
+    connection = Tortoise.get_connection(WRITER_CONNECTION)
+    if connection.capabilities.dialect != "postgres":
+        return  # SQLite picks max(rowid) + 1 on its own
+    name = table.model._meta.db_table
+    await connection.execute_query(
+        f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE(MAX(id), 1)) "
+        f"FROM {name}"
+    )
+
+
+# Writing
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+async def iter_table(name: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """Every row of a table in id order, fetched a chunk at a time by seeking on the id"""
+    table = get_table(name)
+    columns = table.columns if "id" in table.columns else ("id", *table.columns)
+    last_id = None
+    while True:
+        qs = table.model.all()
+        if last_id is not None:
+            qs = qs.filter(id__gt=last_id)
+        rows = await qs.order_by("id").limit(chunk_size).values(*columns)
+        for row in rows:
+            yield {column: _serialize(row[column]) for column in table.columns}
+        if len(rows) < chunk_size:
+            break
+        last_id = rows[-1]["id"]
+
+
+async def export_rows(name: str, fmt: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[str]:
+    """Serialized text of a table, yielded a chunk of rows at a time"""
+    columns = get_table(name).columns
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+
+    count = 0
+    async for row in iter_table(name, chunk_size):
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False))
+            buffer.write("\n")
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# Command line
+
+
+async def export_file(name: str, path: str, fmt: Optional[str] = None):
+    """Write a table to a file, "-" is standard output"""
+    fmt = format_for(path, fmt)
+    stream = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+    try:
+        async for text in export_rows(name, fmt):
+            stream.write(text)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    logger.info(f"Exported {name} to {path}")
+
+
+async def import_file(name: str, path: str, fmt: Optional[str] = None) -> int:
+    """Upsert a file into a table, "-" is standard input, returns the row count"""
+    fmt = format_for(path, fmt)
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+    try:
+        return await import_rows(name, read_rows(stream, fmt))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _table_files(directory: str, fmt: str) -> List[Tuple[str, Path]]:
+    return [(name, Path(directory) / f"{name}.{fmt}") for name in TABLES]
+
+
+async def run(args: argparse.Namespace):
+    await Tortoise.init(config=TORTOISE_ORM)
+    await Tortoise.generate_schemas()
+    try:
+        if args.table != "all":
+            if args.command == "export":
+                await export_file(args.table, args.path, args.format)
+            else:
+                count = await import_file(args.table, args.path, args.format)
+                print(f"{args.table}: {count} rows")
+            return
+
+        # A whole directory, one file per table, imported in dependency order
+        fmt = args.format or "ndjson"
+        if args.command == "export":
+            Path(args.path).mkdir(parents=True, exist_ok=True)
+        for name, path in _table_files(args.path, fmt):
+            if args.command == "export":
+                await export_file(name, str(path), fmt)
+            elif path.exists():
+                count = await import_file(name, str(path), fmt)
+                print(f"{name}: {count} rows")
+    finally:
+        await Tortoise.close_connections()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m carfigures.core.transfer",
+        description="Import and export catalog and economy tables as CSV or NDJSON",
+    )
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument(
+        "table", choices=(*TABLES, "all"), help="'all' reads or writes one file per table"
+    )
+    parser.add_argument(
+        "path", help="File, '-' for standard input/output, or a directory with 'all'"
+    )
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    try:
+        asyncio.run(run(args))
+    except ValueError as exc:
+        parser.exit(1, f"error: {exc}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Event-loop lag watchdog and slow-callback profiler"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from carfigures.core.context import current_operation
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SlowCallbackStats:
+    """Aggregated blocking time for one operation and code location"""
+    operation: str
+    location: str
+    count: int = 0
+    total: float = 0.0
+    worst: float = 0.0
+    last_stack: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Sample:
+    beat: float
+    operation: str
+    task_name: str
+    stack: List[str]
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop scheduling lag and samples the blocking stack
+    A heartbeat task wakes every interval on the loop while a watcher thread checks it
+    is on time. When the loop is stuck past the threshold, the watcher captures the loop
+    thread's stack, and the heartbeat logs and records it once the loop recovers.
+    """
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1, top_n: int = 10):
+        self.threshold = threshold
+        self.interval = interval
+        self.top_n = top_n
+        self.max_tracked = 256
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._last_beat = 0.0
+        self._sample: Optional[_Sample] = None
+        self._stats: Dict[Tuple[str, str], SlowCallbackStats] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the watchdog is currently running"""
+        return self._heartbeat_task is not None and not self._heartbeat_task.done()
+
+    def start(self, threshold: Optional[float] = None):
+        """Start watching the running loop"""
+        if threshold is not None:
+            self.threshold = threshold
+        if self.enabled:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        # A fresh event per run, so a watcher still winding down cannot be revived
+        self._stop_event = threading.Event()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat(), name="carfigures-watchdog")
+        self._watcher = threading.Thread(
+            target=self._watch, args=(self._stop_event,), name="carfigures-watchdog", daemon=True
+        )
+        self._watcher.start()
+        logger.info(f"Loop watchdog started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        """Stop watching, keeping the collected report"""
+        if not self.enabled:
+            return
+        self._stop_event.set()
+        self._heartbeat_task.cancel()
+        try:
+            await self._heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat_task = None
+        self._watcher = None
+        logger.info("Loop watchdog stopped")
+
+    def reset(self):
+        """Forget the collected slow callbacks"""
+        self._stats.clear()
+
+    def report(self, limit: Optional[int] = None) -> List[SlowCallbackStats]:
+        """Slow callbacks ordered by total time they blocked the loop"""
+        ranked = sorted(self._stats.values(), key=lambda stats: stats.total, reverse=True)
+        return ranked[: limit or self.top_n]
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = now - self._last_beat - self.interval
+            if lag >= self.threshold:
+                self._record(lag, self._last_beat)
+            self._last_beat = now
+
+    def _watch(self, stop_event: threading.Event):
+        # Runs in its own thread, so it keeps going while the loop is blocked
+        while not stop_event.wait(self.interval):
+            beat = self._last_beat
+            if time.monotonic() - beat - self.interval < self.threshold:
+                continue
+            if self._sample is not None and self._sample.beat == beat:
+                continue  # Already sampled this stall
+            self._sample = self._take_sample(beat)
+
+    def _take_sample(self, beat: float) -> _Sample:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+
+        operation, task_name = "unknown", "unknown"
+        task = asyncio.current_task(self._loop)
+        if task is not None:
+            task_name = task.get_name()
+            # Task.get_context() only exists on Python 3.12+
+            get_context = getattr(task, "get_context", None)
+            if get_context is not None:
+                operation = get_context().get(current_operation, operation)
+            else:
+                # discord.py names event tasks "discord.py: on_<event>"
+                operation = task_name.removeprefix("discord.py: ")
+
+        return _Sample(beat, operation, task_name, stack)
+
+    def _record(self, lag: float, beat: float):
+        sample = self._sample
+        if sample is None or sample.beat != beat:
+            # The stall ended before the watcher thread looked at it
+            sample = _Sample(beat, "unknown", "unknown", [])
+        self._sample = None
+
+        location = sample.stack[-1].strip().splitlines()[0] if sample.stack else "unknown"
+        key = (sample.operation, location)
+        stats = self._stats.get(key)
+        if stats is None:
+            if len(self._stats) >= self.max_tracked:
+                smallest = min(self._stats, key=lambda k: self._stats[k].total)
+                del self._stats[smallest]
+            stats = self._stats[key] = SlowCallbackStats(sample.operation, location)
+
+        stats.count += 1
+        stats.total += lag
+        stats.worst = max(stats.worst, lag)
+        stats.last_stack = sample.stack
+
+        logger.warning(
+            f"Event loop blocked for {lag * 1000:.0f}ms in {sample.operation} "
+            f"(task {sample.task_name})\n" + "".join(sample.stack[-8:])
+        )
+
+
+watchdog = LoopWatchdog()
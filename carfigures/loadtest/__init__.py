@@ -0,0 +1 @@
+"""Offline load testing against a simulated Discord gateway"""
@@ -0,0 +1,302 @@
+"""Synthetic gateway events and a recording stand-in for Discord's REST API"""
+
+import itertools
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import discord
+from discord.http import Route
+from discord.webhook.async_ import AsyncWebhookAdapter, async_context
+
+Payload = Dict[str, Any]
+
+# Interaction callback types sent back by the bot
+CALLBACK_UPDATE = 7
+CALLBACK_MODAL = 9
+
+_counter = itertools.count()
+
+
+def snowflake() -> int:
+    """Unique id shaped like the ones Discord hands out"""
+    return discord.utils.time_snowflake(datetime.now(timezone.utc)) | (next(_counter) & 0x3FFFFF)
+
+
+def _timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def user_payload(user_id: int, name: str, bot: bool = False) -> Payload:
+    return {
+        "id": str(user_id),
+        "username": name,
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+def member_payload(user: Optional[Payload] = None) -> Payload:
+    member = {
+        "roles": [], "joined_at": _timestamp(), "deaf": False, "mute": False, "flags": 0
+    }
+    if user is not None:
+        member["user"] = user
+    return member
+
+
+def _form_payload(form: Optional[List[Dict[str, Any]]]) -> Payload:
+    """JSON part of a multipart request, sent alongside attached files"""
+    for part in form or ():
+        if part.get("name") == "payload_json":
+            return json.loads(part["value"])
+    return {}
+
+
+class SimulatedGuild:
+    """A guild fed to the bot's cache, with the members that chat and click in it"""
+
+    def __init__(self, guild: discord.Guild, channel_ids: List[int], members: List[Payload]):
+        self.guild = guild
+        self.channel_ids = channel_ids
+        self.members = members
+
+
+class SimulatedGateway:
+    """
+    Drive a bot with gateway payloads instead of a websocket
+    Events go through the same ConnectionState parsers discord.py uses for the real
+    gateway, so commands, views and modals dispatch exactly as in production. REST
+    calls never leave the process: they are answered with plausible payloads, counted,
+    and handed to `listener` so a load test can react to spawns and interaction replies.
+    """
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.state = bot._connection
+        self.guilds: List[SimulatedGuild] = []
+        self.requests: Counter = Counter()
+        self.listener: Optional[Callable[[str, Payload], None]] = None
+        self._messages: Dict[int, Payload] = {}
+        self._bot_user: Optional[Payload] = None
+
+    def connect(self, bot_id: Optional[int] = None):
+        """Log the bot in as a synthetic user and answer its REST calls locally"""
+        self._bot_user = user_payload(bot_id or snowflake(), "CarFigures", bot=True)
+        self.state.user = discord.ClientUser(state=self.state, data=self._bot_user)
+        self.state.http.request = self._rest_request
+        # Interaction responses go through the webhook adapter, not the bot's HTTP client
+        async_context.set(_RecordingWebhookAdapter(self))
+
+    def add_guild(self, members: int, channels: int = 1) -> SimulatedGuild:
+        """Create a guild where the bot may send, embed and attach everywhere"""
+        guild_id = snowflake()
+        channel_ids = [snowflake() for _ in range(channels)]
+        users = [user_payload(snowflake(), f"user{i}") for i in range(members)]
+        data = {
+            "id": str(guild_id),
+            "name": f"Load test {len(self.guilds)}",
+            "owner_id": users[0]["id"] if users else self._bot_user["id"],
+            "member_count": members + 1,
+            "roles": [{
+                "id": str(guild_id),  # @everyone shares the guild id
+                "name": "@everyone",
+                "permissions": str(discord.Permissions.all().value),
+                "position": 0,
+                "color": 0,
+                "hoist": False,
+                "managed": False,
+                "mentionable": False,
+            }],
+            "channels": [
+                {
+                    "id": str(channel_id),
+                    "type": 0,
+                    "name": f"chat-{index}",
+                    "position": index,
+                    "permission_overwrites": [],
+                    "guild_id": str(guild_id),
+                }
+                for index, channel_id in enumerate(channel_ids)
+            ],
+            "members": [member_payload(user) for user in (*users, self._bot_user)],
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+        }
+        guild = SimulatedGuild(self.state._add_guild_from_data(data), channel_ids, users)
+        self.guilds.append(guild)
+        return guild
+
+    def message(
+        self, guild: SimulatedGuild, author: Payload, content: str,
+        channel_id: Optional[int] = None,
+    ) -> int:
+        """Dispatch a MESSAGE_CREATE from a member, returns the message id"""
+        data = self._member_message(guild, author, content, channel_id)
+        self.state.parse_message_create(data)
+        return int(data["id"])
+
+    def build_message(
+        self, guild: SimulatedGuild, author: Payload, content: str,
+        channel_id: Optional[int] = None,
+    ) -> discord.Message:
+        """Message from a member as the bot would receive it, without dispatching it"""
+        data = self._member_message(guild, author, content, channel_id)
+        channel = self.bot.get_channel(int(data["channel_id"]))
+        return discord.Message(state=self.state, channel=channel, data=data)
+
+    def _member_message(
+        self, guild: SimulatedGuild, author: Payload, content: str, channel_id: Optional[int]
+    ) -> Payload:
+        data = self._message_payload(
+            channel_id or guild.channel_ids[0], guild.guild.id, author, content=content
+        )
+        data["member"] = member_payload()
+        return data
+
+    def click(self, message: Payload, author: Payload, custom_id: str) -> int:
+        """Dispatch a button INTERACTION_CREATE on a message the bot sent"""
+        return self._interact(3, message, author, {"custom_id": custom_id, "component_type": 2})
+
+    def submit(self, message: Payload, author: Payload, modal: Payload, value: str) -> int:
+        """Dispatch a modal submit answering every text input of `modal` with `value`"""
+        inputs = [
+            {"type": 1, "components": [{"type": 4, "custom_id": custom_id, "value": value}]}
+            for custom_id in _text_inputs(modal.get("components", ()))
+        ]
+        return self._interact(5, message, author, {
+            "custom_id": modal["custom_id"], "components": inputs
+        })
+
+    def _interact(self, kind: int, message: Payload, author: Payload, data: Payload) -> int:
+        interaction_id = snowflake()
+        channel_id = int(message["channel_id"])
+        guild_id = message.get("guild_id")
+        self.state.parse_interaction_create({
+            "id": str(interaction_id),
+            "application_id": self._bot_user["id"],
+            "type": kind,
+            "token": f"token-{interaction_id}",
+            "version": 1,
+            "guild_id": guild_id,
+            "channel_id": str(channel_id),
+            "channel": {"id": str(channel_id), "type": 0, "guild_id": guild_id},
+            "member": {**member_payload(author), "permissions": "0"},
+            "message": message,
+            "data": data,
+            "locale": "en-US",
+            "guild_locale": "en-US",
+            "app_permissions": str(discord.Permissions.all().value),
+            "entitlements": [],
+            "attachment_size_limit": 25 * 1024 * 1024,
+            "authorizing_integration_owners": {},
+            "context": 0,
+        })
+        return interaction_id
+
+    def _message_payload(
+        self, channel_id: int, guild_id: Optional[int], author: Payload, **fields
+    ) -> Payload:
+        data = {
+            "id": str(snowflake()),
+            "channel_id": str(channel_id),
+            "author": author,
+            "content": "",
+            "timestamp": _timestamp(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "components": [],
+            "pinned": False,
+            "type": 0,
+        }
+        if guild_id is not None:
+            data["guild_id"] = str(guild_id)
+        data.update(fields)
+        return data
+
+    async def _rest_request(self, route: Route, *, files=None, form=None, **kwargs) -> Any:
+        self.requests[f"{route.method} {route.path}"] += 1
+        payload = kwargs.get("json") or _form_payload(form)
+
+        if route.path == "/channels/{channel_id}/messages" and route.method == "POST":
+            attachments = [
+                {
+                    "id": str(snowflake()),
+                    "filename": file.filename,
+                    "size": 0,
+                    "url": f"https://cdn.invalid/{file.filename}",
+                    "proxy_url": f"https://cdn.invalid/{file.filename}",
+                }
+                for file in files or ()
+            ]
+            channel = self.bot.get_channel(int(route.channel_id))
+            message = self._message_payload(
+                int(route.channel_id),
+                getattr(getattr(channel, "guild", None), "id", None),
+                self._bot_user,
+                content=payload.get("content") or "",
+                embeds=payload.get("embeds") or [],
+                components=payload.get("components") or [],
+                attachments=attachments,
+            )
+            if message["components"]:
+                # Only messages with components are edited later, spawns when they end
+                self._messages[int(message["id"])] = message
+            self._notify("message", message)
+            return message
+
+        if route.path == "/channels/{channel_id}/messages/{message_id}":
+            message = self._messages.pop(int(route.url.rsplit("/", 1)[1]), None) or {}
+            if route.method == "PATCH":
+                message.update(payload)
+            return message
+        return {}
+
+    def _notify(self, kind: str, data: Payload):
+        if self.listener is not None:
+            self.listener(kind, data)
+
+    def _interaction_response(self, route: Route, payload: Payload) -> Payload:
+        self.requests[f"{route.method} {route.path}"] += 1
+        interaction_id = int(route.webhook_id)
+        kind = payload.get("type")
+        self._notify("interaction", {
+            "id": interaction_id, "type": kind, "data": payload.get("data") or {}
+        })
+        return {"interaction": {"id": str(interaction_id), "type": kind}}
+
+
+class _RecordingWebhookAdapter(AsyncWebhookAdapter):
+    def __init__(self, gateway: SimulatedGateway):
+        super().__init__()
+        self.gateway = gateway
+
+    async def request(
+        self, route: Route, session=None, *, payload=None, multipart=None, **kwargs
+    ) -> Any:
+        payload = payload or _form_payload(multipart)
+        if route.path.startswith("/interactions/"):
+            return self.gateway._interaction_response(route, payload)
+        self.gateway.requests[f"{route.method} {route.path}"] += 1
+        return {}
+
+
+def _text_inputs(components) -> List[str]:
+    """Custom ids of the text inputs in a modal, wrapped in action rows or labels"""
+    found = []
+    for component in components:
+        if component.get("type") == 4:
+            found.append(component["custom_id"])
+        found.extend(_text_inputs(component.get("components", ())))
+        if "component" in component:
+            found.extend(_text_inputs([component["component"]]))
+    return found
@@ -0,0 +1,366 @@
+"""Load test scenarios: synthetic traffic against a real bot and database"""
+
+import asyncio
+import logging
+import math
+import random
+import re
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from discord.ext import commands
+from tortoise import Tortoise
+
+from carfigures.core.bot import CarFiguresBot
+from carfigures.core.config import Config
+from carfigures.core.context import current_operation
+from carfigures.core.database import (
+    DB_URL, TORTOISE_ORM, add_query_listener, install_query_hook, remove_query_listener
+)
+from carfigures.core.outbound import OutboundScheduler
+from carfigures.loadtest.gateway import (
+    CALLBACK_MODAL, CALLBACK_UPDATE, Payload, SimulatedGateway, SimulatedGuild
+)
+from carfigures.models import Pack, User, UserCoins, UserPack
+
+logger = logging.getLogger(__name__)
+
+# Command name -> arguments, {pack} and {user_pack} are filled in per invocation
+COMMANDS = {
+    "daily": "",
+    "buy": "{pack}",
+    "open": "{user_pack}",
+    "lb": "",
+    "garage": "",
+}
+# Budget large enough that the outbound scheduler never delays anything
+_UNLIMITED = 1e9
+_CATCH_ID = re.compile(r"cf:catch:(?P<spawn_id>[0-9a-z]+):[0-9]+")
+
+
+@dataclass
+class Scenario:
+    guilds: int = 10
+    members: int = 25  # Per guild, every member has coins and unopened packs
+    duration: float = 30.0  # Seconds of traffic, the run then waits for stragglers
+    message_rate: float = 50.0  # Chat messages per second over all guilds, they trigger spawns
+    command_rate: float = 10.0  # Commands per second over all guilds
+    command_mix: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(COMMANDS, 1.0))
+    catch_clicks: int = 5  # Members clicking every spawn at once
+    correct_ratio: float = 0.5  # Share of those clicks naming the car right
+    typing_time: float = 0.5  # Seconds between the modal opening and its submission
+    packs_per_member: int = 3
+    starting_balance: int = 1_000_000
+    discord_limits: bool = False  # Keep the outbound rate limits of the real bot
+    rate_limits: bool = False  # Keep the per-user and per-guild command limits of config.toml
+    seed: int = 0
+
+
+@dataclass
+class OperationStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+@dataclass
+class Report:
+    scenario: Scenario
+    db_url: str
+    elapsed: float
+    operations: Dict[str, OperationStats]
+    queries: Counter
+    requests: Counter
+    spawns: int
+    catches: int
+    unfinished: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        """JSON-friendly summary, latencies in milliseconds"""
+        operations = {}
+        for name in sorted(set(self.operations) | set(self.queries)):
+            stats = self.operations.get(name, OperationStats())
+            count = len(stats.latencies)
+            operations[name] = {
+                "count": count,
+                "errors": stats.errors,
+                "throughput": count / self.elapsed if self.elapsed else 0.0,
+                "p50_ms": stats.percentile(0.50) * 1000,
+                "p99_ms": stats.percentile(0.99) * 1000,
+                "queries": self.queries.get(name, 0),
+                "queries_per_op": self.queries.get(name, 0) / count if count else None,
+            }
+        return {
+            "db": self.db_url.split("://", 1)[0],
+            "elapsed": self.elapsed,
+            "spawns": self.spawns,
+            "catches": self.catches,
+            "unfinished": self.unfinished,
+            "operations": operations,
+            "requests": dict(self.requests),
+        }
+
+    def format(self) -> str:
+        summary = self.as_dict()
+        lines = [
+            f"{summary['db']}: {self.scenario.guilds} guilds, {self.elapsed:.1f}s, "
+            f"{self.spawns} spawns, {self.catches} catches, {self.unfinished} unfinished",
+            f"{'operation':<14}{'count':>8}{'errors':>8}{'ops/s':>9}{'p50 ms':>9}"
+            f"{'p99 ms':>9}{'queries/op':>12}",
+        ]
+        for name, row in summary["operations"].items():
+            if not row["count"]:
+                continue  # Queries outside any measured operation, e.g. the spawn sweeper
+            per_op = "-" if row["queries_per_op"] is None else f"{row['queries_per_op']:.1f}"
+            lines.append(
+                f"{name:<14}{row['count']:>8}{row['errors']:>8}{row['throughput']:>9.1f}"
+                f"{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}{per_op:>12}"
+            )
+        return "\n".join(lines)
+
+
+class LoadTest:
+    """
+    One scenario against a freshly set up bot
+    Latency runs from injecting the gateway event to the end of the command for prefix
+    commands, and to the interaction response for catch clicks and name submissions.
+    """
+
+    def __init__(self, scenario: Scenario, config: Config):
+        self.scenario = scenario
+        self.config = config
+        self.random = random.Random(scenario.seed)
+        self.operations: Dict[str, OperationStats] = defaultdict(OperationStats)
+        self.queries: Counter = Counter()
+        self.spawns = 0
+        self.catches = 0
+        self.bot: Optional[CarFiguresBot] = None
+        self.gateway: Optional[SimulatedGateway] = None
+        self._pending: Dict[int, Tuple[str, float]] = {}
+        # Interaction id -> (spawn message, member, answer) waiting for the modal
+        self._clicks: Dict[int, Tuple[Payload, Payload, str]] = {}
+        self._packs: List[str] = []
+        self._user_packs: Dict[int, Deque[int]] = {}
+
+    async def run(self) -> Report:
+        try:
+            await self._setup()
+            add_query_listener(self._count_query)
+            started = time.perf_counter()
+            await asyncio.gather(
+                self._produce(self.scenario.message_rate, self._chat),
+                self._produce(self.scenario.command_rate, self._command),
+            )
+            await self._drain(timeout=10.0)
+            elapsed = time.perf_counter() - started
+        finally:
+            remove_query_listener(self._count_query)
+            await self._teardown()
+        return Report(
+            self.scenario, DB_URL, elapsed, dict(self.operations), self.queries,
+            self.gateway.requests, self.spawns, self.catches, len(self._pending),
+        )
+
+    # Setup
+
+    async def _setup(self):
+        await Tortoise.init(config=TORTOISE_ORM)
+        install_query_hook()
+        await Tortoise.generate_schemas()
+
+        from carfigures.models import Car
+        if not await Car.exists():
+            from carfigures.utils.sample_data import create_sample_cars, create_sample_packs
+            await create_sample_cars()
+            await create_sample_packs()
+
+        # No card rendering or metrics server, the harness measures the bot itself
+        self.config.cards.enabled = False
+        self.config.prometheus.enabled = False
+        self.config.spawn_manager.spawn_channels = {}
+        # Spawns follow the message rate alone, the cooldown would hide most of them
+        self.config.spawn_manager.cooldown_time = 0
+        if not self.scenario.rate_limits:
+            self.config.rate_limits.commands = {}
+        self.bot = CarFiguresBot(self.config)
+        if not self.scenario.discord_limits:
+            self.bot.outbound = OutboundScheduler(_UNLIMITED, _UNLIMITED, _UNLIMITED)
+
+        self.gateway = SimulatedGateway(self.bot)
+        self.gateway.connect()
+        self.gateway.listener = self._on_response
+        for _ in range(self.scenario.guilds):
+            self.gateway.add_guild(self.scenario.members)
+        await self._seed()
+
+        # What Client.login does before setup_hook, minus the token exchange
+        await self.bot._async_setup_hook()
+        await self.bot.setup_hook()
+        self.bot.add_listener(self._on_command_done, "on_command_completion")
+        self.bot.add_listener(self._on_command_error, "on_command_error")
+
+    async def _seed(self):
+        """Give every simulated member coins and unopened packs"""
+        members = [member for guild in self.gateway.guilds for member in guild.members]
+        user_ids = [int(member["id"]) for member in members]
+        await User.bulk_create(
+            [User(id=user_id, username=member["username"])
+             for user_id, member in zip(user_ids, members)],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+        await UserCoins.bulk_create(
+            [UserCoins(user_id=user_id, balance=self.scenario.starting_balance)
+             for user_id in user_ids],
+            batch_size=500,
+            on_conflict=["user_id"],
+            update_fields=["balance"],
+        )
+
+        packs = await Pack.filter(is_active=True).values_list("id", "name")
+        self._packs = [name for _, name in packs]
+        if packs and self.scenario.packs_per_member:
+            await UserPack.bulk_create(
+                [UserPack(user_id=user_id, pack_id=self.random.choice(packs)[0], price_paid=0)
+                 for user_id in user_ids for _ in range(self.scenario.packs_per_member)],
+                batch_size=500,
+            )
+        rows = await UserPack.filter(user_id__in=user_ids, is_opened=False).values_list(
+            "id", "user_id"
+        )
+        for pack_id, user_id in rows:
+            self._user_packs.setdefault(user_id, deque()).append(pack_id)
+
+    async def _teardown(self):
+        if self.bot is not None:
+            await self.bot.close()
+        await Tortoise.close_connections()
+
+    # Traffic
+
+    async def _produce(self, rate: float, emit):
+        """Call `emit` `rate` times per second until the scenario ends"""
+        if rate <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        started = last = loop.time()
+        budget = 0.0
+        while last - started < self.scenario.duration:
+            await asyncio.sleep(0.01)
+            now = loop.time()
+            budget += (now - last) * rate
+            last = now
+            while budget >= 1:
+                budget -= 1
+                emit()
+
+    def _pick(self) -> Tuple[SimulatedGuild, Payload]:
+        guild = self.random.choice(self.gateway.guilds)
+        return guild, self.random.choice(guild.members)
+
+    def _chat(self):
+        guild, member = self._pick()
+        self.gateway.message(guild, member, "vroom")
+
+    def _command(self):
+        guild, member = self._pick()
+        mix = self.scenario.command_mix
+        name = self.random.choices(list(mix), weights=list(mix.values()))[0]
+        user_packs = self._user_packs.get(int(member["id"]))
+        arguments = COMMANDS[name].format(
+            pack=self.random.choice(self._packs) if self._packs else "none",
+            user_pack=user_packs.popleft() if user_packs else 0,
+        )
+        message_id = self.gateway.message(
+            guild, member, f"{self.config.prefix}{name} {arguments}".rstrip()
+        )
+        self._pending[message_id] = (name, time.perf_counter())
+
+    def _on_response(self, kind: str, data: Payload):
+        if kind == "message":
+            self._on_message_sent(data)
+            return
+
+        pending = self._pending.pop(data["id"], None)
+        if pending is None:
+            return
+        name, started = pending
+        self.operations[name].latencies.append(time.perf_counter() - started)
+
+        click = self._clicks.pop(data["id"], None)
+        if click is not None and data["type"] == CALLBACK_MODAL:
+            # The bot only registers the modal once this response returned
+            asyncio.get_running_loop().call_later(
+                self.scenario.typing_time, self._submit, *click, data["data"]
+            )
+        elif name == "catch" and data["type"] == CALLBACK_UPDATE:
+            self.catches += 1  # Only the winner gets the spawn message edited
+
+    def _submit(self, message: Payload, member: Payload, answer: str, modal: Payload):
+        interaction_id = self.gateway.submit(message, member, modal, answer)
+        self._pending[interaction_id] = ("catch", time.perf_counter())
+
+    def _on_message_sent(self, message: Payload):
+        custom_ids = [
+            component.get("custom_id", "")
+            for row in message["components"]
+            for component in row.get("components", ())
+        ]
+        match = next(filter(None, map(_CATCH_ID.match, custom_ids)), None)
+        if match is None:
+            return
+        self.spawns += 1
+
+        # Clickers know the car the way a player recognizes it, the button does not say
+        state = self.bot.spawns.get(int(match["spawn_id"], 36))
+        car = self.bot.catalog.get(state.car_id) if state is not None else None
+        guild = next(
+            guild for guild in self.gateway.guilds if guild.guild.id == int(message["guild_id"])
+        )
+        clickers = self.random.sample(
+            guild.members, min(self.scenario.catch_clicks, len(guild.members))
+        )
+        # Clicks land right after the spawn, the way a busy channel races for it
+        for member in clickers:
+            correct = car is not None and self.random.random() < self.scenario.correct_ratio
+            answer = car.name if correct else "not this one"
+            interaction_id = self.gateway.click(message, member, match.group(0))
+            self._pending[interaction_id] = ("catch_button", time.perf_counter())
+            self._clicks[interaction_id] = (message, member, answer)
+
+    async def _on_command_done(self, ctx: commands.Context):
+        self._finish_command(ctx, failed=False)
+
+    async def _on_command_error(self, ctx: commands.Context, error: Exception):
+        logger.debug(f"{ctx.message.content!r} failed: {error!r}")
+        self._finish_command(ctx, failed=True)
+
+    def _finish_command(self, ctx: commands.Context, failed: bool):
+        pending = self._pending.pop(ctx.message.id, None)
+        if pending is None:
+            return
+        name, started = pending
+        stats = self.operations[name]
+        stats.latencies.append(time.perf_counter() - started)
+        if failed:
+            stats.errors += 1
+
+    def _count_query(self, query: str, duration: float):
+        operation = current_operation.get()
+        # Reported under the harness names, the bot labels commands by their full name
+        self.queries["lb" if operation == "leaderboard" else operation] += 1
+
+    async def _drain(self, timeout: float):
+        """Wait for the events still in flight, up to `timeout` seconds"""
+        deadline = time.perf_counter() + timeout
+        while self._pending and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pending:
+            logger.warning(f"{len(self._pending)} events got no answer before the deadline")
@@ -2,8 +2,13 @@
 
 from .user import User
 from .car import Car, UserCar
-from .coins import UserCoins, DailyClaim
+from .coins import UserCoins, DailyClaim, CoinReason, CoinTransaction
 from .packs import Pack, PackContent, UserPack
+from .spawn import Spawn
+from .economy import EconomyMetric, EconomyRollup, Resolution
+from .timing import CatchTiming
+from .events import EventKind, EventState, ScheduledEvent
+from .guild import GuildConfig
 
 __all__ = [
     "User",
@@ -11,7 +16,18 @@ __all__ = [
     "UserCar",
     "UserCoins",
     "DailyClaim",
+    "CoinReason",
+    "CoinTransaction",
     "Pack",
     "PackContent", 
-    "UserPack"
+    "UserPack",
+    "Spawn",
+    "EconomyMetric",
+    "EconomyRollup",
+    "Resolution",
+    "CatchTiming",
+    "EventKind",
+    "EventState",
+    "ScheduledEvent",
+    "GuildConfig",
 ]
\ No newline at end of file
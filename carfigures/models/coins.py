@@ -1,5 +1,7 @@
 """Coin system models"""
 
+from enum import IntEnum
+
 from tortoise import fields
 from tortoise.models import Model
 
@@ -37,4 +39,35 @@ class DailyClaim(Model):
     
     class Meta:
         table = "daily_claims"
-        unique_together = ("user", "claim_date")
\ No newline at end of file
+        unique_together = ("user", "claim_date")
+
+
+class CoinReason(IntEnum):
+    """Why a balance changed, stored as a small integer in the journal"""
+    UNKNOWN = 0
+    OPENING_BALANCE = 1  # Balance held before the journal existed
+    DAILY_CLAIM = 2
+    CAR_CATCH = 3
+    PACK_PURCHASE = 4
+    ADMIN_GIFT = 5
+    TRADE = 6  # Coins moved between two users, the same amount on both sides
+    IMPORT = 7  # Balance overwritten by a bulk import, the entry is the difference
+
+
+class CoinTransaction(Model):
+    """
+    Append-only journal of balance changes, the sum of a user's deltas is their balance
+    Rows are never updated or deleted. The user is a plain column rather than a foreign
+    key, so the history of a deleted user stays intact.
+    """
+    id = fields.BigIntField(pk=True)
+    user_id = fields.BigIntField()
+    delta = fields.IntField()
+    reason = fields.IntEnumField(CoinReason, default=CoinReason.UNKNOWN)
+    reference_id = fields.BigIntField(null=True)  # Spawn, pack, admin or trade behind the change
+    created_at = fields.DatetimeField()
+    
+    class Meta:
+        table = "coin_transactions"
+        # Newest first history of a user, and the per user sums of the verification job
+        indexes = (("user_id", "id"),)
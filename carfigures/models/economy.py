@@ -0,0 +1,44 @@
+"""Economy analytics models"""
+
+from enum import IntEnum
+
+from tortoise import fields
+from tortoise.models import Model
+
+
+class Resolution(IntEnum):
+    """Width of a rollup bucket"""
+    MINUTE = 1
+    HOUR = 2
+    DAY = 3
+    
+    @property
+    def seconds(self) -> int:
+        return {Resolution.MINUTE: 60, Resolution.HOUR: 3600, Resolution.DAY: 86400}[self]
+
+
+class EconomyMetric(IntEnum):
+    """What a rollup counts, the dimension column says of what"""
+    COINS_MINTED = 1  # Dimension is the CoinReason
+    COINS_BURNED = 2  # Dimension is the CoinReason
+    PACKS_SOLD = 3  # Dimension is the pack id
+    PACK_REVENUE = 4  # Dimension is the pack id
+
+
+class EconomyRollup(Model):
+    """
+    Total of a metric over one time bucket
+    Rows are only ever incremented, by upserts adding to `value`, so every process
+    can flush its own counters into the same buckets.
+    """
+    id = fields.BigIntField(pk=True)
+    resolution = fields.IntEnumField(Resolution)
+    bucket = fields.DatetimeField()  # Start of the bucket, in UTC
+    metric = fields.IntEnumField(EconomyMetric)
+    dimension = fields.BigIntField(default=0)
+    value = fields.BigIntField(default=0)
+    
+    class Meta:
+        table = "economy_rollups"
+        # The upsert target, and time range scans of one resolution
+        unique_together = (("resolution", "bucket", "metric", "dimension"),)
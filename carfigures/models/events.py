@@ -0,0 +1,46 @@
+"""Scheduled event models"""
+
+from enum import IntEnum
+
+from tortoise import fields
+from tortoise.models import Model
+
+
+class EventKind(IntEnum):
+    """What a scheduled event does while it runs"""
+    PACK_RELEASE = 1  # The pack is on sale
+    SPAWN_BOOST = 2  # Spawns need `multiplier` times fewer messages
+    REWARD_BOOST = 3  # Catch rewards are `multiplier` times larger
+
+
+class EventState(IntEnum):
+    SCHEDULED = 0
+    ACTIVE = 1
+    ENDED = 2
+    CANCELLED = 3
+
+
+class ScheduledEvent(Model):
+    """
+    Limited time pack release or boost, run by the event scheduler of every process
+    Each process applies the effects in memory, the state column moves forward with
+    conditional updates so only one of them writes the pack changes.
+    """
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=100)
+    kind = fields.IntEnumField(EventKind)
+    pack = fields.ForeignKeyField("models.Pack", related_name="events", null=True)
+    multiplier = fields.FloatField(default=1.0)
+    
+    # Schedule
+    starts_at = fields.DatetimeField()
+    ends_at = fields.DatetimeField()
+    state = fields.IntEnumField(EventState, default=EventState.SCHEDULED)
+    
+    created_by = fields.BigIntField(null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    
+    class Meta:
+        table = "scheduled_events"
+        # Schedulers read the events that are not over yet
+        indexes = (("state", "starts_at"),)
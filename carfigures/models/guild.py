@@ -0,0 +1,28 @@
+"""Guild configuration models"""
+
+from tortoise import fields
+from tortoise.models import Model
+
+
+class GuildConfig(Model):
+    """
+    Spawn and reward settings of one guild, overriding the global ones
+    Null columns fall back to config.toml. Rows are never deleted, resetting a guild
+    clears its columns, so other processes see the change through `updated_at`.
+    """
+    id = fields.IntField(pk=True)
+    guild_id = fields.BigIntField(unique=True)
+    
+    # Spawning
+    min_messages = fields.IntField(null=True)
+    max_messages = fields.IntField(null=True)
+    cooldown = fields.IntField(null=True)  # Seconds
+    spawn_channels = fields.JSONField(null=True)  # Channel ids, spawns go nowhere else
+    
+    # Rewards
+    reward_multiplier = fields.FloatField(null=True)  # Applied to catch rewards
+    
+    updated_at = fields.DatetimeField(index=True)  # Set by every write, other processes poll it
+    
+    class Meta:
+        table = "guild_configs"
@@ -49,6 +49,7 @@ class PackContent(Model):
     class Meta:
         table = "pack_contents"
         unique_together = ("pack", "car")
+        indexes = (("car", "id"),)
 
 
 class UserPack(Model):
@@ -59,7 +60,7 @@ class UserPack(Model):
     
     # Purchase details
     price_paid = fields.IntField()
-    purchased_at = fields.DatetimeField(auto_now_add=True)
+    purchased_at = fields.DatetimeField(auto_now_add=True, index=True)
     
     # Opening details
     is_opened = fields.BooleanField(default=False)
@@ -67,4 +68,6 @@ class UserPack(Model):
     cars_received = fields.JSONField(default=list)  # List of car IDs received
     
     class Meta:
-        table = "user_packs"
\ No newline at end of file
+        table = "user_packs"
+        # Panel filters, the trailing id keeps keyset pagination on the index
+        indexes = (("user", "id"), ("pack", "id"), ("is_opened", "id"))
\ No newline at end of file
@@ -0,0 +1,23 @@
+"""Spawn model"""
+
+from tortoise import fields
+from tortoise.models import Model
+
+
+class Spawn(Model):
+    """A spawned car, the catch is claimed with a single conditional update"""
+    id = fields.BigIntField(pk=True)  # Spawn id, also encoded in the catch button
+    guild_id = fields.BigIntField()
+    channel_id = fields.BigIntField()
+    car = fields.ForeignKeyField("models.Car", related_name="spawns")
+    
+    # Catch state
+    expires_at = fields.DatetimeField(index=True)
+    caught_by = fields.BigIntField(null=True)
+    caught_at = fields.DatetimeField(null=True)
+    
+    # Timestamps
+    created_at = fields.DatetimeField(auto_now_add=True)
+    
+    class Meta:
+        table = "spawns"
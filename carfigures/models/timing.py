@@ -0,0 +1,31 @@
+"""Catch timing models"""
+
+from tortoise import fields
+from tortoise.models import Model
+
+
+class CatchTiming(Model):
+    """
+    How fast a user reacts to spawns, written periodically by the bot
+    The histograms are bucket counts over log spaced reaction times, see
+    carfigures.core.catchtiming. The summary columns are there for the panel to list
+    and sort without decoding them.
+    """
+    id = fields.BigIntField(pk=True)
+    user_id = fields.BigIntField(unique=True)
+    clicks = fields.JSONField(default=list)  # Spawn to catch button click
+    typing = fields.JSONField(default=list)  # Click to right name submitted
+    samples = fields.IntField(default=0)
+    median_click = fields.FloatField(null=True)  # Seconds
+    median_typing = fields.FloatField(null=True)
+    
+    # Detection
+    flagged = fields.BooleanField(default=False, index=True)
+    reasons = fields.CharField(max_length=255, default="")
+    flagged_at = fields.DatetimeField(null=True)
+    
+    # Timestamps
+    updated_at = fields.DatetimeField(index=True)
+    
+    class Meta:
+        table = "catch_timings"
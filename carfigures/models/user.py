@@ -7,7 +7,7 @@ from tortoise.models import Model
 class User(Model):
     """Discord user model"""
     id = fields.BigIntField(pk=True)  # Discord user ID
-    username = fields.CharField(max_length=255)
+    username = fields.CharField(max_length=255, default="", index=True)  # Filled in when known
     discriminator = fields.CharField(max_length=4, null=True)
     avatar_url = fields.TextField(null=True)
     
@@ -17,7 +17,7 @@ class User(Model):
     packs_opened = fields.IntField(default=0)
     
     # Timestamps
-    created_at = fields.DatetimeField(auto_now_add=True)
+    created_at = fields.DatetimeField(auto_now_add=True, index=True)
     updated_at = fields.DatetimeField(auto_now=True)
     
     class Meta:
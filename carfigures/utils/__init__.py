@@ -2,5 +2,6 @@
 
 from .coins import CoinManager
 from .packs import PackManager
+from .catches import CatchManager
 
-__all__ = ["CoinManager", "PackManager"]
\ No newline at end of file
+__all__ = ["CoinManager", "PackManager", "CatchManager"]
\ No newline at end of file
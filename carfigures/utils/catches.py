@@ -0,0 +1,86 @@
+"""Spawn and catch persistence utilities"""
+
+import random
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from tortoise.transactions import in_transaction
+
+from carfigures.core.database import WRITER_CONNECTION, batched_write, write_batcher
+from carfigures.models import Spawn, UserCar
+from carfigures.utils.coins import CoinManager
+
+
+class CatchManager:
+    """Manages spawn records and catch arbitration"""
+    
+    @staticmethod
+    @batched_write
+    async def record_spawn(
+        spawn_id: int, guild_id: int, channel_id: int, car_id: int, expires_at: float
+    ) -> Spawn:
+        """Persist a spawn so any process can arbitrate its catch"""
+        return await Spawn.create(
+            id=spawn_id,
+            guild_id=guild_id,
+            channel_id=channel_id,
+            car_id=car_id,
+            expires_at=datetime.fromtimestamp(expires_at, timezone.utc),
+        )
+    
+    @staticmethod
+    async def spawn_car_id(spawn_id: int) -> Optional[int]:
+        """Car of a recorded spawn, None if there is no such spawn"""
+        return await Spawn.filter(id=spawn_id).first().values_list("car_id", flat=True)
+    
+    @staticmethod
+    @batched_write
+    async def claim_catch(
+        spawn_id: int,
+        car_id: int,
+        user_id: int,
+        base_reward: int,
+        bonus_range: list,
+        bonus_rate: list,
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Claim a spawn for a user, then award the car and the coins
+        The claim is a single conditional update, so exactly one caller across all
+        processes wins. Returns (coins rewarded, catch bonus), or None if the claim was lost.
+        """
+        now = datetime.now(timezone.utc)
+        async with in_transaction(WRITER_CONNECTION):
+            claimed = await Spawn.filter(
+                id=spawn_id, car_id=car_id, caught_by=None, expires_at__gt=now
+            ).update(caught_by=user_id, caught_at=now)
+            if not claimed:
+                return None
+            
+            # The catch bonus is a percentage of the base reward, it can be negative
+            catch_bonus = round(base_reward * random.randint(*bonus_rate) / 100)
+            coins = await CoinManager.reward_catch(
+                user_id, base_reward + catch_bonus, bonus_range, spawn_id
+            )
+            await write_batcher.defer(
+                CatchManager._upsert_user_cars, (user_id, car_id, catch_bonus)
+            )
+            return coins, catch_bonus
+    
+    @staticmethod
+    async def _upsert_user_cars(rows: List[Tuple[int, int, int]]):
+        """Write caught cars in one statement, a car caught again replaces the catch"""
+        latest = {(user_id, car_id): bonus for user_id, car_id, bonus in rows}
+        await UserCar.bulk_create(
+            [
+                UserCar(user_id=user_id, car_id=car_id, catch_bonus=bonus)
+                for (user_id, car_id), bonus in latest.items()
+            ],
+            on_conflict=["user_id", "car_id"],
+            update_fields=["caught_at", "catch_bonus"],
+        )
+    
+    @staticmethod
+    @batched_write
+    async def purge_spawns(before: datetime) -> int:
+        """Delete spawns that expired before a point in time"""
+        return await Spawn.filter(expires_at__lt=before).delete()
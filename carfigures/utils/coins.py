@@ -1,10 +1,14 @@
 """Coin system utilities"""
 
 import random
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional, Tuple
 
-from carfigures.models import User, UserCoins, DailyClaim
+from tortoise.expressions import F
+
+from carfigures.core import journal
+from carfigures.core.database import batched_write
+from carfigures.models import CoinReason, User, UserCoins, DailyClaim
 
 
 class CoinManager:
@@ -18,28 +22,53 @@ class CoinManager:
         return coins
     
     @staticmethod
-    async def add_coins(user_id: int, amount: int, reason: str = "Unknown") -> UserCoins:
-        """Add coins to user balance"""
-        coins = await CoinManager.get_or_create_user_coins(user_id)
-        coins.balance += amount
-        coins.lifetime_earned += amount
-        await coins.save()
-        return coins
+    @batched_write
+    async def add_coins(
+        user_id: int,
+        amount: int,
+        reason: CoinReason = CoinReason.UNKNOWN,
+        reference_id: Optional[int] = None,
+    ) -> UserCoins:
+        """
+        Add coins to user balance
+        The balance is incremented by the database rather than rewritten from a read, so
+        a trade settling or a purchase at the same time cannot overwrite it.
+        """
+        increment = {
+            "balance": F("balance") + amount,
+            "lifetime_earned": F("lifetime_earned") + amount,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        if not await UserCoins.filter(user_id=user_id).update(**increment):
+            await CoinManager.get_or_create_user_coins(user_id)
+            await UserCoins.filter(user_id=user_id).update(**increment)
+        await journal.record(user_id, amount, reason, reference_id)
+        return await UserCoins.get(user_id=user_id)
     
     @staticmethod
-    async def spend_coins(user_id: int, amount: int) -> Tuple[bool, UserCoins]:
+    @batched_write
+    async def spend_coins(
+        user_id: int,
+        amount: int,
+        reason: CoinReason = CoinReason.UNKNOWN,
+        reference_id: Optional[int] = None,
+    ) -> Tuple[bool, UserCoins]:
         """
         Spend coins from user balance
+        The balance check and the decrement are one conditional update, so concurrent
+        spends and trades can never take a balance below zero or overwrite each other.
         Returns: (success, user_coins)
         """
+        spent = await UserCoins.filter(user_id=user_id, balance__gte=amount).update(
+            balance=F("balance") - amount,
+            lifetime_spent=F("lifetime_spent") + amount,
+            updated_at=datetime.now(timezone.utc),
+        )
         coins = await CoinManager.get_or_create_user_coins(user_id)
-        
-        if coins.balance < amount:
+        if not spent:
             return False, coins
         
-        coins.balance -= amount
-        coins.lifetime_spent += amount
-        await coins.save()
+        await journal.record(user_id, -amount, reason, reference_id)
         return True, coins
     
     @staticmethod
@@ -68,6 +97,26 @@ class CoinManager:
         return False, last_claim
     
     @staticmethod
+    def daily_reward(
+        base_amount: int, today: date, last_claim: Optional[DailyClaim] = None
+    ) -> Tuple[int, int]:
+        """
+        Daily reward for a claim made `today`
+        Returns: (amount, streak_count)
+        """
+        # Calculate streak
+        streak_count = 1
+        if last_claim:
+            yesterday = today - timedelta(days=1)
+            if last_claim.claim_date == yesterday:
+                streak_count = last_claim.streak_count + 1
+        
+        # Calculate bonus based on streak (max 50% bonus at 10+ days)
+        streak_bonus = min(streak_count * 0.05, 0.5)
+        return int(base_amount * (1 + streak_bonus)), streak_count
+    
+    @staticmethod
+    @batched_write
     async def claim_daily(user_id: int, base_amount: int) -> Tuple[bool, int, int]:
         """
         Claim daily reward
@@ -80,17 +129,7 @@ class CoinManager:
         
         user, _ = await User.get_or_create(id=user_id)
         today = date.today()
-        
-        # Calculate streak
-        streak_count = 1
-        if last_claim:
-            yesterday = today - timedelta(days=1)
-            if last_claim.claim_date == yesterday:
-                streak_count = last_claim.streak_count + 1
-        
-        # Calculate bonus based on streak (max 50% bonus at 7+ days)
-        streak_bonus = min(streak_count * 0.05, 0.5)
-        amount = int(base_amount * (1 + streak_bonus))
+        amount, streak_count = CoinManager.daily_reward(base_amount, today, last_claim)
         
         # Create daily claim record
         await DailyClaim.create(
@@ -101,12 +140,15 @@ class CoinManager:
         )
         
         # Add coins to user
-        await CoinManager.add_coins(user_id, amount, "Daily claim")
+        await CoinManager.add_coins(user_id, amount, CoinReason.DAILY_CLAIM)
         
         return True, amount, streak_count
     
     @staticmethod
-    async def reward_catch(user_id: int, base_reward: int, bonus_range: list) -> int:
+    @batched_write
+    async def reward_catch(
+        user_id: int, base_reward: int, bonus_range: list, spawn_id: Optional[int] = None
+    ) -> int:
         """
         Reward coins for catching a car
         Returns: amount_rewarded
@@ -114,12 +156,13 @@ class CoinManager:
         bonus = random.randint(bonus_range[0], bonus_range[1])
         total_reward = base_reward + bonus
         
-        await CoinManager.add_coins(user_id, total_reward, "Car catch")
+        await CoinManager.add_coins(user_id, total_reward, CoinReason.CAR_CATCH, spawn_id)
         
-        # Update user stats
-        user, _ = await User.get_or_create(id=user_id)
-        user.cars_caught += 1
-        user.total_coins_earned += total_reward
-        await user.save()
+        # Update user stats, add_coins made sure the user exists
+        await User.filter(id=user_id).update(
+            cars_caught=F("cars_caught") + 1,
+            total_coins_earned=F("total_coins_earned") + total_reward,
+            updated_at=datetime.now(timezone.utc),
+        )
         
         return total_reward
\ No newline at end of file
@@ -1,11 +1,15 @@
 """Pack system utilities"""
 
+import functools
 import random
-from datetime import datetime
-from typing import List, Optional, Tuple
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
 from tortoise import models
+from tortoise.expressions import F
 
-from carfigures.models import Pack, PackContent, UserPack, Car, User, UserCar
+from carfigures.core.database import batched_write, write_batcher
+from carfigures.core.economy import economy_stats
+from carfigures.models import CoinReason, Pack, PackContent, UserPack, Car, User, UserCar
 from carfigures.utils.coins import CoinManager
 
 
@@ -15,7 +19,7 @@ class PackManager:
     @staticmethod
     async def get_available_packs() -> List[Pack]:
         """Get all available packs"""
-        now = datetime.now()
+        now = datetime.now(timezone.utc)
         return await Pack.filter(
             is_active=True
         ).filter(
@@ -25,6 +29,7 @@ class PackManager:
         ).all()
     
     @staticmethod
+    @batched_write
     async def purchase_pack(user_id: int, pack_id: int) -> Tuple[bool, str, Optional[UserPack]]:
         """
         Purchase a pack for user
@@ -37,7 +42,7 @@ class PackManager:
         
         # Check if pack is still available (limited time)
         if pack.is_limited_time and pack.available_until:
-            if datetime.now() > pack.available_until:
+            if datetime.now(timezone.utc) > pack.available_until:
                 return False, "This pack is no longer available!", None
         
         # Check if user has enough coins
@@ -46,28 +51,33 @@ class PackManager:
             return False, f"Insufficient coins! You need {pack.price} coins but only have {user_coins.balance}.", None
         
         # Spend coins
-        success, _ = await CoinManager.spend_coins(user_id, pack.price)
+        success, _ = await CoinManager.spend_coins(
+            user_id, pack.price, CoinReason.PACK_PURCHASE, pack.id
+        )
         if not success:
             return False, "Failed to process payment!", None
         
-        # Create pack record
-        user, _ = await User.get_or_create(id=user_id)
+        # Create pack record, the user row exists since the coins were spent
         user_pack = await UserPack.create(
-            user=user,
+            user_id=user_id,
             pack=pack,
             price_paid=pack.price
         )
+        write_batcher.after_commit(
+            functools.partial(economy_stats.record_pack_sale, pack.id, pack.price)
+        )
         
         return True, f"Successfully purchased {pack.name} pack!", user_pack
     
     @staticmethod
+    @batched_write
     async def open_pack(user_pack_id: int) -> Tuple[bool, str, List[Car]]:
         """
         Open a pack and get cars
         Returns: (success, message, cars_received)
         """
         try:
-            user_pack = await UserPack.get(id=user_pack_id).prefetch_related("pack", "user")
+            user_pack = await UserPack.get(id=user_pack_id).prefetch_related("pack")
         except:
             return False, "Pack not found!", []
         
@@ -82,7 +92,43 @@ class PackManager:
         if not pack_contents:
             return False, "This pack has no available cars!", []
         
-        # Generate cars based on rarity chances
+        cars_received = PackManager.draw_cars(pack, pack_contents)
+        # Small chance for shiny variant on every draw
+        shiny = {car.id for car in cars_received if random.random() < 0.05}  # 5% chance
+        
+        # Add to user's collection, cars already owned are kept as they are
+        await UserCar.bulk_create(
+            [
+                UserCar(user_id=user_pack.user_id, car_id=car_id)
+                for car_id in dict.fromkeys(car.id for car in cars_received)
+            ],
+            ignore_conflicts=True,
+        )
+        if shiny:
+            await UserCar.filter(user_id=user_pack.user_id, car_id__in=shiny).update(is_shiny=True)
+        
+        # Mark pack as opened
+        user_pack.is_opened = True
+        user_pack.opened_at = datetime.now()
+        user_pack.cars_received = [car.id for car in cars_received]
+        await user_pack.save()
+        
+        # Update user stats, incremented by the database so concurrent openings all count
+        await User.filter(id=user_pack.user_id).update(
+            packs_opened=F("packs_opened") + 1, updated_at=datetime.now(timezone.utc)
+        )
+        
+        return True, f"Opened {pack.name} pack!", cars_received
+    
+    @staticmethod
+    def draw_cars(pack: Pack, pack_contents: List[PackContent]) -> List[Car]:
+        """
+        Roll the cars of one pack opening, `pack_contents` must have their car fetched
+        Each draw rolls a rarity from the pack's chances, then picks among the cars at
+        least that rare weighted by drop rate. The candidates of a rarity are gathered
+        once per opening, so a draw does not rescan the pack.
+        """
+        candidates: Dict[float, Tuple[List[Car], List[float]]] = {}
         cars_received = []
         
         for _ in range(pack.guaranteed_cars):
@@ -98,44 +144,23 @@ class PackManager:
             else:
                 rarity_threshold = 10.0  # Common
             
-            # Get cars of appropriate rarity
-            available_cars = [
-                pc.car for pc in pack_contents 
-                if pc.car.rarity <= rarity_threshold
-            ]
+            if rarity_threshold not in candidates:
+                # Cars of appropriate rarity, weighted by drop rate
+                available_cars = []
+                cum_weights = []
+                total = 0.0
+                for pc in pack_contents:
+                    if pc.car.rarity <= rarity_threshold:
+                        total += pc.drop_rate
+                        available_cars.append(pc.car)
+                        cum_weights.append(total)
+                candidates[rarity_threshold] = (available_cars, cum_weights)
             
+            available_cars, cum_weights = candidates[rarity_threshold]
             if available_cars:
-                # Weight selection by drop rate
-                weights = [
-                    next(pc.drop_rate for pc in pack_contents if pc.car.id == car.id)
-                    for car in available_cars
-                ]
-                
-                selected_car = random.choices(available_cars, weights=weights)[0]
-                cars_received.append(selected_car)
-                
-                # Add to user's collection
-                user_car, created = await UserCar.get_or_create(
-                    user=user_pack.user,
-                    car=selected_car
-                )
-                
-                # Small chance for shiny variant
-                if random.random() < 0.05:  # 5% chance
-                    user_car.is_shiny = True
-                    await user_car.save()
+                cars_received.append(random.choices(available_cars, cum_weights=cum_weights)[0])
         
-        # Mark pack as opened
-        user_pack.is_opened = True
-        user_pack.opened_at = datetime.now()
-        user_pack.cars_received = [car.id for car in cars_received]
-        await user_pack.save()
-        
-        # Update user stats
-        user_pack.user.packs_opened += 1
-        await user_pack.user.save()
-        
-        return True, f"Opened {pack.name} pack!", cars_received
+        return cars_received
     
     @staticmethod
     async def get_user_unopened_packs(user_id: int) -> List[UserPack]:
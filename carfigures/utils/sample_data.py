@@ -134,6 +134,7 @@ async def create_sample_packs():
     
     # Add cars to packs
     packs = [basic_pack, premium_pack, legendary_pack]
+    contents = []
     
     for pack in packs:
         for car in cars:
@@ -147,10 +148,9 @@ async def create_sample_packs():
             else:  # Common
                 drop_rate = 30.0 if pack.name == "Basic Pack" else 25.0 if pack.name == "Premium Pack" else 15.0
             
-            await PackContent.get_or_create(
-                pack=pack,
-                car=car,
-                defaults={"drop_rate": drop_rate}
-            )
+            contents.append(PackContent(pack=pack, car=car, drop_rate=drop_rate))
+    
+    # One statement for every pack and car, existing entries are left untouched
+    await PackContent.bulk_create(contents, ignore_conflicts=True)
     
     return packs
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""Trade settlement utilities"""
+
+import logging
+from typing import List, Sequence, Tuple
+
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+
+from carfigures.core import journal
+from carfigures.core.database import WRITER_CONNECTION, batched_write
+from carfigures.models import CoinReason, User, UserCar, UserCoins
+
+logger = logging.getLogger(__name__)
+
+# (user id, car ids, coins) given by one side
+Side = Tuple[int, Sequence[int], int]
+
+
+class TradeManager:
+    """Moves the cars and coins of a trade between its two users"""
+
+    @staticmethod
+    @batched_write
+    async def settle(trade_id: int, sides: Sequence[Side]) -> Tuple[bool, str]:
+        """
+        Swap what both sides offered in one transaction
+        The coin rows of both users are locked first, in user id order, then the car
+        rows in id order, so trades over the same users queue behind each other instead
+        of deadlocking. Offers are checked against the locked rows before anything is
+        written, and the writes take the same few statements however much is traded.
+        Returns: (success, message)
+        """
+        (first, first_cars, first_coins), (second, second_cars, second_coins) = sides
+        moves = (
+            (first, second, first_cars, first_coins),
+            (second, first, second_cars, second_coins),
+        )
+        user_ids = sorted((first, second))
+
+        async with in_transaction(WRITER_CONNECTION):
+            wallets = await _lock_wallets(user_ids)
+            if len(wallets) < len(user_ids):
+                # Either user may never have held coins, the rows are the lock for both
+                await User.bulk_create(
+                    [User(id=user_id) for user_id in user_ids], ignore_conflicts=True
+                )
+                await UserCoins.bulk_create(
+                    [UserCoins(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+                )
+                wallets = await _lock_wallets(user_ids)
+            balances = {wallet.user_id: wallet.balance for wallet in wallets}
+
+            for giver, _, _, coins in moves:
+                if balances[giver] < coins:
+                    return False, f"<@{giver}> no longer has {coins:,} coins!"
+
+            car_ids = [*first_cars, *second_cars]
+            if car_ids:
+                # Locks the offered cars, and reads any copy the receiver already owns
+                owned = {
+                    (user_car.user_id, user_car.car_id)
+                    for user_car in await UserCar.filter(
+                        user_id__in=user_ids, car_id__in=car_ids
+                    ).order_by("id").select_for_update()
+                }
+                for giver, receiver, cars, _ in moves:
+                    for car_id in cars:
+                        if (giver, car_id) not in owned:
+                            return False, f"<@{giver}> no longer owns one of the offered cars!"
+                        if (receiver, car_id) in owned:
+                            return False, f"<@{receiver}> already owns one of the offered cars!"
+
+            for giver, receiver, cars, coins in moves:
+                if cars:
+                    await UserCar.filter(user_id=giver, car_id__in=cars).update(
+                        user_id=receiver, is_favorite=False
+                    )
+            # Each balance changes once by what its user nets from the trade
+            net = second_coins - first_coins
+            for user_id, delta in ((first, net), (second, -net)):
+                if delta:
+                    await UserCoins.filter(user_id=user_id).update(balance=F("balance") + delta)
+            for giver, receiver, _, coins in moves:
+                if coins:
+                    await journal.record(giver, -coins, CoinReason.TRADE, trade_id)
+                    await journal.record(receiver, coins, CoinReason.TRADE, trade_id)
+
+        logger.info(
+            f"Settled trade {trade_id}: {first} gave {len(first_cars)} cars and {first_coins} "
+            f"coins, {second} gave {len(second_cars)} cars and {second_coins} coins"
+        )
+        return True, "Trade complete!"
+
+
+async def _lock_wallets(user_ids: List[int]) -> List[UserCoins]:
+    return await UserCoins.filter(user_id__in=user_ids).order_by("user_id").select_for_update()
@@ -0,0 +1,6 @@
+-- upgrade --
+CREATE INDEX IF NOT EXISTS "idx_users_created_43d91f" ON "users" ("created_at");
+CREATE INDEX IF NOT EXISTS "idx_user_packs_purchas_27b562" ON "user_packs" ("purchased_at");
+-- downgrade --
+DROP INDEX IF EXISTS "idx_user_packs_purchas_27b562";
+DROP INDEX IF EXISTS "idx_users_created_43d91f";
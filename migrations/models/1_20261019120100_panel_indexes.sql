@@ -0,0 +1,12 @@
+-- upgrade --
+CREATE INDEX IF NOT EXISTS "idx_users_usernam_266d85" ON "users" ("username");
+CREATE INDEX IF NOT EXISTS "idx_pack_conten_car_id_d016f8" ON "pack_contents" ("car_id", "id");
+CREATE INDEX IF NOT EXISTS "idx_user_packs_user_id_50ea9f" ON "user_packs" ("user_id", "id");
+CREATE INDEX IF NOT EXISTS "idx_user_packs_pack_id_f47afd" ON "user_packs" ("pack_id", "id");
+CREATE INDEX IF NOT EXISTS "idx_user_packs_is_open_1de753" ON "user_packs" ("is_opened", "id");
+-- downgrade --
+DROP INDEX IF EXISTS "idx_user_packs_is_open_1de753";
+DROP INDEX IF EXISTS "idx_user_packs_pack_id_f47afd";
+DROP INDEX IF EXISTS "idx_user_packs_user_id_50ea9f";
+DROP INDEX IF EXISTS "idx_pack_conten_car_id_d016f8";
+DROP INDEX IF EXISTS "idx_users_usernam_266d85";
@@ -0,0 +1,62 @@
+"""Shared fixtures, database tests run against an in-memory SQLite database"""
+
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import pytest
+
+from carfigures.core.database import build_tortoise_config
+
+
+@pytest.fixture
+def run_db() -> Callable[[Callable[[], Awaitable[Any]]], Any]:
+    """Run a coroutine function on a fresh event loop with a freshly created schema"""
+    from tortoise import Tortoise
+
+    def run(test: Callable[[], Awaitable[Any]]) -> Any:
+        async def main():
+            await Tortoise.init(config=build_tortoise_config("sqlite://:memory:"))
+            await Tortoise.generate_schemas()
+            try:
+                return await test()
+            finally:
+                await Tortoise.close_connections()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def run_bot(run_db) -> Callable[[Callable[..., Awaitable[Any]]], Any]:
+    """
+    Run a coroutine function with a set up bot driven by the simulated gateway
+    It is called with the bot, the gateway and one guild of three members.
+    """
+    from carfigures.core.bot import CarFiguresBot
+    from carfigures.core.config import Config
+    from carfigures.core.outbound import OutboundScheduler
+    from carfigures.loadtest.gateway import SimulatedGateway
+
+    def run(test: Callable[..., Awaitable[Any]]) -> Any:
+        async def main():
+            config = Config.from_file(Path(__file__).parent.parent / "config.toml")
+            config.cards.enabled = False
+            config.prometheus.enabled = False
+            config.rate_limits.commands = {}
+            bot = CarFiguresBot(config)
+            bot.outbound = OutboundScheduler(1e9, 1e9, 1e9)
+            gateway = SimulatedGateway(bot)
+            gateway.connect()
+            guild = gateway.add_guild(3)
+            await bot._async_setup_hook()
+            await bot.setup_hook()
+            try:
+                return await test(bot, gateway, guild)
+            finally:
+                await bot.close()
+
+        return run_db(main)
+
+    return run
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from carfigures.core.cards import CardRenderer, rarity_tier, render_card, write_atomic
+from carfigures.core.catalog import CatalogCar
+
+
+@pytest.mark.parametrize("rarity, tier", [
+    (0.1, "LEGENDARY"),
+    (1.0, "LEGENDARY"),
+    (1.5, "EPIC"),
+    (2.0, "EPIC"),
+    (5.0, "RARE"),
+    (5.1, "COMMON"),
+    (1000.0, "COMMON"),
+])
+def test_rarity_tier_matches_the_pack_tiers(rarity, tier):
+    name, color = rarity_tier(rarity)
+    assert name == tier
+    assert len(color) == 3
+
+
+def test_cards_are_keyed_by_car_revision(tmp_path):
+    renderer = CardRenderer(cache_dir=str(tmp_path), fmt="png")
+    car = CatalogCar(7, "Civic", "Type R", 8.0, datetime(2024, 1, 1, tzinfo=timezone.utc))
+    edited = car._replace(updated_at=datetime(2024, 2, 1, tzinfo=timezone.utc))
+    assert renderer.key(car) != renderer.key(edited)
+    assert renderer.path(car).parent == tmp_path
+    assert renderer.filename == "card.png"
+
+
+def test_render_card_replaces_older_revisions(tmp_path):
+    car = {
+        "id": 7, "rarity": 0.5, "horsepower": 315, "weight": 1430, "year": 2023,
+        "type": "Hatchback",
+    }
+    old = tmp_path / "7-1.png"
+    render_card(car, None, None, str(old), "png")
+    new = tmp_path / "7-2.png"
+    data = render_card(car, b"not an image", None, str(new), "png")
+    assert data.startswith(b"\x89PNG")
+    assert new.read_bytes() == data
+    assert not old.exists()
+
+
+def test_write_atomic_leaves_no_partial_files(tmp_path):
+    target = tmp_path / "7-1.png"
+    write_atomic(target, b"first")
+    write_atomic(target, b"second")
+    assert target.read_bytes() == b"second"
+    assert [path.name for path in tmp_path.iterdir()] == ["7-1.png"]
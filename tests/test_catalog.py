@@ -0,0 +1,52 @@
+import random
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from carfigures.core.catalog import CarCatalog, CatalogCar
+
+
+def _car(car_id: int, rarity: float) -> CatalogCar:
+    return CatalogCar(car_id, f"Car {car_id}", f"Model {car_id}", rarity, datetime(2024, 1, 1))
+
+
+def _odds(catalog: CarCatalog) -> dict:
+    """Chance of drawing each car, read from the alias tables"""
+    count = len(catalog)
+    odds = Counter()
+    for column, car in enumerate(catalog.cars()):
+        odds[car.id] += catalog._prob[column] / count
+        odds[catalog.cars()[catalog._alias[column]].id] += (1 - catalog._prob[column]) / count
+    return odds
+
+
+def test_alias_tables_match_the_rarity_weights():
+    rarities = [1.0, 2.0, 3.0, 10.0, 0.5]
+    catalog = CarCatalog([_car(i, rarity) for i, rarity in enumerate(rarities)])
+    odds = _odds(catalog)
+    for car_id, rarity in enumerate(rarities):
+        assert odds[car_id] == pytest.approx(rarity / sum(rarities))
+
+
+def test_sampling_follows_the_weights(monkeypatch):
+    monkeypatch.setattr(random, "random", random.Random(0).random)
+    monkeypatch.setattr(random, "randrange", random.Random(1).randrange)
+    catalog = CarCatalog([_car(1, 1.0), _car(2, 3.0)])
+    draws = Counter(catalog.sample().id for _ in range(10_000))
+    assert draws[2] / 10_000 == pytest.approx(0.75, abs=0.02)
+
+
+def test_cars_that_cannot_spawn_are_left_out():
+    catalog = CarCatalog([_car(1, 0.0), _car(2, 5.0)])
+    assert len(catalog) == 1
+    assert catalog.get(1) is None
+    assert catalog.sample().id == 2
+    assert CarCatalog().sample() is None
+
+
+def test_guesses_match_name_or_model():
+    car = _car(1, 1.0)
+    assert car.matches("  car 1 ")
+    assert car.matches("MODEL 1")
+    assert not car.matches("Car 2")
@@ -0,0 +1,67 @@
+import asyncio
+
+from carfigures.core.bot import CatchButton, CatchModal
+from carfigures.core.spawns import SpawnTable
+from carfigures.loadtest.gateway import CALLBACK_UPDATE
+from carfigures.models import Car, Spawn, UserCar
+
+
+async def _spawn(bot, gateway, guild):
+    """Spawn a car in the guild, returns the car and the spawn message"""
+    car = await Car.create(
+        name="Civic", model="Type R", year=2023, horsepower=315, weight=1430, rarity=8.0,
+        type="Hatchback",
+    )
+    await bot.catalog.refresh()
+    sent = []
+    gateway.listener = lambda kind, data: sent.append((kind, data))
+    await bot._spawn_car(bot.get_channel(guild.channel_ids[0]))
+    message = next(data for kind, data in sent if kind == "message")
+    return car, message
+
+
+async def _replies(gateway, count: int):
+    """Interaction responses, once `count` of them were sent"""
+    replies = []
+    gateway.listener = lambda kind, data: replies.append(data) if kind == "interaction" else None
+    for _ in range(100):
+        if len(replies) >= count:
+            break
+        await asyncio.sleep(0.01)
+    return replies
+
+
+def test_catch_button_keeps_the_car_server_side(run_bot):
+    async def test(bot, gateway, guild):
+        car, message = await _spawn(bot, gateway, guild)
+        custom_id = message["components"][0]["components"][0]["custom_id"]
+        match = CatchButton.__discord_ui_compiled_template__.fullmatch(custom_id)
+        assert match is not None
+        assert set(match.groupdict()) == {"spawn_id", "expires_at"}
+
+        # A process that did not send the spawn reads its car from the spawn row
+        spawn_id = int(match["spawn_id"], 36)
+        bot.spawns = SpawnTable()
+        assert await bot.spawn_car_id(spawn_id, int(match["expires_at"]), None) == car.id
+        assert bot.spawns.get(spawn_id).car_id == car.id
+        assert await Spawn.filter(id=spawn_id).values_list("car_id", flat=True) == [car.id]
+
+    run_bot(test)
+
+
+def test_guess_is_routed_by_the_form_custom_id(run_bot):
+    async def test(bot, gateway, guild):
+        car, message = await _spawn(bot, gateway, guild)
+        custom_id = message["components"][0]["components"][0]["custom_id"]
+        _, _, spawn_id, expires_at = custom_id.split(":")
+        form = CatchModal(int(spawn_id, 36), int(expires_at), int(message["id"])).to_dict()
+
+        # After a restart neither the spawn nor the form are known to the process
+        bot.spawns = SpawnTable()
+        member = guild.members[0]
+        gateway.submit(message, member, form, car.name)
+        replies = await _replies(gateway, 1)
+        assert [reply["type"] for reply in replies] == [CALLBACK_UPDATE]
+        assert await UserCar.filter(user_id=int(member["id"]), car_id=car.id).exists()
+
+    run_bot(test)
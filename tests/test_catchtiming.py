@@ -0,0 +1,64 @@
+import pytest
+
+from carfigures.core.catchtiming import (
+    BUCKETS, FIRST_EDGE, MAX_SAMPLES, CatchTimingAnalyzer, Histogram, bucket_bounds, bucket_of,
+    snowflake_delay,
+)
+from carfigures.core.config import CatchTimingConfig
+
+
+def test_bucket_of_matches_bucket_bounds():
+    assert bucket_of(0.0) == 0
+    assert bucket_of(FIRST_EDGE / 2) == 0
+    assert bucket_of(FIRST_EDGE) == 1
+    assert bucket_of(3600.0) == BUCKETS - 1
+    for index in range(1, BUCKETS - 1):
+        low, high = bucket_bounds(index)
+        assert bucket_of(low * 1.001) == index
+        assert bucket_of(high * 0.999) == index
+
+
+def test_histogram_quantiles_stay_within_their_bucket():
+    histogram = Histogram()
+    for seconds in (0.2, 0.4, 0.8, 1.6, 3.2):
+        histogram.add(seconds)
+    assert histogram.total == 5
+    median = histogram.quantile(0.5)
+    low, high = bucket_bounds(bucket_of(0.8))
+    assert low <= median <= high
+    assert histogram.share_below(1.2) == pytest.approx(3 / 5)
+    # Only whole buckets count, 0.8 shares its bucket with 1.0
+    assert histogram.share_below(1.0) == pytest.approx(2 / 5)
+    assert Histogram().quantile(0.5) is None
+
+
+def test_histogram_halves_old_counts():
+    histogram = Histogram()
+    for _ in range(MAX_SAMPLES):
+        histogram.add(1.0)
+    assert histogram.total == MAX_SAMPLES // 2
+
+
+def test_histogram_with_another_layout_starts_over():
+    assert Histogram([1, 2, 3]).total == 0
+    assert Histogram([1] * BUCKETS).total == BUCKETS
+
+
+def test_snowflake_delay_reads_discord_timestamps():
+    assert snowflake_delay(1000 << 22, 3500 << 22) == 2.5
+
+
+def test_fast_regular_clicks_are_flagged_and_held_back():
+    analyzer = CatchTimingAnalyzer(CatchTimingConfig(
+        enabled=True, min_samples=10, fast_click=0.3, fast_share=0.5, min_spread=1.5,
+        min_typing=0.5, shadow_limit=True, shadow_delay=2.0, max_users=100,
+    ))
+    for _ in range(10):
+        analyzer.record_click(1, 0.1)
+        analyzer.record_click(2, 1.0)
+        analyzer.record_click(2, 4.0)
+    assert analyzer.get(1).reasons == ("fast clicks", "regular clicks")
+    assert analyzer.get(2).reasons == ()
+    assert analyzer.is_held_back(1, 1.0)
+    assert not analyzer.is_held_back(1, 3.0)
+    assert not analyzer.is_held_back(2, 1.0)
@@ -0,0 +1,51 @@
+from carfigures.models import CoinReason, User, UserCoins
+from carfigures.utils.coins import CoinManager
+from carfigures.utils.trades import TradeManager
+
+
+def test_spend_is_refused_without_enough_coins(run_db):
+    async def test():
+        await CoinManager.add_coins(1, 30, CoinReason.DAILY_CLAIM)
+        refused, coins = await CoinManager.spend_coins(1, 31, CoinReason.PACK_PURCHASE)
+        assert not refused and coins.balance == 30
+        spent, coins = await CoinManager.spend_coins(1, 30, CoinReason.PACK_PURCHASE)
+        assert spent and coins.balance == 0
+        assert (coins.lifetime_earned, coins.lifetime_spent) == (30, 30)
+
+    run_db(test)
+
+
+def test_spend_without_wallet_creates_an_empty_one(run_db):
+    async def test():
+        spent, coins = await CoinManager.spend_coins(5, 1, CoinReason.PACK_PURCHASE)
+        assert not spent and coins.balance == 0
+
+    run_db(test)
+
+
+def test_balance_changes_keep_a_concurrent_trade(run_db):
+    async def test():
+        await CoinManager.add_coins(1, 100, CoinReason.DAILY_CLAIM)
+        await CoinManager.add_coins(2, 100, CoinReason.DAILY_CLAIM)
+        # Read before the trade, a read-modify-write from it would undo the trade
+        stale = await UserCoins.get(user_id=1)
+        settled, _ = await TradeManager.settle(7, [(1, [], 40), (2, [], 0)])
+        assert settled
+        await CoinManager.add_coins(1, 5, CoinReason.CAR_CATCH)
+        assert stale.balance == 100
+        assert await CoinManager.get_balance(1) == 65
+        assert await CoinManager.get_balance(2) == 140
+
+    run_db(test)
+
+
+def test_catch_rewards_add_to_the_user_stats(run_db):
+    async def test():
+        await User.create(id=1, username="driver", packs_opened=2)
+        first = await CoinManager.reward_catch(1, 10, [0, 5])
+        second = await CoinManager.reward_catch(1, 10, [0, 5])
+        user = await User.get(id=1)
+        assert (user.cars_caught, user.total_coins_earned) == (2, first + second)
+        assert (user.username, user.packs_opened) == ("driver", 2)
+
+    run_db(test)
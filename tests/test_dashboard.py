@@ -0,0 +1,53 @@
+from carfigures.core.dashboard import DashboardStats
+from carfigures.core.querycount import QueryCounter
+from carfigures.models import Car, Pack, User, UserCar, UserPack
+
+
+async def _populate():
+    user = await User.create(id=1, cars_caught=2)
+    car = await Car.create(
+        name="Civic", model="Type R", year=2023, horsepower=315, weight=1430, rarity=4.0,
+        type="Hatchback",
+    )
+    pack = await Pack.create(name="Starter", description="", price=40)
+    await UserCar.create(user=user, car=car)
+    await UserPack.create(user=user, pack=pack, price_paid=40, is_opened=True)
+    await UserPack.create(user=user, pack=pack, price_paid=40)
+
+
+def test_summary_counts_small_tables_exactly(run_db):
+    async def test():
+        await _populate()
+        return await DashboardStats().summary()
+
+    summary = run_db(test)
+    assert (summary["total_users"], summary["cars_owned"], summary["cars_caught"]) == (1, 1, 2)
+    assert (summary["packs_sold"], summary["packs_opened"], summary["pack_revenue"]) == (2, 1, 80)
+    assert summary["pack_open_rate"] == 0.5
+    assert summary["approximate"] == []
+
+
+class EstimatedStats(DashboardStats):
+    async def _estimates(self):
+        return {"users": 3_000_000, "user_cars": 5_000_000, "user_packs": 2_000_000}
+
+    async def _estimated_sales(self, sold):
+        return {"sold": sold, "opened": sold // 4, "revenue": 123}
+
+
+def test_summary_skips_the_counts_estimates_replace(run_db):
+    async def test():
+        await _populate()
+        with QueryCounter() as counter:
+            summary = await EstimatedStats().summary()
+        return summary, counter
+
+    summary, counter = run_db(test)
+    tables = " ".join(counter.shapes)
+    assert '"user_cars"' not in tables and '"user_packs"' not in tables
+    assert (summary["total_users"], summary["cars_owned"]) == (3_000_000, 5_000_000)
+    # The rate comes from the same estimates as the displayed counts
+    assert (summary["packs_sold"], summary["packs_opened"]) == (2_000_000, 500_000)
+    assert summary["pack_open_rate"] == 0.25
+    assert summary["cars_caught"] == 2
+    assert summary["approximate"] == ["user_cars", "user_packs", "users"]
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from carfigures.core import economy, journal
+from carfigures.core.database import WriteBatcher
+from carfigures.models import CoinReason, EconomyMetric, Pack, Resolution
+from carfigures.utils import packs
+from carfigures.utils.coins import CoinManager
+
+
+@pytest.fixture
+def stats(monkeypatch) -> economy.EconomyStats:
+    stats = economy.EconomyStats()
+    monkeypatch.setattr(journal, "economy_stats", stats)
+    monkeypatch.setattr(packs, "economy_stats", stats)
+    return stats
+
+
+@pytest.fixture
+def batcher(monkeypatch) -> WriteBatcher:
+    batcher = WriteBatcher()
+    for module in (journal, packs):
+        monkeypatch.setattr(module, "write_batcher", batcher)
+    return batcher
+
+
+def _totals(stats: economy.EconomyStats):
+    return stats.recent(Resolution.MINUTE, 1)
+
+
+def test_coin_changes_are_counted_once_committed(run_db, stats):
+    async def test():
+        await CoinManager.add_coins(1, 50, CoinReason.DAILY_CLAIM)
+        await CoinManager.spend_coins(1, 20, CoinReason.PACK_PURCHASE)
+        # Refused spends change nothing and are not counted
+        await CoinManager.spend_coins(1, 500, CoinReason.PACK_PURCHASE)
+
+    run_db(test)
+    assert _totals(stats) == {
+        (EconomyMetric.COINS_MINTED, CoinReason.DAILY_CLAIM): 50,
+        (EconomyMetric.COINS_BURNED, CoinReason.PACK_PURCHASE): 20,
+    }
+
+
+def test_failed_batch_retry_counts_each_commit_once(run_db, stats, batcher):
+    async def failing():
+        await journal.record(2, 10, CoinReason.ADMIN_GIFT)
+        raise RuntimeError("rolled back")
+
+    async def test():
+        batcher.start()
+        try:
+            results = await asyncio.gather(
+                batcher.submit(CoinManager.add_coins, 1, 30, CoinReason.DAILY_CLAIM),
+                batcher.submit(failing),
+                batcher.submit(CoinManager.add_coins, 3, 5, CoinReason.CAR_CATCH),
+                return_exceptions=True,
+            )
+        finally:
+            await batcher.stop()
+        return results
+
+    results = run_db(test)
+    assert isinstance(results[1], RuntimeError)
+    assert _totals(stats) == {
+        (EconomyMetric.COINS_MINTED, CoinReason.DAILY_CLAIM): 30,
+        (EconomyMetric.COINS_MINTED, CoinReason.CAR_CATCH): 5,
+    }
+
+
+def test_pack_sale_is_counted_once_committed(run_db, stats):
+    async def test():
+        pack = await Pack.create(name="Starter", description="", price=40)
+        await CoinManager.add_coins(1, 100, CoinReason.DAILY_CLAIM)
+        success, _, _ = await packs.PackManager.purchase_pack(1, pack.id)
+        assert success
+        return pack.id
+
+    pack_id = run_db(test)
+    totals = _totals(stats)
+    assert totals[EconomyMetric.PACKS_SOLD, pack_id] == 1
+    assert totals[EconomyMetric.PACK_REVENUE, pack_id] == 40
+    assert totals[EconomyMetric.COINS_BURNED, CoinReason.PACK_PURCHASE] == 40
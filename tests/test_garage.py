@@ -0,0 +1,90 @@
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from carfigures.core.cards import CardRenderer
+from carfigures.core.garage import _PAGE_NAME, PAGE_SIZE, GarageRenderer
+from carfigures.models import Car, User, UserCar
+
+
+def _user_car(user_car_id: int, car_id: int, shiny: bool = False, favorite: bool = False):
+    car = SimpleNamespace(id=car_id, updated_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+    return SimpleNamespace(
+        id=user_car_id, car_id=car_id, car=car, is_shiny=shiny, is_favorite=favorite
+    )
+
+
+def _renderer(tmp_path, max_bytes: int = 1000) -> GarageRenderer:
+    cards = CardRenderer(cache_dir=str(tmp_path / "cards"), fmt="png")
+    return GarageRenderer(cards, str(tmp_path / "garages"), max_bytes)
+
+
+def test_page_name_follows_what_the_page_shows(tmp_path):
+    garage = _renderer(tmp_path)
+    cars = [_user_car(1, 10), _user_car(2, 20)]
+    name = garage.page_name(5, 0, cars)
+    assert _PAGE_NAME.fullmatch(name)
+    assert name.startswith("5-0-")
+    assert garage.page_name(5, 0, [_user_car(1, 10), _user_car(2, 20)]) == name
+
+    edited = _user_car(2, 20)
+    edited.car.updated_at = datetime(2024, 2, 1, tzinfo=timezone.utc)
+    changed = [
+        garage.page_name(5, 1, cars),
+        garage.page_name(6, 0, cars),
+        garage.page_name(5, 0, cars[::-1]),
+        garage.page_name(5, 0, [cars[0], _user_car(2, 20, shiny=True)]),
+        garage.page_name(5, 0, [cars[0], _user_car(2, 20, favorite=True)]),
+        garage.page_name(5, 0, [cars[0], edited]),
+    ]
+    assert name not in changed
+    assert len(set(changed)) == len(changed)
+
+
+def test_cached_pages_are_indexed_evicted_and_invalidated(tmp_path):
+    garage = _renderer(tmp_path, max_bytes=250)
+    garage.cache_dir.mkdir(parents=True)
+    names = [garage.page_name(user_id, 0, [_user_car(user_id, 10)]) for user_id in (1, 2, 3)]
+    for age, name in enumerate(names):
+        path = garage.cache_dir / name
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (age, age))
+    (garage.cache_dir / "notes.txt").write_text("left alone")
+
+    garage.start()
+    # The least recently written page goes past the size limit
+    assert garage.stats()["pages"] == 2
+    assert not (garage.cache_dir / names[0]).exists()
+    assert (garage.cache_dir / "notes.txt").exists()
+
+    garage.invalidate(2)
+    assert not (garage.cache_dir / names[1]).exists()
+    assert garage.stats() == {"pages": 1, "bytes": 100, "rendering": 0}
+
+
+def test_next_page_hint_names_the_garage_shown(run_bot, tmp_path, monkeypatch):
+    async def test(bot, gateway, guild):
+        owner, visitor = guild.members[:2]
+        await User.create(id=int(owner["id"]))
+        for index in range(PAGE_SIZE + 1):
+            car = await Car.create(
+                name=f"Car {index}", model="Model", year=2023, horsepower=100, weight=1000,
+                rarity=5.0, type="Coupe",
+            )
+            await UserCar.create(user_id=int(owner["id"]), car=car)
+
+        async def get(user_id, page, user_cars):
+            return b"page"
+
+        bot.garages = _renderer(tmp_path)
+        monkeypatch.setattr(bot.garages, "get", get)
+        sent = []
+        gateway.listener = lambda kind, data: sent.append(data) if kind == "message" else None
+        for author, arguments in ((visitor, f" <@{owner['id']}>"), (owner, "")):
+            content = f"{bot.command_prefix}garage{arguments}"
+            await bot.invoke(await bot.get_context(gateway.build_message(guild, author, content)))
+        return int(owner["id"]), [message["embeds"][0]["footer"]["text"] for message in sent]
+
+    owner_id, (visited, own) = run_bot(test)
+    assert visited == f"Page 1/2 - !garage {owner_id} 2 for the next one"
+    assert own == "Page 1/2 - !garage 2 for the next one"
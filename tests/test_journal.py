@@ -0,0 +1,73 @@
+import asyncio
+
+from carfigures.core import journal, transfer
+from carfigures.core.database import (
+    WriteBatcher, add_query_listener, install_query_hook, remove_query_listener
+)
+from carfigures.models import CoinReason, CoinTransaction
+from carfigures.utils.coins import CoinManager
+
+
+async def _mismatches():
+    return [mismatch async for mismatch in journal.verify_balances()]
+
+
+def test_journal_sums_up_to_balances(run_db):
+    async def test():
+        await CoinManager.add_coins(1, 100, CoinReason.DAILY_CLAIM)
+        await CoinManager.spend_coins(1, 30, CoinReason.PACK_PURCHASE)
+        await CoinManager.add_coins(2, 5, CoinReason.CAR_CATCH)
+        return await _mismatches(), await journal.history(1)
+
+    mismatches, history = run_db(test)
+    assert mismatches == []
+    assert [(entry.delta, entry.reason) for entry in history] == [
+        (-30, CoinReason.PACK_PURCHASE), (100, CoinReason.DAILY_CLAIM)
+    ]
+
+
+def test_batched_entries_share_one_insert(run_db, monkeypatch):
+    batcher = WriteBatcher()
+    monkeypatch.setattr(journal, "write_batcher", batcher)
+
+    queries = []
+
+    def listener(query, duration):
+        queries.append(query)
+
+    async def test():
+        await CoinManager.add_coins(1, 1, CoinReason.DAILY_CLAIM)
+        install_query_hook()
+        add_query_listener(listener)
+        batcher.start()
+        try:
+            await asyncio.gather(*(
+                batcher.submit(CoinManager.add_coins, 1, 1, CoinReason.CAR_CATCH)
+                for _ in range(5)
+            ))
+        finally:
+            await batcher.stop()
+            remove_query_listener(listener)
+        return await CoinTransaction.filter(user_id=1).count()
+
+    entries = run_db(test)
+    assert len([query for query in queries if "coin_transactions" in query]) == 1
+    assert entries == 6
+
+
+def test_imported_balances_are_journaled(run_db):
+    async def test():
+        await CoinManager.add_coins(1, 100, CoinReason.DAILY_CLAIM)
+        await transfer.import_rows("users", [{"id": 2}])
+        await transfer.import_rows(
+            "user_coins", [{"user_id": 1, "balance": 40}, {"user_id": 2, "balance": 25}]
+        )
+        # Unchanged balances add nothing
+        await transfer.import_rows("user_coins", [{"user_id": 1, "balance": 40}])
+        return await _mismatches(), await CoinTransaction.filter(
+            reason=CoinReason.IMPORT
+        ).order_by("user_id").values_list("user_id", "delta")
+
+    mismatches, imports = run_db(test)
+    assert mismatches == []
+    assert imports == [(1, -60), (2, 25)]
@@ -0,0 +1,52 @@
+import asyncio
+from pathlib import Path
+
+from tortoise import Tortoise
+
+from carfigures.core.database import build_tortoise_config, latest_migration, schema_is_current
+
+MIGRATIONS = Path(__file__).parent.parent / "migrations"
+
+
+async def _indexes() -> set:
+    _, rows = await Tortoise.get_connection("default").execute_query(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+    )
+    return {row["name"] for row in rows}
+
+
+def test_migrations_create_the_indexes_of_existing_tables(tmp_path, monkeypatch):
+    # Migrations are looked up relative to the working directory, as aerich does
+    monkeypatch.chdir(MIGRATIONS.parent)
+    from aerich import Command
+
+    async def test():
+        config = build_tortoise_config(f"sqlite://{tmp_path / 'db.sqlite3'}")
+        command = Command(config, location=str(MIGRATIONS))
+        await command.init()
+        try:
+            await Tortoise.generate_schemas()
+            assert not await schema_is_current()
+            fresh = await _indexes()
+            # Same index names as the models, so a fresh database gets no duplicates
+            assert await command.upgrade()
+            assert await _indexes() == fresh
+            # Boots then skip schema generation
+            assert await schema_is_current()
+
+            # A database created before the indexes only gets them from the migrations
+            await command.downgrade(0, delete=False)
+            assert await _indexes() < fresh
+            await command.upgrade()
+            assert await _indexes() == fresh
+        finally:
+            await Tortoise.close_connections()
+
+    asyncio.run(test())
+
+
+def test_latest_migration_is_the_highest_numbered(tmp_path):
+    assert latest_migration(tmp_path / "missing") is None
+    for name in ("0_1_init.sql", "2_3_later.sql", "10_2_latest.sql", "notes.sql"):
+        (tmp_path / name).write_text("-- upgrade --\n")
+    assert latest_migration(tmp_path) == "10_2_latest.sql"
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from carfigures.core.outbound import OutboundScheduler, Priority, SendDropped, TokenBucket
+
+
+def _run(test):
+    async def main():
+        scheduler = OutboundScheduler(route_rate=20.0, route_burst=1.0, spawn_max_age=0.2)
+        scheduler.start()
+        try:
+            return await test(scheduler)
+        finally:
+            await scheduler.stop()
+
+    return asyncio.run(main())
+
+
+def _recorder(sent, name):
+    async def factory():
+        sent.append(name)
+        return name
+
+    return factory
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=2.0, capacity=1.0, now=0.0)
+    assert bucket.delay(0.0) == 0
+    bucket.take(0.0)
+    assert bucket.delay(0.0) == pytest.approx(0.5)
+    assert bucket.delay(0.25) == pytest.approx(0.25)
+    assert bucket.is_full(0.5)
+
+
+def test_higher_priorities_go_first():
+    async def test(scheduler):
+        scheduler.global_bucket = TokenBucket(20.0, 1.0)
+        sent = []
+        await scheduler.send(Priority.SPAWN, 1, _recorder(sent, "first"))
+        waiting = [
+            asyncio.create_task(scheduler.send(Priority.SPAWN, 2, _recorder(sent, "spawn"))),
+            asyncio.create_task(scheduler.send(Priority.REPLY, 3, _recorder(sent, "reply"))),
+        ]
+        await asyncio.sleep(0)
+        # Interaction responses skip the global budget
+        await scheduler.send(Priority.INTERACTION, 4, _recorder(sent, "interaction"))
+        await asyncio.gather(*waiting)
+        return sent
+
+    assert _run(test) == ["first", "interaction", "reply", "spawn"]
+
+
+def test_busy_route_does_not_hold_back_others():
+    async def test(scheduler):
+        sent = []
+        busy = [
+            asyncio.create_task(scheduler.send(Priority.REPLY, "busy", _recorder(sent, i)))
+            for i in range(50)
+        ]
+        await asyncio.sleep(0)
+        await scheduler.send(Priority.REPLY, "quiet", _recorder(sent, "quiet"))
+        assert sent[:2] == [0, "quiet"]
+        assert scheduler.depth(Priority.REPLY) > 40
+        for task in busy:
+            task.cancel()
+        await asyncio.gather(*busy, return_exceptions=True)
+        # Given up sends are forgotten once the route has budget again
+        await asyncio.sleep(0.1)
+        assert scheduler.depth(Priority.REPLY) == 0
+        return sent
+
+    _run(test)
+
+
+def test_sends_on_a_route_keep_their_order():
+    async def test(scheduler):
+        sent = []
+        await asyncio.gather(*(
+            scheduler.send(Priority.REPLY, "channel", _recorder(sent, i)) for i in range(5)
+        ))
+        return sent
+
+    assert _run(test) == list(range(5))
+
+
+def test_spawns_are_superseded_and_go_stale():
+    async def test(scheduler):
+        sent = []
+        await scheduler.send(Priority.SPAWN, "channel", _recorder(sent, "first"))
+        scheduler.route_rate = 0.01
+        scheduler._routes.clear()
+        await scheduler.send(Priority.SPAWN, "channel", _recorder(sent, "drain"))
+        older = asyncio.create_task(scheduler.send(
+            Priority.SPAWN, "channel", _recorder(sent, "older"), coalesce_key="channel"
+        ))
+        await asyncio.sleep(0)
+        newer = scheduler.send(
+            Priority.SPAWN, "channel", _recorder(sent, "newer"), coalesce_key="channel"
+        )
+        with pytest.raises(SendDropped, match="stale"):
+            await newer
+        with pytest.raises(SendDropped, match="superseded"):
+            await older
+        assert scheduler.depth(Priority.SPAWN) == 0
+        return sent
+
+    assert _run(test) == ["first", "drain"]
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from carfigures.core import journal
+from carfigures.core.database import WriteBatcher
+from carfigures.core.querycount import QueryBudgetExceeded, QueryCounter, query_shape
+from carfigures.models import Car, CoinReason, Pack, PackContent, UserPack
+from carfigures.utils.coins import CoinManager
+
+
+def test_query_shape_ignores_values():
+    expected = "SELECT * FROM cars WHERE id IN (?) AND name=?"
+    assert query_shape("SELECT * FROM cars WHERE id IN (1, 2,3) AND name='It''s'") == expected
+    assert query_shape("SELECT *  FROM cars\n WHERE id IN ($1, $2) AND name=$3") == expected
+
+
+def test_strict_counter_fails_over_budget():
+    counter = QueryCounter("test", budget=1, strict=True)
+    with pytest.raises(QueryBudgetExceeded, match="test: 2/1 queries"):
+        with counter:
+            counter.add("SELECT 1")
+            counter.add("SELECT 1")
+
+
+def test_repeated_shapes_look_like_n_plus_one():
+    counter = QueryCounter(repeat_threshold=3)
+    for user_id in range(3):
+        counter.add(f"SELECT * FROM users WHERE id = {user_id}")
+    assert counter.repeated_shapes() == [("SELECT * FROM users WHERE id = ?", 3)]
+
+
+def test_deferred_rows_count_against_every_job(run_db, monkeypatch):
+    batcher = WriteBatcher()
+    monkeypatch.setattr(journal, "write_batcher", batcher)
+
+    async def add(user_id):
+        with QueryCounter() as counter:
+            await batcher.submit(CoinManager.add_coins, user_id, 5, CoinReason.CAR_CATCH)
+        return counter
+
+    async def test():
+        await CoinManager.add_coins(1, 1, CoinReason.DAILY_CLAIM)
+        await CoinManager.add_coins(2, 1, CoinReason.DAILY_CLAIM)
+        batcher.start()
+        try:
+            return await asyncio.gather(add(1), add(2))
+        finally:
+            await batcher.stop()
+
+    for counter in run_db(test):
+        assert sum(
+            count for shape, count in counter.shapes.items() if "coin_transactions" in shape
+        ) == 1
+
+
+async def _seed(member_id: int) -> int:
+    car = await Car.create(
+        name="Civic", model="Type R", year=2023, horsepower=315, weight=1430, rarity=8.0,
+        type="Hatchback",
+    )
+    pack = await Pack.create(name="Starter", description="", price=40, guaranteed_cars=3)
+    await PackContent.create(pack=pack, car=car, drop_rate=1.0)
+    await CoinManager.add_coins(member_id, 1000, CoinReason.ADMIN_GIFT)
+    user_pack = await UserPack.create(user_id=member_id, pack=pack, price_paid=0)
+    for other in range(3):
+        await CoinManager.add_coins(member_id + other + 1, 10 * (other + 1), CoinReason.DAILY_CLAIM)
+    return user_pack.id
+
+
+# Budgeted commands, in order, with the arguments they are invoked with
+COMMANDS = [
+    ("help", ""),
+    ("daily", ""),
+    ("daily", ""),
+    ("balance", ""),
+    ("history", ""),
+    ("leaderboard", ""),
+    ("give", "<@{member}> 50"),
+    ("shop", ""),
+    ("buy", "Starter"),
+    ("inventory", ""),
+    ("open", "{user_pack}"),
+    ("garage", ""),
+    ("info", "Civic"),
+    ("settings", ""),
+    ("settings messages", "20 40"),
+    ("settings cooldown", "120"),
+    ("settings reset", ""),
+]
+
+
+def test_commands_stay_within_their_query_budget(run_bot):
+    async def test(bot, gateway, guild):
+        member = guild.members[0]
+        member_id = int(member["id"])
+        user_pack = await _seed(member_id)
+
+        for name, arguments in COMMANDS:
+            content = f"{bot.command_prefix}{name} {arguments}".format(
+                member=member_id, user_pack=user_pack
+            ).rstrip()
+            ctx = await bot.get_context(gateway.build_message(guild, member, content))
+            command = bot.get_command(name)
+            budget = command.extras["query_budget"]
+            with QueryCounter(command.qualified_name, budget=budget, strict=True) as counter:
+                await bot.invoke(ctx)
+            assert not ctx.command_failed, content
+            assert not counter.repeated_shapes(), counter.summary()
+
+    run_bot(test)
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from carfigures.core.config import RateLimit, RateLimitConfig
+from carfigures.core.ratelimit import GCRA, RateLimited, RateLimiter
+
+
+def test_gcra_allows_a_burst_then_one_call_per_interval():
+    limiter = GCRA(RateLimit(rate=2, per=10.0, burst=3), max_keys=100)
+    assert [limiter.acquire(1, now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire(1, now=0.0) == pytest.approx(5.0)
+    # A rejected call costs nothing, the next one is allowed on schedule
+    assert limiter.acquire(1, now=4.0) == pytest.approx(1.0)
+    assert limiter.acquire(1, now=5.0) == 0.0
+    assert limiter.acquire(1, now=5.0) == pytest.approx(5.0)
+
+
+def test_gcra_keys_are_limited_apart():
+    limiter = GCRA(RateLimit(rate=1, per=1.0, burst=1), max_keys=100)
+    assert limiter.acquire(1, now=0.0) == 0.0
+    assert limiter.acquire(1, now=0.0) > 0
+    assert limiter.acquire(2, now=0.0) == 0.0
+
+
+def test_gcra_evicts_keys_back_on_schedule_and_the_least_recent():
+    limiter = GCRA(RateLimit(rate=1, per=1.0, burst=1), max_keys=2)
+    for key in range(3):
+        limiter.acquire(key, now=0.0)
+    assert len(limiter) == 2
+    # Evicted keys had their calls, they start over
+    assert limiter.acquire(0, now=0.0) == 0.0
+    limiter.acquire(3, now=10.0)
+    assert len(limiter) == 1
+
+
+def test_rate_limiter_checks_user_and_guild_scopes():
+    limiter = RateLimiter(RateLimitConfig(
+        commands={"daily": {"user": RateLimit(1, 60.0, 1), "guild": RateLimit(2, 60.0, 2)}},
+        max_keys=100,
+        store="",
+    ))
+
+    async def test():
+        await limiter.acquire("daily", 1, 10)
+        with pytest.raises(RateLimited) as user_limited:
+            await limiter.acquire("daily", 1, 10)
+        await limiter.acquire("daily", 2, 10)
+        with pytest.raises(RateLimited) as guild_limited:
+            await limiter.acquire("daily", 3, 10)
+        # Commands without limits always go through
+        await limiter.acquire("balance", 1, 10)
+        return user_limited.value, guild_limited.value
+
+    user_limited, guild_limited = asyncio.run(test())
+    assert user_limited.scope == "user" and user_limited.retry_after > 0
+    assert guild_limited.scope == "guild"
+    assert limiter.should_warn(1) and not limiter.should_warn(1)
+
+
+def _limiter() -> RateLimiter:
+    return RateLimiter(RateLimitConfig(
+        commands={"catch": {"user": RateLimit(2, 60.0, 2), "guild": RateLimit(1, 60.0, 1)}},
+        max_keys=100,
+        store="",
+    ))
+
+
+def test_guild_rejection_does_not_cost_the_user():
+    limiter = _limiter()
+
+    async def test():
+        await limiter.acquire("catch", 1, 10)
+        for _ in range(3):
+            with pytest.raises(RateLimited, match="per guild"):
+                await limiter.acquire("catch", 1, 10)
+        # The user still has the second call of their burst elsewhere
+        await limiter.acquire("catch", 1, 20)
+
+    asyncio.run(test())
+
+
+def test_shared_store_rejection_refunds_the_local_limits():
+    limiter = _limiter()
+
+    class RejectingStore:
+        async def acquire(self, keys, limiters):
+            assert keys == ["cf:rl:catch:user:1", "cf:rl:catch:guild:10"]
+            return 3.0, 1
+
+    async def test():
+        limiter._store = RejectingStore()
+        with pytest.raises(RateLimited, match="per guild") as rejected:
+            await limiter.acquire("catch", 1, 10)
+        limiter._store = None
+        await limiter.acquire("catch", 1, 10)
+        return rejected.value
+
+    assert asyncio.run(test()).retry_after == 3.0
@@ -0,0 +1,101 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from carfigures.core import transfer
+from carfigures.models import Car, User
+
+CAR = {
+    "id": 1, "name": "Civic", "model": "Type R", "year": 2023, "horsepower": 315,
+    "weight": 1430, "rarity": 4.0, "type": "Hatchback",
+}
+
+
+def _field(table: str, column: str):
+    return transfer.TABLES[table].model._meta.fields_map[column]
+
+
+@pytest.mark.parametrize(
+    ("column", "value", "expected"),
+    [
+        ("is_exclusive", "Yes", True),
+        ("is_exclusive", "0", False),
+        ("is_exclusive", False, False),
+        ("year", "1999", 1999),
+        ("rarity", "2.5", 2.5),
+        ("image_url", "", None),
+        ("created_at", "2024-05-01T12:00:00", datetime(2024, 5, 1, 12)),
+        ("name", "", ""),
+    ],
+)
+def test_coerce_converts_parsed_values(column, value, expected):
+    assert transfer._coerce(_field("cars", column), value) == expected
+
+
+def test_prepare_keeps_the_last_row_of_a_key():
+    table = transfer.TABLES["users"]
+    groups = transfer._prepare(
+        table, [{"id": "1", "username": "old"}, {"id": 2}, {"id": "1", "username": "new"}], 0
+    )
+    assert list(groups) == [("id", "username"), ("id",)]
+    assert [user.username for user in groups["id", "username"]] == ["new"]
+
+
+def test_prepare_groups_rows_by_the_columns_they_carry():
+    table = transfer.TABLES["users"]
+    rows = [{"username": "a", "id": 1}, {"id": 2, "cars_caught": 3}, {"id": 3, "username": "b"}]
+    groups = transfer._prepare(table, rows, 0)
+    assert {columns: len(objects) for columns, objects in groups.items()} == {
+        ("id", "username"): 2,
+        ("id", "cars_caught"): 1,
+    }
+
+
+@pytest.mark.parametrize(
+    ("row", "message"),
+    [
+        ({"id": 1, "colour": "red"}, "Row 11 has unknown columns: colour"),
+        ({"username": "alice"}, "Row 11 is missing id"),
+        ({"id": "one"}, "Row 11 has an invalid value"),
+    ],
+)
+def test_prepare_reports_the_row_number(row, message):
+    with pytest.raises(ValueError, match=message):
+        transfer._prepare(transfer.TABLES["users"], [row], 10)
+
+
+def test_read_rows_rejects_non_objects():
+    with pytest.raises(ValueError, match="Line 2 is not a JSON object"):
+        list(transfer.read_rows(io.StringIO('{"id": 1}\n[1]\n'), "ndjson"))
+
+
+def test_import_keeps_columns_a_row_leaves_out(run_db):
+    async def test():
+        await transfer.import_rows("cars", [{**CAR, "image_url": "civic.png"}])
+        await transfer.import_rows("users", [{"id": 1, "username": "alice", "cars_caught": 4}])
+        # The second row carries cars_caught, the first one must not reset it to the default
+        await transfer.import_rows(
+            "users", [{"id": 1, "username": "alicia"}, {"id": 2, "cars_caught": 9}]
+        )
+        await transfer.import_rows(
+            "cars", [{**CAR, "weight": 1400}, {**CAR, "id": 2, "image_url": "nsx.png"}]
+        )
+        return (
+            await User.all().order_by("id").values_list("id", "username", "cars_caught"),
+            await Car.get(id=1),
+        )
+
+    users, car = run_db(test)
+    assert users == [(1, "alicia", 4), (2, "", 9)]
+    assert (car.image_url, car.weight) == ("civic.png", 1400)
+
+
+def test_export_round_trips_csv(run_db):
+    async def test():
+        await transfer.import_rows("cars", [CAR, {**CAR, "id": 2, "is_exclusive": True}])
+        return "".join([text async for text in transfer.export_rows("cars", "csv", 1)])
+
+    text = run_db(test)
+    rows = list(transfer.read_rows(io.StringIO(text), "csv"))
+    assert [(row["id"], row["is_exclusive"]) for row in rows] == [("1", "False"), ("2", "True")]